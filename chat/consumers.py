@@ -5,6 +5,7 @@ from django.utils import timezone
 import hashlib
 from urllib.parse import unquote
 from .models import ChatMessage, FolderChatMessage, FolderChatVisit
+from .unread import note_folder_message
 from coreapi.models import UserProfile
 import asyncio
 import os
@@ -128,7 +129,8 @@ class FolderChatConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def save_message(self, user_id, path, message):
         user = UserProfile.objects.get(id=user_id)
-        FolderChatMessage.objects.create(folder_path=path, user=user, message=message)
+        msg = FolderChatMessage.objects.create(folder_path=path, user=user, message=message)
+        note_folder_message(path, msg.timestamp)
         FolderChatVisit.objects.update_or_create(
             user=user, folder_path=path, defaults={'last_visit': timezone.now()}
         )
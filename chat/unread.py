@@ -0,0 +1,83 @@
+# chat/unread.py
+import hashlib
+from django.core.cache import cache
+from django.db.models import Max
+from .models import FolderChatMessage, FolderChatVisit
+
+# Per-folder "last message at", shared through Redis. 0 means "no messages",
+# so quiet folders don't go back to the database on every listing.
+LAST_MESSAGE_KEY = "folder_chat_last:{}"
+LAST_MESSAGE_TTL = 3600  # Safety net for messages written outside the chat paths (admin, shell)
+NO_MESSAGES = 0
+
+
+def _key(folder_path):
+    return LAST_MESSAGE_KEY.format(hashlib.md5(folder_path.encode('utf-8')).hexdigest())
+
+
+def note_folder_message(folder_path, timestamp):
+    """Called whenever a folder chat message is saved."""
+    cache.set(_key(folder_path), timestamp, timeout=LAST_MESSAGE_TTL)
+
+
+def get_last_message_times(folder_paths):
+    """
+    {folder_path: timestamp of its newest message, or None}.
+    Cache misses are filled with ONE aggregate query (MAX(timestamp) GROUP BY folder_path).
+    """
+    paths = list(dict.fromkeys(folder_paths))
+    keys = {path: _key(path) for path in paths}
+    cached = cache.get_many(list(keys.values()))
+
+    result = {}
+    missing = []
+    for path in paths:
+        value = cached.get(keys[path])
+        if value is None:
+            missing.append(path)
+        else:
+            result[path] = value or None
+
+    if missing:
+        rows = (FolderChatMessage.objects
+                .filter(folder_path__in=missing)
+                .values('folder_path')
+                .annotate(last=Max('timestamp')))
+        found = {row['folder_path']: row['last'] for row in rows}
+        cache.set_many({keys[path]: found.get(path, NO_MESSAGES) for path in missing},
+                       timeout=LAST_MESSAGE_TTL)
+        for path in missing:
+            result[path] = found.get(path)
+
+    return result
+
+
+def get_unread_flags(user_profile, folder_paths):
+    """
+    {folder_path: is_unread} for one user, in at most two queries regardless
+    of how many folders are asked about (zero if no folder has messages).
+    A folder is unread if it has messages and the user never visited it, or
+    the newest message is newer than their last visit.
+    """
+    paths = list(folder_paths)
+    if not user_profile or not paths:
+        return {path: False for path in paths}
+
+    last_times = get_last_message_times(paths)
+    with_messages = [path for path, last in last_times.items() if last is not None]
+
+    visits = {}
+    if with_messages:
+        visits = dict(FolderChatVisit.objects
+                      .filter(user=user_profile, folder_path__in=with_messages)
+                      .values_list('folder_path', 'last_visit'))
+
+    flags = {}
+    for path in paths:
+        last = last_times[path]
+        if last is None:
+            flags[path] = False
+        else:
+            visit = visits.get(path)
+            flags[path] = visit is None or last > visit
+    return flags
@@ -6,6 +6,7 @@ from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt,csrf_protect
 from django.utils.text import get_valid_filename
 from .models import ChatMessage,FolderChatMessage, FolderChatVisit
+from .unread import note_folder_message
 from coreapi.models import UserProfile
 from django.utils import timezone
 import json
@@ -133,6 +134,7 @@ def send_folder_message(request):
                 user=user_profile,  # <--- CHANGED from request.user to user_profile
                 message=message_text
             )
+            note_folder_message(path_id, new_msg.timestamp)
 
             return JsonResponse({
                 'status': 'success',
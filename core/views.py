@@ -18,6 +18,7 @@ from datetime import timedelta, datetime
 from django.views.decorators.csrf import csrf_protect
 from django.core.paginator import Paginator
 from coreapi.search_index import get_index
+from coreapi.autosave import autosave_buffer
 
 from .utils import (
     parse_hdfc_folder, parse_muthoot_folder, parse_bajaj_folder,
@@ -369,8 +370,9 @@ def report_detail_view(request, report_id):
     if request.session.get("user_role") not in ["admin", "accountant"]:
         return redirect("coreapi:login_page")
         
-    report = get_object_or_404(SiteVisitReport, id=report_id)
-    sketches = report.sketches.all()
+    report = autosave_buffer.flush_report(get_object_or_404(SiteVisitReport, id=report_id))
+    # Rows autosave created for strokes only have no image until the report is submitted
+    sketches = report.sketches.exclude(image='').defer('strokes')
     
     # USE THE NEW HELPER HERE
     completion_percent = get_report_percent(report)
@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-import threading
 import sys
 import os
 
@@ -17,16 +16,16 @@ class CoreapiConfig(AppConfig):
 
         if should_run:
             from . import search_index
-            def run_indexing():
-                print(">> Background Task: Pre-building Search Index...", flush=True)
-                try:
-                    search_index.build_index()
-                    print(">> Background Task: Search Index Ready!", flush=True)
-                except Exception as e:
-                    print(f"!! CRITICAL ERROR building index: {e}", flush=True)
-
-            index_thread = threading.Thread(target=run_indexing)
-            index_thread.daemon = True
-            index_thread.start()
+            # Loads the persisted snapshot, reconciles it with the drive and
+            # then keeps the index current from watcher/polling deltas
+            search_index.updater.start()
             from .tasks import monitor
-            monitor.start()
\ No newline at end of file
+            monitor.start()
+            from .thumbnails import prewarmer
+            prewarmer.start()
+            from .content_index import content_indexer
+            content_indexer.start()
+            from .autosave import autosave_buffer
+            autosave_buffer.start()
+            from .media_sweeper import sketch_sweeper
+            sketch_sweeper.start()
@@ -0,0 +1,379 @@
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from .json_patch import apply_patch, PatchError
+from .sketch_store import split_vectors, store_strokes, inflate_vectors
+
+ENTRY_KEY = "autosave:entry:{}"
+DIGEST_KEY = "autosave:digest:{}"
+REPORT_ID_KEY = "autosave:report_id:{}"
+ENTRY_TTL = 86400         # Long enough to survive a restart; flushed entries just age out
+ACTIVITY_KEY = "autosave:activity:{}"
+ACTIVITY_INTERVAL = 60    # last_seen is shown to the minute; no need to write it every few seconds
+
+
+class RevisionConflict(Exception):
+    """A delta save was diffed against a revision that is no longer current."""
+
+    def __init__(self, revision):
+        super().__init__(f"Report is at revision {revision}")
+        self.revision = revision
+
+
+def payload_digest(entry):
+    """Hash of everything an autosave writes, so an identical resend costs no DB write."""
+    blob = json.dumps(
+        [entry["form_data"], entry["target_folder"], entry["applicant_name"], entry["completion_score"]],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class AutosaveBuffer:
+    """
+    Debounces auto_save_api writes per office_file_no.
+
+    submit() stores the latest payload in Redis (the durable copy: it
+    outlives a crashed or restarted worker) and acknowledges at once. A
+    background thread writes a file number to SiteVisitReport once it has
+    been quiet for DEBOUNCE seconds, and never later than MAX_DELAY after
+    its first unwritten save, so a device saving every few seconds costs
+    one row rewrite per window instead of one per request. A flush whose
+    payload hashes the same as the last write is skipped entirely.
+
+    Anything that reads or replaces form_data for a file number calls
+    flush(file_no) (or flush_report() on a row it already loaded) first,
+    and forget() after writing it by other means, so no caller ever sees
+    or is overwritten by a stale draft. Flushes take the same cross-process
+    lock as those writers, and an entry older than the row's revision is
+    dropped rather than written.
+
+    When Redis is unreachable, auto_save_api falls back to save_direct().
+    """
+
+    DEBOUNCE = 5
+    MAX_DELAY = 20
+
+    def __init__(self):
+        self._pending = {}   # file_no -> (first_at, last_at) for saves received by this process
+        self._cond = threading.Condition()
+        self._flush_locks = {}
+        self._held = threading.local()  # File numbers this thread holds locked() for
+        self.submits = 0
+        self.writes = 0
+        self.skipped = 0
+        self.delta_saves = 0
+        self.conflicts = 0
+        self.bytes_received = 0
+        self.bytes_written = 0
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self._recover()
+            self.thread.start()
+            print(">> Background Task: Autosave Buffer Started")
+
+    def touch_activity(self, user_id):
+        """update_user_activity(), at most once per ACTIVITY_INTERVAL per user."""
+        if cache.add(ACTIVITY_KEY.format(user_id), 1, timeout=ACTIVITY_INTERVAL):
+            from .models import UserProfile
+            UserProfile.objects.filter(id=user_id).update(last_seen=timezone.now())
+
+    @contextmanager
+    def locked(self, file_no):
+        """
+        Per-file-number lock, shared across worker processes when Redis
+        provides one. Held by anything that checks a revision and then
+        writes, and by every flush. Re-entrant within a thread, so flush()
+        may be called while holding it.
+        """
+        held = self._held.__dict__.setdefault("file_nos", set())
+        if file_no in held:
+            yield
+            return
+        redis_lock = getattr(cache, "lock", None)  # django_redis only
+        with self._lock_for(file_no), \
+                (redis_lock(f"autosave:lock:{file_no}", timeout=10) if redis_lock else nullcontext()):
+            held.add(file_no)
+            try:
+                yield
+            finally:
+                held.discard(file_no)
+
+    def state(self, file_no):
+        """(form_data, revision) as of the latest accepted save, buffered or written."""
+        try:
+            entry = cache.get(ENTRY_KEY.format(file_no))
+        except Exception:
+            entry = None  # Redis offline: saves go straight to the DB (save_direct)
+        if entry is not None:
+            return entry["form_data"], entry.get("revision", 0)
+        from .models import SiteVisitReport
+        row = SiteVisitReport.objects.filter(office_file_no=file_no).values_list("id", "form_data", "revision").first()
+        if row is None:
+            return {}, 0
+        # Patches are diffed against stroke lists, not the references stored in the row
+        report_id, form_data, revision = row
+        return inflate_vectors(report_id, form_data), revision
+
+    def payload_from_request(self, data):
+        """
+        (full form payload, base revision) for a save request body.
+
+        Old clients send {"payload": ...}; that passes through with base
+        revision None. Delta clients send {"file_no", "base_revision",
+        "patch"} and the JSON Patch is applied to the stored form_data.
+        A stale base revision, a patch that doesn't apply, or a patch that
+        changes the file number raises RevisionConflict, and the client
+        falls back to a full save.
+        """
+        if data.get('patch') is None:
+            return data.get('payload', {}), None
+
+        file_no = str(data.get('file_no', "")).strip()
+        form_data, revision = self.state(file_no) if file_no else ({}, 0)
+        try:
+            if not file_no or data.get('base_revision') != revision:
+                raise PatchError("Stale base revision")
+            payload = apply_patch(form_data, data['patch'])
+            if not isinstance(payload, dict) or \
+                    str(payload.get('Valuers_Checklist', {}).get('Office_file_no', "")).strip() != file_no:
+                raise PatchError("Patch changed the file number")
+        except PatchError:
+            self.conflicts += 1
+            raise RevisionConflict(revision)
+        return payload, revision
+
+    def submit(self, file_no, user_id, form_data, target_folder, applicant_name, score,
+               previous_folder=None, base_revision=None, request_bytes=0):
+        """
+        Buffers one autosave and returns (report id, new revision).
+
+        With `base_revision` set (a delta save) the save is only accepted if
+        that is still the current revision; otherwise RevisionConflict is
+        raised and the client resends its full payload.
+        """
+        entry = self._entry(file_no, user_id, form_data, target_folder, applicant_name, score, previous_folder)
+        with self.locked(file_no):
+            revision = self.state(file_no)[1]
+            if base_revision is not None and base_revision != revision:
+                self.conflicts += 1
+                raise RevisionConflict(revision)
+            entry["revision"] = revision + 1
+            cache.set(ENTRY_KEY.format(file_no), entry, timeout=ENTRY_TTL)
+        self.submits += 1
+        self.delta_saves += base_revision is not None
+        self.bytes_received += request_bytes
+
+        report_id = self._report_id(file_no)
+        if report_id is None:
+            # First save for this file number: create the row now so the client gets its id
+            return self.flush(file_no), entry["revision"]
+
+        now = time.time()
+        with self._cond:
+            first_at, _ = self._pending.get(file_no, (now, now))
+            self._pending[file_no] = (first_at, now)
+            self._cond.notify()
+        return report_id, entry["revision"]
+
+    def save_direct(self, file_no, user_id, form_data, target_folder, applicant_name, score,
+                    previous_folder=None, base_revision=None):
+        """
+        submit() without Redis: writes straight to SiteVisitReport, as
+        auto_save_api did before the buffer. Returns (report id, new revision).
+        """
+        from .models import SiteVisitReport
+        entry = self._entry(file_no, user_id, form_data, target_folder, applicant_name, score, previous_folder)
+        with self._lock_for(file_no):
+            revision = SiteVisitReport.objects.filter(office_file_no=file_no) \
+                .values_list("revision", flat=True).first() or 0
+            if base_revision is not None and base_revision != revision:
+                self.conflicts += 1
+                raise RevisionConflict(revision)
+            entry["revision"] = revision + 1
+            return self._write(entry), entry["revision"]
+
+    def _entry(self, file_no, user_id, form_data, target_folder, applicant_name, score, previous_folder):
+        entry = {
+            "file_no": file_no,
+            "user_id": user_id,
+            "form_data": form_data,
+            "target_folder": target_folder,
+            "previous_folder": previous_folder,  # Set when the save was redirected to another folder
+            "applicant_name": applicant_name,
+            "completion_score": score,
+            "saved_at": time.time(),
+        }
+        entry["digest"] = payload_digest(entry)
+        return entry
+
+    def _report_id(self, file_no):
+        report_id = cache.get(REPORT_ID_KEY.format(file_no))
+        if report_id is None:
+            from .models import SiteVisitReport
+            report_id = SiteVisitReport.objects.filter(office_file_no=file_no).values_list("id", flat=True).first()
+            if report_id is not None:
+                cache.set(REPORT_ID_KEY.format(file_no), report_id, timeout=None)
+        return report_id
+
+    def _lock_for(self, file_no):
+        with self._cond:
+            return self._flush_locks.setdefault(file_no, threading.RLock())
+
+    def flush(self, file_no):
+        """Writes the buffered autosave for `file_no`, if any is newer than the DB. Returns the report id."""
+        return self._flush(file_no)[0]
+
+    def flush_report(self, report):
+        """
+        flush() for a SiteVisitReport that is already loaded (e.g. looked up by
+        folder), reloading it if the flush wrote anything. Returns `report`.
+        """
+        if report is not None and self._flush(report.office_file_no)[1]:
+            report.refresh_from_db()
+        return report
+
+    def _flush(self, file_no):
+        """(report id, whether the row was written)."""
+        if not file_no:
+            return None, False
+        with self._cond:
+            self._pending.pop(file_no, None)
+
+        from .models import SiteVisitReport
+        with self.locked(file_no):
+            values = cache.get_many([ENTRY_KEY.format(file_no), DIGEST_KEY.format(file_no)])
+            entry = values.get(ENTRY_KEY.format(file_no))
+            if entry is None:
+                return cache.get(REPORT_ID_KEY.format(file_no)), False
+            revision = entry.get("revision", 0)
+            written = values.get(DIGEST_KEY.format(file_no))  # (digest, revision) of the last write
+            same_content = isinstance(written, (list, tuple)) and written[0] == entry["digest"]
+            if same_content and written[1] == revision:
+                self.skipped += 1
+                return self._report_id(file_no), False
+
+            row_revision = SiteVisitReport.objects.filter(office_file_no=file_no) \
+                .values_list("revision", flat=True).first()
+            if row_revision is not None and row_revision > revision:
+                # The row was saved some other way (save_feedback, save_direct) after this draft
+                print(f"Autosave: dropped stale draft for {file_no} (revision {revision} < {row_revision})")
+                cache.delete(ENTRY_KEY.format(file_no))
+                return self._report_id(file_no), False
+
+            if same_content:
+                self.skipped += 1
+                # Same content under a newer revision: only move the row's counter, so
+                # delta clients still match once this entry has aged out of the cache
+                SiteVisitReport.objects.filter(office_file_no=file_no).update(revision=revision)
+                cache.set(DIGEST_KEY.format(file_no), (entry["digest"], revision), timeout=None)
+                return self._report_id(file_no), True
+
+            report_id = self._write(entry)
+            cache.set_many({
+                DIGEST_KEY.format(file_no): (entry["digest"], revision),
+                REPORT_ID_KEY.format(file_no): report_id,
+            }, timeout=None)
+            return report_id, True
+
+    def forget(self, file_no):
+        """Drops any buffered autosave after form_data for `file_no` was written some other way."""
+        with self._cond:
+            self._pending.pop(file_no, None)
+        cache.delete_many([ENTRY_KEY.format(file_no), DIGEST_KEY.format(file_no)])
+
+    def _write(self, entry):
+        from .models import SiteVisitReport, ReportSketch
+
+        # Sketch strokes go to ReportSketch.strokes; the row keeps references
+        form_data, packed_strokes = split_vectors(entry["form_data"])
+
+        # We use update_or_create using 'office_file_no' as the ONLY lookup field.
+        # This prevents duplicate records for the same file number.
+        report, created = SiteVisitReport.objects.update_or_create(
+            office_file_no=entry["file_no"],
+            defaults={
+                'user_id': entry["user_id"],  # Update the user ownership to the last person who saved
+                'target_folder': entry["target_folder"],
+                'form_data': form_data,
+                'applicant_name': entry["applicant_name"],
+                'completion_score': entry["completion_score"],
+                'revision': entry.get("revision", 0),
+            }
+        )
+
+        # If we moved folders, ensure no lingering drafts exist under the old folder name
+        if entry["previous_folder"] is not None:
+            SiteVisitReport.objects.filter(
+                user_id=entry["user_id"],
+                target_folder=entry["previous_folder"]
+            ).exclude(id=report.id).delete()
+
+        # If a user cleared the canvas, delete backing records so they don't resurrect on reload
+        images_data = entry["form_data"].get('images', {}) or {}
+        vectors_data = entry["form_data"].get('vectors', {}) or {}
+        cleared = [key for key in set(images_data) | set(vectors_data)
+                   if not images_data.get(key) and not vectors_data.get(key)]
+        if cleared:
+            ReportSketch.objects.filter(report=report, source_key__in=cleared).delete()
+        store_strokes(report, packed_strokes)
+
+        self.writes += 1
+        self.bytes_written += len(json.dumps(form_data, separators=(",", ":"), default=str))
+        return report.id
+
+    def _recover(self):
+        """Queues entries left in Redis by a worker that died before flushing them."""
+        iter_keys = getattr(cache, "iter_keys", None)  # django_redis only
+        if iter_keys is None:
+            return
+        try:
+            now = time.time()
+            for key in iter_keys(ENTRY_KEY.format("*")):
+                self._pending[key[len(ENTRY_KEY.format("")):]] = (now, now)
+        except Exception as e:
+            print(f"Autosave recovery skipped: {e}")
+
+    def _due(self, now):
+        with self._cond:
+            return [file_no for file_no, (first_at, last_at) in self._pending.items()
+                    if now - last_at >= self.DEBOUNCE or now - first_at >= self.MAX_DELAY]
+
+    def _run_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait(timeout=1)
+            for file_no in self._due(time.time()):
+                try:
+                    self.flush(file_no)
+                except Exception as e:
+                    print(f"Autosave flush error for {file_no}: {e}")
+                    with self._cond:
+                        self._pending.setdefault(file_no, (time.time(), time.time()))  # Retry next window
+                finally:
+                    close_old_connections()
+
+    def metrics(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "submits": self.submits,
+            "delta_saves": self.delta_saves,
+            "conflicts": self.conflicts,
+            "writes": self.writes,
+            "skipped_unchanged": self.skipped,
+            # Request bytes vs form_data bytes rewritten into SiteVisitReport
+            "bytes_received": self.bytes_received,
+            "bytes_written": self.bytes_written,
+        }
+
+
+autosave_buffer = AutosaveBuffer()
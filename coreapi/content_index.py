@@ -0,0 +1,204 @@
+import os
+import time
+from functools import partial
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from . import search_index
+from .utils import TokenBucket
+from .text_extract import extract_text_from_docx, extract_text_from_excel, extract_text_from_pdf, MAX_EXCEL_CELLS
+
+EXTRACTORS = {
+    ".pdf": extract_text_from_pdf,
+    ".docx": extract_text_from_docx,
+    ".xlsx": partial(extract_text_from_excel, max_cells=MAX_EXCEL_CELLS),
+    ".xlsm": partial(extract_text_from_excel, max_cells=MAX_EXCEL_CELLS),
+}
+MAX_FILE_BYTES = 50 * 1024 * 1024   # Skip huge scans / exports
+MAX_TEXT_CHARS = 200000             # Plenty for search; keeps the DB small
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_at REAL NOT NULL,
+    error TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(
+    name, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_local = threading.local()
+
+
+def _connect():
+    """One connection per thread (sqlite3 objects can't be shared across threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(settings.CONTENT_INDEX_DB), exist_ok=True)
+        conn = sqlite3.connect(settings.CONTENT_INDEX_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")  # Searches don't block the extractor's writes
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _fts_query(q):
+    """User text -> FTS5 query: every word must match, the last one as a prefix."""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_content(q, limit=50):
+    """[{path, name, snippet}] of indexed documents whose text matches `q`, best first."""
+    match = _fts_query(q)
+    if not match:
+        return []
+    rows = _connect().execute(
+        """
+        SELECT docs.path, doc_text.name, snippet(doc_text, 1, '<b>', '</b>', '…', 12)
+        FROM doc_text JOIN docs ON docs.id = doc_text.rowid
+        WHERE doc_text MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """,
+        (match, limit),
+    ).fetchall()
+    return [{"path": path, "name": name, "snippet": snippet} for path, name, snippet in rows]
+
+
+def get_content_stats():
+    conn = _connect()
+    docs, errors = conn.execute("SELECT COUNT(*), COUNT(error) FROM docs").fetchone()
+    return {"documents": docs, "errors": errors}
+
+
+class ContentIndexer:
+    """
+    Keeps a full-text (SQLite FTS5) index of document contents in sync with
+    the search index.
+
+    On every new index generation it lists the PDFs, DOCX and XLSX/XLSM files,
+    skips those whose stored mtime still matches (no disk access), stat()s
+    the rest and re-extracts only when mtime or size moved. Rows for files
+    that left the index are deleted. Extraction reads from Google Drive, so
+    it runs under an ops/sec budget and only in the process that owns the
+    drive scan. PDFs contribute their embedded text layer; scanned pages are
+    left to analyze_file's OCR.
+
+    The extractors run in a child process, so their PyMuPDF work never
+    competes for the web threads' FITZ_LOCK, and a file that crashes a
+    parser takes down only the child.
+    """
+
+    def __init__(self):
+        self.budget = TokenBucket(rate=2, burst=4)
+        self._generation = None
+        self.extracted = 0
+        self.failed = 0
+        self.last_run = None
+        self._pool = None
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+            print(">> Background Task: Content Indexer Started")
+
+    def _candidates(self):
+        files = search_index.get_index().get("files", [])
+        found = {}
+        for i in range(len(files)):
+            name = files.name(i)
+            ext = os.path.splitext(name)[1].lower()
+            if ext in EXTRACTORS and not name.startswith("~$"):
+                found[files.path(i)] = (name, ext, files.mtimes[i])
+        return found
+
+    def _extract_text(self, ext, abs_path):
+        if self._pool is None:
+            # spawn: a forked child would inherit locks other threads hold at the time
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return self._pool.submit(EXTRACTORS[ext], abs_path).result()
+        except BrokenProcessPool:
+            self._pool = None  # Start a fresh child for the next file
+            raise
+
+    def _extract(self, conn, rel_path, name, ext, known):
+        abs_path = os.path.join(settings.DOCUMENTS_ROOT, rel_path)
+        self.budget.acquire()
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return
+        if known is not None and known[1] == st.st_mtime and known[2] == st.st_size:
+            conn.execute("UPDATE docs SET mtime = ? WHERE id = ?", (st.st_mtime, known[0]))
+            return
+
+        text, error = "", None
+        if st.st_size > MAX_FILE_BYTES:
+            error = "too large"
+        else:
+            self.budget.acquire()
+            try:
+                text = self._extract_text(ext, abs_path)[:MAX_TEXT_CHARS]
+                self.extracted += 1
+            except Exception as e:
+                error = str(e)[:200]
+                self.failed += 1
+
+        with conn:
+            if known is not None:
+                conn.execute("DELETE FROM doc_text WHERE rowid = ?", (known[0],))
+                conn.execute("DELETE FROM docs WHERE id = ?", (known[0],))
+            cur = conn.execute(
+                "INSERT INTO docs (path, mtime, size, indexed_at, error) VALUES (?, ?, ?, ?, ?)",
+                (rel_path, st.st_mtime, st.st_size, time.time(), error),
+            )
+            conn.execute("INSERT INTO doc_text (rowid, name, body) VALUES (?, ?, ?)", (cur.lastrowid, name, text))
+
+    def run_once(self):
+        conn = _connect()
+        candidates = self._candidates()
+        known = {path: (doc_id, mtime, size)
+                 for doc_id, path, mtime, size in conn.execute("SELECT id, path, mtime, size FROM docs")}
+
+        gone = [known[path][0] for path in known.keys() - candidates.keys()]
+        with conn:
+            for doc_id in gone:
+                conn.execute("DELETE FROM doc_text WHERE rowid = ?", (doc_id,))
+                conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+        # Newest first, so fresh uploads become searchable before the backlog
+        todo = sorted(candidates.items(), key=lambda item: item[1][2], reverse=True)
+        for rel_path, (name, ext, index_mtime) in todo:
+            row = known.get(rel_path)
+            if row is not None and row[1] == index_mtime:
+                continue  # Unchanged since last extraction
+            self._extract(conn, rel_path, name, ext, row)
+        conn.commit()
+        self.last_run = time.time()
+
+    def _run_loop(self):
+        while True:
+            try:
+                if search_index.updater.role in ("leader", "standalone") \
+                        and search_index.FILE_INDEX is not None \
+                        and search_index.GENERATION != self._generation:
+                    self._generation = search_index.GENERATION
+                    self.run_once()
+            except Exception as e:
+                print(f"Error in content indexer: {e}")
+            time.sleep(60)
+
+
+content_indexer = ContentIndexer()
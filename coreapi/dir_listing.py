@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+FolderItem = namedtuple("FolderItem", "name mtime")
+FileItem = namedtuple("FileItem", "name rel_path size mtime")
+Listing = namedtuple("Listing", "folders files")
+
+SKIP_RECURSIVE = ('desktop.ini', '.ds_store')
+
+
+class DirectoryListingCache:
+    """
+    Stat-once, pre-sorted directory listings for the file browser.
+
+    Every entry is stat()-ed exactly once when the listing is built (on a
+    thread pool for large folders, since each stat is a round trip on the
+    Drive mount), then folders and files are sorted newest first. The result
+    is cached against the directory's mtime for TTL seconds, so page=2,3,...
+    are served by slicing the cached listing after a single stat() of the
+    directory. Creating, deleting or renaming an entry moves the directory
+    mtime and drops the listing immediately; in-place edits show up once the
+    TTL expires. Recursive listings only watch the top directory's mtime, so
+    they rely on the TTL for changes further down.
+    """
+
+    TTL = 30
+    MAX_ENTRIES = 256
+    PARALLEL_THRESHOLD = 64   # Below this, a pool costs more than it saves
+    STAT_WORKERS = 8
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.STAT_WORKERS, thread_name_prefix="dir-stat")
+        self.hits = 0
+        self.misses = 0
+
+    def _stat_all(self, paths):
+        def safe_stat(path):
+            try:
+                return os.stat(path)
+            except OSError:
+                return None  # Vanished between listing and stat
+
+        if len(paths) < self.PARALLEL_THRESHOLD:
+            return [safe_stat(p) for p in paths]
+        return list(self._pool.map(safe_stat, paths))
+
+    def _build(self, abs_path, base, recursive):
+        folder_names = []
+        file_names = []
+        file_paths = []
+        if recursive:
+            for root, dirs, files in os.walk(abs_path):
+                for name in files:
+                    if name.lower() in SKIP_RECURSIVE:
+                        continue
+                    file_names.append(name)
+                    file_paths.append(os.path.join(root, name))
+        else:
+            with os.scandir(abs_path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        folder_names.append(entry.name)
+                    else:
+                        file_names.append(entry.name)
+                        file_paths.append(entry.path)
+
+        folder_stats = self._stat_all([os.path.join(abs_path, n) for n in folder_names])
+        file_stats = self._stat_all(file_paths)
+
+        folders = [FolderItem(name, st.st_mtime)
+                   for name, st in zip(folder_names, folder_stats) if st is not None]
+        files = [FileItem(name, os.path.relpath(path, base).replace('\\', '/'), st.st_size, st.st_mtime)
+                 for name, path, st in zip(file_names, file_paths, file_stats) if st is not None]
+
+        # Sort by MTime Descending
+        folders.sort(key=lambda item: item.mtime, reverse=True)
+        files.sort(key=lambda item: item.mtime, reverse=True)
+        return Listing(folders, files)
+
+    def get_listing(self, abs_path, base, recursive=False):
+        """Sorted Listing of `abs_path`; file rel_paths are relative to `base`."""
+        key = (os.path.normpath(abs_path), recursive)
+        dir_mtime = os.stat(abs_path).st_mtime
+        now = time.time()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == dir_mtime and now - cached[1] < self.TTL:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+        self.misses += 1
+
+        listing = self._build(abs_path, base, recursive)
+        with self._lock:
+            self._cache[key] = (dir_mtime, now, listing)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return listing
+
+    def invalidate(self, abs_path):
+        key = os.path.normpath(abs_path)
+        with self._lock:
+            self._cache.pop((key, False), None)
+            self._cache.pop((key, True), None)
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+listing_cache = DirectoryListingCache()
+get_listing = listing_cache.get_listing
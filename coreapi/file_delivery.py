@@ -0,0 +1,141 @@
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeFile:
+    """
+    File object clipped to [start, end). Seekable on purpose: waitress (and
+    any server with a real wsgi.file_wrapper) then streams it straight from
+    the file on its own I/O loop using Content-Length, instead of tying up an
+    app thread; servers that just iterate get a bounded read().
+    """
+
+    def __init__(self, f, start, end):
+        self._f = f
+        self._end = end
+        self.name = f.name
+        f.seek(start)
+
+    def read(self, size=-1):
+        remaining = max(0, self._end - self._f.tell())
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self._f.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_END:
+            return self._f.seek(self._end + offset)
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+
+def _parse_range(header, size):
+    """(start, end) half-open for a single "bytes=" range, None to serve everything, or False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Multiple ranges / other units: a full 200 is always allowed
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)  # bytes=-N: the last N bytes
+        if length == 0:
+            return False
+        return max(0, size - length), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _accel_response(full_path):
+    """Hands delivery to the front proxy if FILE_DELIVERY_MODE asks for it, else None."""
+    mode = getattr(settings, 'FILE_DELIVERY_MODE', None)
+    if mode == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        return response
+    if mode == 'x-accel':
+        base = os.path.normpath(settings.DOCUMENTS_ROOT)
+        if not full_path.startswith(base + os.sep):
+            return None  # Proxy only knows DOCUMENTS_ROOT; serve anything else ourselves
+        rel_path = os.path.relpath(full_path, base).replace('\\', '/')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.FILE_DELIVERY_ACCEL_PREFIX + quote(rel_path)
+        return response
+    return None
+
+
+def serve_path(request, full_path, content_type=None):
+    """
+    Streams a file with HTTP caching and byte-range support:
+      - ETag (mtime + size) / Last-Modified, answering If-None-Match and
+        If-Modified-Since with 304
+      - single "Range: bytes=" requests as 206 (If-Range respected), 416 if
+        unsatisfiable
+      - the body goes through FileResponse, i.e. wsgi.file_wrapper
+    With FILE_DELIVERY_MODE = "x-accel" / "x-sendfile" only headers are
+    returned and the front proxy sends the bytes (and handles ranges).
+    Raises OSError if the file can't be read; callers keep their own 404s.
+    """
+    st = os.stat(full_path)
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    if content_type is None:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if response is None:
+        response = _accel_response(full_path)
+        if response is not None:
+            response['Content-Type'] = content_type
+
+    if response is None:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and _if_range_matches(request, etag, st.st_mtime):
+            byte_range = _parse_range(range_header, st.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{st.st_size}'
+            return response
+
+        f = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(f, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = FileResponse(_RangeFile(f, start, end), content_type=content_type, status=206)
+            response['Content-Length'] = end - start
+            response['Content-Range'] = f'bytes {start}-{end - 1}/{st.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(st.st_mtime)
+    # Revalidate every time: a 304 costs one stat(), and edits show up immediately
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
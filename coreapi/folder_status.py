@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict
+from . import search_index
+from .utils import build_case_folder_info, scan_case_files, summarize_case_files
+
+
+class CaseStatusEngine:
+    """
+    Cached TAT/status lookups for case folders.
+
+    get_case_folder_info() does a scandir plus a stat() per file on every
+    call. Here each folder's file summary is cached against its directory
+    mtime. The mtime comes from the search index fingerprints when the
+    folder is indexed (zero disk I/O), otherwise from a single stat().
+    The cache entry is replaced as soon as that mtime moves. The status
+    itself is cheap and time-dependent (PENDING turns OUT OF TAT), so it is
+    recomputed from the cached summary on every lookup.
+    """
+
+    MAX_ENTRIES = 20000
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fingerprint(self, abs_path):
+        """(dir mtime, files or None). Files are only returned when the index had them for free."""
+        rel_dir = search_index._to_rel(abs_path)
+        node = search_index.get_dir_node(rel_dir) if rel_dir is not None else None
+        if node is not None:
+            return node["mtime"], node
+        try:
+            return os.stat(abs_path).st_mtime, None
+        except OSError:
+            return None, None
+
+    def _summary(self, abs_path):
+        key = os.path.normpath(abs_path)
+        mtime, node = self._fingerprint(abs_path)
+        if mtime is None:
+            self.invalidate(abs_path)
+            return None
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+        self.misses += 1
+
+        if node is not None:
+            summary = summarize_case_files(zip(node["files"], node["file_mtimes"]))
+        else:
+            files = scan_case_files(abs_path)
+            if files is None:
+                return None
+            summary = summarize_case_files(files)
+
+        with self._lock:
+            self._cache[key] = (mtime, summary)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return summary
+
+    def get_status(self, abs_path, db_created_at=None):
+        """Drop-in replacement for get_case_folder_info()."""
+        summary = self._summary(abs_path)
+        if summary is None:
+            return None
+        return build_case_folder_info(abs_path, summary, db_created_at)
+
+    def get_statuses(self, items):
+        """
+        Batched lookup. `items` is an iterable of abs paths or
+        (abs_path, db_created_at) pairs; returns {abs_path: info or None}.
+        """
+        results = {}
+        for item in items:
+            abs_path, db_created_at = item if isinstance(item, tuple) else (item, None)
+            results[abs_path] = self.get_status(abs_path, db_created_at)
+        return results
+
+    def invalidate(self, abs_path):
+        with self._lock:
+            self._cache.pop(os.path.normpath(abs_path), None)
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+status_engine = CaseStatusEngine()
+get_status = status_engine.get_status
+get_statuses = status_engine.get_statuses
@@ -0,0 +1,94 @@
+from array import array
+from itertools import accumulate
+
+
+class ColumnarEntries:
+    """
+    Read-only, list-like view over index entries stored column by column.
+
+    Instead of one dict per entry (name, full relative path, float), we keep:
+      dirs     - interned table of parent directory paths (shared per generation)
+      parents  - array('i') of indexes into `dirs`
+      mtimes   - array('d')
+      names    - one UTF-8 buffer plus array('I') offsets into it
+
+    Indexing, slicing and iteration still produce the {"name", "path", "mtime"}
+    dicts existing callers expect; they are built on access, so mutating them
+    never touches the index.
+    """
+
+    __slots__ = ("dirs", "parents", "mtimes", "_names", "_offsets")
+
+    def __init__(self, dirs, parents, names, mtimes):
+        encoded = [name.encode("utf-8") for name in names]
+        self.dirs = dirs
+        self.parents = parents
+        self.mtimes = mtimes
+        self._names = b"".join(encoded)
+        self._offsets = array("I", [0])
+        self._offsets.extend(accumulate(map(len, encoded)))
+
+    def __len__(self):
+        return len(self.mtimes)
+
+    def name(self, i):
+        return self._names[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def path(self, i):
+        parent = self.dirs[self.parents[i]]
+        name = self.name(i)
+        return f"{parent}/{name}" if parent else name
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("index entry out of range")
+        name = self.name(i)
+        parent = self.dirs[self.parents[i]]
+        return {
+            "name": name,
+            "path": f"{parent}/{name}" if parent else name,
+            "mtime": self.mtimes[i]
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def nbytes(self, include_dirs=True):
+        """Approximate heap size of the columns (the dir table is shared between kinds)."""
+        size = (self.parents.itemsize * len(self.parents)
+                + self.mtimes.itemsize * len(self.mtimes)
+                + self._offsets.itemsize * len(self._offsets)
+                + len(self._names))
+        if include_dirs:
+            size += sum(len(d) + 49 for d in self.dirs) + 8 * len(self.dirs)
+        return size
+
+
+class ColumnBuilder:
+    """Collects entries for one kind while a generation is assembled."""
+
+    def __init__(self):
+        self.parents = array("i")
+        self.mtimes = array("d")
+        self.names = []
+
+    def add(self, dir_id, name, mtime):
+        self.parents.append(dir_id)
+        self.mtimes.append(mtime)
+        self.names.append(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def truncate(self, n):
+        del self.parents[n:]
+        del self.mtimes[n:]
+        del self.names[n:]
+
+    def build(self, dirs):
+        return ColumnarEntries(dirs, self.parents, self.names, self.mtimes)
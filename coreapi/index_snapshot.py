@@ -0,0 +1,144 @@
+import os
+import mmap
+import struct
+import time
+from array import array
+
+# On-disk layout of the search index snapshot (all little-endian):
+#
+#   header       HEADER
+#   dir records  n_dirs  x RECORD  (parent dir id, name id, mtime)   - BFS order, root first
+#   file records n_files x RECORD  (dir id, name id, mtime)          - grouped by dir
+#   root         root_len bytes, UTF-8
+#   string table blob_len bytes, UTF-8 names joined by "\0"
+#
+# Records are fixed width and sit right after the header, so the file can be
+# mmap'd and unpacked in bulk without parsing. Names are interned: repeated
+# names like "site_report.pdf" are stored once.
+
+MAGIC = b"VIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIId")
+RECORD = struct.Struct("<iid")
+
+# Mtime stored for a folder that was listed by its parent but could not be read
+UNREAD_DIR = -1.0
+
+
+def dump_snapshot(root, state):
+    """Serializes the search index fingerprint table ({rel_dir: node}) to bytes."""
+    strings = {}
+
+    def intern(name):
+        sid = strings.get(name)
+        if sid is None:
+            sid = strings[name] = len(strings)
+        return sid
+
+    if "" not in state:
+        return b""
+
+    dir_records = [RECORD.pack(-1, intern(""), state[""]["mtime"])]
+    file_records = []
+    order = [""]
+    i = 0
+    while i < len(order):
+        rel_dir = order[i]
+        dir_id = i
+        node = state[rel_dir]
+        for name in node["folders"]:
+            child = f"{rel_dir}/{name}" if rel_dir else name
+            child_node = state.get(child)
+            order.append(child if child_node is not None else None)
+            dir_records.append(RECORD.pack(dir_id, intern(name), child_node["mtime"] if child_node else UNREAD_DIR))
+        for name, mtime in zip(node["files"], node["file_mtimes"]):
+            file_records.append(RECORD.pack(dir_id, intern(name), mtime))
+        i += 1
+        # Skip placeholders for folders we could not read
+        while i < len(order) and order[i] is None:
+            i += 1
+
+    root_bytes = root.encode("utf-8")
+    blob = "\0".join(strings).encode("utf-8")
+
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, 0, len(root_bytes), len(blob),
+                    len(dir_records), len(file_records), time.time()),
+        b"".join(dir_records),
+        b"".join(file_records),
+        root_bytes,
+        blob,
+    ])
+
+
+def write_snapshot(path, root, state):
+    """
+    Writes the snapshot to `path`. Written to a temp file and swapped in,
+    so readers never see a partial file.
+    """
+    data = dump_snapshot(root, state)
+    if not data:
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def parse_snapshot(buf, root):
+    """
+    Loads a snapshot (bytes or an mmap) back into a fingerprint table.
+    Returns None if it is from another version or for another root.
+    """
+    if len(buf) < HEADER.size:
+        return None
+    magic, version, _, root_len, blob_len, n_dirs, n_files, _ = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    dirs_at = HEADER.size
+    files_at = dirs_at + n_dirs * RECORD.size
+    root_at = files_at + n_files * RECORD.size
+    blob_at = root_at + root_len
+
+    if buf[root_at:blob_at].decode("utf-8") != root:
+        return None
+    names = buf[blob_at:blob_at + blob_len].decode("utf-8").split("\0")
+
+    with memoryview(buf) as view:
+        dir_rows = list(RECORD.iter_unpack(view[dirs_at:files_at]))
+        file_rows = list(RECORD.iter_unpack(view[files_at:root_at]))
+
+    paths = []
+    nodes = []
+    state = {}
+    for parent, name_id, mtime in dir_rows:
+        if parent < 0:
+            rel_dir = ""
+        else:
+            rel_dir = f"{paths[parent]}/{names[name_id]}" if paths[parent] else names[name_id]
+            if nodes[parent] is not None:
+                nodes[parent]["folders"].append(names[name_id])
+        node = {"mtime": mtime, "folders": [], "files": [], "file_mtimes": array("d")} if mtime != UNREAD_DIR else None
+        paths.append(rel_dir)
+        nodes.append(node)
+        if node is not None:
+            state[rel_dir] = node
+
+    for dir_id, name_id, mtime in file_rows:
+        node = nodes[dir_id]
+        node["files"].append(names[name_id])
+        node["file_mtimes"].append(mtime)
+
+    return state
+
+
+def read_snapshot(path, root):
+    """Memory-maps the snapshot file at `path` and parses it. None if missing or stale."""
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_snapshot(mm, root)
@@ -0,0 +1,159 @@
+import copy
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _split(pointer):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid pointer: {pointer!r}")
+    return [_unescape(token) for token in pointer[1:].split("/")]
+
+
+def _index(container, token, allow_end=False):
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _child(node, token):
+    if isinstance(node, dict):
+        if token not in node:
+            raise PatchError(f"Missing key: {token!r}")
+        return token, node[token]
+    if isinstance(node, list):
+        index = _index(node, token)
+        return index, node[index]
+    raise PatchError(f"Cannot descend into {type(node).__name__}")
+
+
+def _resolve(doc, tokens):
+    for token in tokens:
+        doc = _child(doc, token)[1]
+    return doc
+
+
+def _writable(doc, tokens, fresh):
+    """
+    Container at `tokens`, shallow-copying every container on the way
+    (once; `fresh` holds the ids of copies already made), so writes never
+    reach the caller's document and untouched branches are shared, not copied.
+    """
+    node = doc
+    for token in tokens:
+        key, child = _child(node, token)
+        if isinstance(child, (dict, list)) and id(child) not in fresh:
+            child = copy.copy(child)
+            fresh.add(id(child))
+            node[key] = child
+        node = child
+    return node
+
+
+def _add(doc, tokens, value, fresh):
+    if not tokens:
+        return value
+    parent = _writable(doc, tokens[:-1], fresh)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add into {type(parent).__name__}")
+    return doc
+
+
+def _remove(doc, tokens, fresh):
+    if not tokens:
+        raise PatchError("Cannot remove the whole document")
+    parent = _writable(doc, tokens[:-1], fresh)
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"Missing key: {key!r}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    raise PatchError(f"Cannot remove from {type(parent).__name__}")
+
+
+def apply_patch(doc, patch):
+    """
+    Applies an RFC 6902 JSON Patch and returns the result; `doc` is left
+    untouched. Only containers on patched paths are copied, so a one-field
+    patch to a large form costs about as much as the path is deep.
+    Raises PatchError on any bad operation.
+    """
+    if not isinstance(patch, list):
+        raise PatchError("Patch must be a list of operations")
+    doc = copy.copy(doc)
+    fresh = {id(doc)}
+    for op in patch:
+        try:
+            kind, tokens = op["op"], _split(op["path"])
+        except (KeyError, TypeError):
+            raise PatchError(f"Malformed operation: {op!r}")
+
+        if kind == "add":
+            doc = _add(doc, tokens, op.get("value"), fresh)
+        elif kind == "remove":
+            _remove(doc, tokens, fresh)
+        elif kind == "replace":
+            _resolve(doc, tokens)  # Target must exist
+            if tokens:
+                _remove(doc, tokens, fresh)
+            doc = _add(doc, tokens, op.get("value"), fresh)
+        elif kind in ("move", "copy"):
+            source = _split(op.get("from", ""))
+            if kind == "move" and tokens[:len(source)] == source and tokens != source:
+                raise PatchError("Cannot move a value into itself")
+            value = _remove(doc, source, fresh) if kind == "move" else copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, tokens, value, fresh)
+        elif kind == "test":
+            if _resolve(doc, tokens) != op.get("value"):
+                raise PatchError(f"Test failed at {op['path']!r}")
+        else:
+            raise PatchError(f"Unknown op: {kind!r}")
+    return doc
+
+
+def make_patch(old, new, path=""):
+    """
+    Patch turning `old` into `new` (the same diff feedback.html sends):
+    dicts are diffed key by key, a list that only grew gets one "add" per
+    new item at "/-", and anything else is replaced whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(new) > len(old) and new[:len(old)] == old:
+        return [{"op": "add", "path": f"{path}/-", "value": item} for item in new[len(old):]]
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
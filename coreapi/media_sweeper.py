@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from . import search_index
+
+REPORT_KEY = "sketch_sweeper:last_report"
+
+
+class SketchMediaSweeper:
+    """
+    Deletes sketch images under MEDIA_ROOT that no ReportSketch or
+    SiteVisitReport points at any more: files left by re-saved, cleared or
+    deleted sketches.
+
+    Runs once a day in the process that owns the drive scan. Files younger
+    than GRACE_SECONDS are left alone, so an image written by a save that
+    has not committed its row yet is never taken. Each run's report (files
+    scanned, orphans removed, bytes freed) is printed and kept in the cache.
+    """
+
+    DIRECTORIES = ("note_sketches", "main_sketches")
+    GRACE_SECONDS = 3600
+    INTERVAL = 86400
+
+    def __init__(self):
+        self.last_report = None
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+            print(">> Background Task: Sketch Media Sweeper Started")
+
+    def _referenced(self):
+        from .models import ReportSketch, SiteVisitReport
+        names = set(ReportSketch.objects.exclude(image='').values_list('image', flat=True))
+        names.update(SiteVisitReport.objects.exclude(main_sketch='').exclude(main_sketch__isnull=True)
+                     .values_list('main_sketch', flat=True))
+        return {os.path.normpath(name) for name in names}
+
+    def sweep(self, dry_run=False):
+        started = time.time()
+        report = {"files_scanned": 0, "orphans": 0, "bytes_freed": 0, "errors": 0, "dry_run": dry_run}
+        referenced = self._referenced()
+        cutoff = started - self.GRACE_SECONDS
+
+        for directory in self.DIRECTORIES:
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            try:
+                entries = list(os.scandir(root))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                report["files_scanned"] += 1
+                if os.path.normpath(os.path.join(directory, entry.name)) in referenced:
+                    continue
+                try:
+                    st = entry.stat()
+                    if st.st_mtime > cutoff:
+                        continue
+                    if not dry_run:
+                        os.remove(entry.path)
+                    report["orphans"] += 1
+                    report["bytes_freed"] += st.st_size
+                except OSError as e:
+                    report["errors"] += 1
+                    print(f"Sketch sweeper could not remove {entry.path}: {e}")
+
+        report["seconds"] = round(time.time() - started, 2)
+        report["finished_at"] = time.time()
+        self.last_report = report
+        cache.set(REPORT_KEY, report, timeout=None)
+        print(f"Sketch media sweep{' (dry run)' if dry_run else ''}: {report['orphans']} orphaned of "
+              f"{report['files_scanned']} files, {report['bytes_freed'] / (1024 * 1024):.1f} MB freed "
+              f"in {report['seconds']}s")
+        return report
+
+    def _run_loop(self):
+        time.sleep(600)  # Let startup work (index load, reconcile) finish first
+        while True:
+            try:
+                if search_index.updater.role in ("leader", "standalone"):
+                    self.sweep()
+            except Exception as e:
+                print(f"Error in sketch media sweeper: {e}")
+            finally:
+                close_old_connections()
+            time.sleep(self.INTERVAL)
+
+
+sketch_sweeper = SketchMediaSweeper()
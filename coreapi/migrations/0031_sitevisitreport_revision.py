@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapi', '0030_alter_creditledger_source_documentsignature_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitevisitreport',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapi', '0031_sitevisitreport_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsketch',
+            name='strokes',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapi', '0032_reportsketch_strokes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsketch',
+            name='render_digest',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapi', '0033_reportsketch_render_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsketch',
+            name='image_digest',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapi', '0034_reportsketch_image_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportsketch',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='note_sketches/'),
+        ),
+    ]
@@ -44,6 +44,8 @@ class SiteVisitReport(models.Model):
     form_data = models.JSONField(default=dict)
     target_folder = models.CharField(max_length=500, blank=True, null=True, default="")
     completion_score = models.IntegerField(default=0)  # Stores 0 to 100
+    # Bumped on every accepted save; delta autosaves must name the revision they were diffed against
+    revision = models.PositiveIntegerField(default=0)
     # Optional: Keep this for the "Main" layout if you want it easily accessible, 
     # or you can move it to the child model too.
     main_sketch = models.ImageField(upload_to='main_sketches/', blank=True, null=True)
@@ -60,8 +62,16 @@ class ReportSketch(models.Model):
     # Stores the "Path" from your JS (e.g., "Ownership_Analysis.Ownership_Analysis_notes")
     source_key = models.CharField(max_length=255, db_index=True)
     
-    # The actual image file
-    image = models.ImageField(upload_to='note_sketches/')
+    # The actual image file (empty while a row only holds autosaved strokes)
+    image = models.ImageField(upload_to='note_sketches/', blank=True)
+
+    # Editable strokes packed by coreapi.sketch_store; form_data['vectors'] only keeps a reference.
+    # Defer this column on queries that only need the image.
+    strokes = models.BinaryField(null=True, blank=True, editable=False)
+    # sketch_render.render_digest() of the strokes `image` was rendered from; None for uploaded images
+    render_digest = models.CharField(max_length=40, blank=True, null=True)
+    # SHA-256 of the image bytes; a save sending the same image again skips the write
+    image_digest = models.CharField(max_length=64, blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -0,0 +1,113 @@
+import heapq
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from operator import itemgetter
+
+
+class NameIndex:
+    """
+    Substring index over the names of index entries (a ColumnarEntries).
+
+    Entries are ranked newest first once, at build time. Lowercased names are
+    kept in one buffer in rank order, and every trigram maps to an array of
+    ranks in that same order. A query walks the shortest posting list of its
+    trigrams, confirms each candidate with a substring check and stops at
+    `limit` hits, so top-N results come out already sorted by mtime without
+    scanning or sorting everything. Queries shorter than three characters
+    scan the buffer with bytes.find, which also yields hits in rank order.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        mtimes = entries.mtimes
+        self.order = array("i", sorted(range(len(entries)), key=mtimes.__getitem__, reverse=True))
+        self.postings = {}
+
+        lowered = []
+        postings = self.postings
+        for rank, entry_id in enumerate(self.order):
+            name = entries.name(entry_id).lower()
+            lowered.append(name.encode("utf-8"))
+            for gram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                ranks = postings.get(gram)
+                if ranks is None:
+                    ranks = postings[gram] = array("i")
+                ranks.append(rank)
+
+        # Each name is followed by a "\0" so a match can never span two names
+        self.names = b"\0".join(lowered) + b"\0"
+        self.offsets = array("I", [0])
+        self.offsets.extend(accumulate(len(n) + 1 for n in lowered))
+
+    def __len__(self):
+        return len(self.order)
+
+    def _scan(self, needle):
+        names = self.names
+        offsets = self.offsets
+        pos = names.find(needle)
+        while pos != -1:
+            rank = bisect_right(offsets, pos) - 1
+            yield rank
+            pos = names.find(needle, offsets[rank + 1])
+
+    def _probe(self, q, needle):
+        lists = []
+        for i in range(len(q) - 2):
+            ranks = self.postings.get(q[i:i + 3])
+            if ranks is None:
+                return
+            lists.append(ranks)
+
+        names = self.names
+        offsets = self.offsets
+        for rank in min(lists, key=len):
+            if names.find(needle, offsets[rank], offsets[rank + 1] - 1) != -1:
+                yield rank
+
+    def iter_ids(self, q):
+        """Ids (into `entries`) of entries whose lowercase name contains `q`, newest first."""
+        q = q.lower()
+        needle = q.encode("utf-8")
+        if not q:
+            ranks = range(len(self.order))
+        elif len(q) < 3:
+            ranks = self._scan(needle)
+        else:
+            ranks = self._probe(q, needle)
+        order = self.order
+        return (order[rank] for rank in ranks)
+
+    def search(self, q, limit=None):
+        """Entries whose lowercase name contains `q`, newest first."""
+        entries = self.entries
+        return [entries[i] for i in islice(self.iter_ids(q), limit)]
+
+
+class LayeredNameIndex:
+    """
+    Name index for a generation that differs from an earlier, fully indexed
+    one in only a few entries.
+
+    `base` is the NameIndex of that earlier generation and `dirty` the paths
+    of entries added, removed or changed since. Base hits on those paths are
+    dropped and `overlay`, a small NameIndex over their current entries,
+    supplies the replacements. Both yield newest first, so the two streams
+    are merged without sorting. A watcher delta therefore indexes a handful
+    of names instead of the whole drive.
+    """
+
+    def __init__(self, base, dirty, overlay):
+        self.base = base
+        self.dirty = dirty
+        self.overlay = overlay
+
+    def search(self, q, limit=None):
+        base_entries = self.base.entries
+        dirty = self.dirty
+        kept = (base_entries[i] for i in self.base.iter_ids(q) if base_entries.path(i) not in dirty)
+        overlay_entries = self.overlay.entries
+        fresh = (overlay_entries[i] for i in self.overlay.iter_ids(q))
+        merged = heapq.merge(kept, fresh, key=itemgetter("mtime"), reverse=True)
+        return list(islice(merged, limit))
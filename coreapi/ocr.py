@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .utils import FITZ_LOCK
+
+PDF_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
+
+BATCH_PAGES = 5           # Vision's synchronous files:annotate reads at most 5 pages per file
+MIN_TEXT_CHARS = 40       # A page with less embedded text than this is treated as a scan
+
+
+class GoogleVisionBackend:
+    """DOCUMENT_TEXT_DETECTION through Google Cloud Vision (the production backend)."""
+
+    def __init__(self):
+        from google.cloud import vision
+        self.vision = vision
+        self.client = vision.ImageAnnotatorClient()
+
+    def ocr_pdf(self, pdf_bytes):
+        """
+        Text of every page of a PDF of at most BATCH_PAGES pages, in order.
+        A page Vision reported an error for comes back as None.
+        """
+        vision = self.vision
+        request_vision = vision.AnnotateFileRequest(
+            input_config=vision.InputConfig(content=pdf_bytes, mime_type="application/pdf"),
+            features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+        )
+        response = self.client.batch_annotate_files(requests=[request_vision])
+        texts = []
+        for file_response in response.responses:
+            for page_response in file_response.responses:
+                if page_response.error.message:
+                    print(f"Vision OCR error on a page: {page_response.error.message}")
+                    texts.append(None)
+                else:
+                    texts.append(page_response.full_text_annotation.text if page_response.full_text_annotation else "")
+        return texts
+
+
+class TextLayerBackend:
+    """
+    Offline stand-in: returns whatever text layer the pages carry (empty for
+    real scans). For tests and machines without Vision credentials.
+    """
+
+    def ocr_pdf(self, pdf_bytes):
+        with FITZ_LOCK:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            texts = []
+            for page_no in range(len(doc)):
+                with FITZ_LOCK:
+                    texts.append(doc[page_no].get_text())
+            return texts
+        finally:
+            with FITZ_LOCK:
+                doc.close()
+
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_backend():
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = import_string(settings.OCR_BACKEND)()
+        return _BACKEND
+
+
+class PageTextCache:
+    """
+    Extracted text per page, keyed by the SHA-256 of the source file's
+    bytes, so a renamed or re-uploaded copy of the same title deed is still
+    a hit. One small JSON file per source under OCR_CACHE_ROOT.
+    """
+
+    def __init__(self):
+        self.root = settings.OCR_CACHE_ROOT
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + ".json")
+
+    def load(self, digest):
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                return {int(page): text for page, text in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, digest, pages):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+
+
+class _Source:
+    def __init__(self, abs_path):
+        with open(abs_path, "rb") as f:
+            data = f.read()
+        self.abs_path = abs_path
+        self.digest = hashlib.sha256(data).hexdigest()
+        with FITZ_LOCK:
+            if abs_path.lower().endswith(PDF_EXTENSIONS):
+                self.doc = fitz.open(stream=data, filetype="pdf")
+            else:
+                # Images become a one-page PDF, the same input Vision got before
+                with fitz.open(stream=data, filetype=os.path.splitext(abs_path)[1][1:].lower()) as img:
+                    self.doc = fitz.open("pdf", img.convert_to_pdf())
+            self.page_count = len(self.doc)
+        self.pages = {}
+        self.dirty = False
+
+
+def extract_text(abs_paths, backend=None, cache=None):
+    """
+    Text of every page of the given PDFs/images, in input order, plus stats.
+
+    Stage 1 hashes each file and takes pages from the cache. Stage 2 reads
+    the embedded text layer of any page that has one (digital PDFs never
+    need OCR). Stage 3 packs the remaining pages into BATCH_PAGES-page PDFs
+    and OCRs the batches concurrently. New results are written back to the
+    cache; pages the backend failed on (None) are left out so they are
+    retried on the next call.
+    """
+    backend = backend or get_backend()
+    cache = cache or PageTextCache()
+    stats = {"pages": 0, "cached": 0, "embedded": 0, "ocr": 0, "failed": 0, "batches": 0}
+
+    sources = []
+    pending = []   # (source, page number)
+    try:
+        for abs_path in abs_paths:
+            source = _Source(abs_path)
+            sources.append(source)
+            cached = cache.load(source.digest)
+            for page_no in range(source.page_count):
+                stats["pages"] += 1
+                if page_no in cached:
+                    source.pages[page_no] = cached[page_no]
+                    stats["cached"] += 1
+                    continue
+                with FITZ_LOCK:
+                    text = source.doc[page_no].get_text()
+                if len(text.strip()) >= MIN_TEXT_CHARS:
+                    source.pages[page_no] = text
+                    source.dirty = True
+                    stats["embedded"] += 1
+                else:
+                    pending.append((source, page_no))
+
+        batches = [pending[i:i + BATCH_PAGES] for i in range(0, len(pending), BATCH_PAGES)]
+
+        if batches:
+            # Build the batch PDFs up front and only parallelise the OCR calls
+            batch_pdfs = []
+            for batch in batches:
+                with FITZ_LOCK, fitz.open() as merged:
+                    for source, page_no in batch:
+                        merged.insert_pdf(source.doc, from_page=page_no, to_page=page_no)
+                    batch_pdfs.append(merged.tobytes())
+
+            workers = min(len(batches), settings.OCR_CONCURRENCY)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+                results = list(pool.map(backend.ocr_pdf, batch_pdfs))
+
+            for batch, texts in zip(batches, results):
+                for (source, page_no), text in zip(batch, texts):
+                    if text is None:
+                        # Quota/network errors are transient: leave the page uncached to retry next time
+                        stats["failed"] += 1
+                        continue
+                    source.pages[page_no] = text
+                    source.dirty = True
+                    stats["ocr"] += 1
+            stats["batches"] = len(batches)
+
+        extracted_text = []
+        for source in sources:
+            if source.dirty:
+                cache.save(source.digest, source.pages)
+            for page_no in sorted(source.pages):
+                if source.pages[page_no].strip():
+                    extracted_text.append(source.pages[page_no])
+        return extracted_text, stats
+    finally:
+        with FITZ_LOCK:
+            for source in sources:
+                source.doc.close()
@@ -0,0 +1,205 @@
+import sys
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+try:
+    from playwright.sync_api import sync_playwright, Error as PlaywrightError
+except ImportError:
+    sync_playwright = None
+    PlaywrightError = Exception
+
+BROWSER_ARGS = ["--no-sandbox", "--disable-setuid-sandbox"]
+VIEWPORT = {'width': 800, 'height': 1200}
+PDF_OPTIONS = {
+    "format": "A4",
+    "margin": {"top": "0", "bottom": "0", "left": "0", "right": "0"},
+    "print_background": True,
+    "scale": 1.0,
+    "prefer_css_page_size": False,
+}
+
+# Resolves once web fonts are in and every <img> has finished (or failed) loading
+READY_SCRIPT = """() => document.fonts.status === 'loaded'
+    && Array.from(document.images).every(img => img.complete)"""
+
+
+class PoolBusy(Exception):
+    """The render queue is full; the caller should retry later."""
+
+
+class ChromiumPool:
+    """
+    Warm headless Chromium for HTML -> PDF rendering.
+
+    Playwright's sync API is bound to the thread that started it, so each of
+    WORKERS threads owns one browser and one browser context and takes jobs
+    from a bounded queue; a job only opens (and closes) a page. Pages are
+    printed as soon as fonts and images report ready instead of after a
+    fixed sleep. A job that times out or crashes throws away its context
+    (and the browser if it died) and that worker carries on with a fresh
+    one; the other workers are unaffected. Contexts are also recycled every
+    RECYCLE_AFTER jobs to keep memory flat.
+
+    Browsers are launched on the first job, not at boot, so processes that
+    never finalize a report never pay for Chromium.
+    """
+
+    WORKERS = 2
+    QUEUE_LIMIT = 20
+    RECYCLE_AFTER = 50
+    LOAD_TIMEOUT = 60000       # ms, page.set_content
+    READY_TIMEOUT = 15000      # ms, fonts/images after "load"
+
+    def __init__(self):
+        self._jobs = queue.Queue(maxsize=self.QUEUE_LIMIT)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._timings = deque(maxlen=100)
+        self.completed = 0
+        self.failed = 0
+        self.recycled = 0
+
+    def _ensure_started(self):
+        """Starts the workers on first use, and replaces any that have died since."""
+        with self._start_lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            missing = self.WORKERS - len(self._threads)
+            if missing <= 0:
+                return
+            for i in range(missing):
+                thread = threading.Thread(target=self._worker, name=f"chromium-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            print(f">> Background Task: Chromium pool started ({missing} of {self.WORKERS} workers)")
+
+    def _worker_died(self, error):
+        """
+        Called when a worker can't run Playwright at all (e.g. the driver or
+        browser fails to start). If it was the last one alive, every queued job
+        is failed rather than left waiting; the next submit() starts new workers.
+        """
+        with self._start_lock:
+            current = threading.current_thread()
+            self._threads = [thread for thread in self._threads if thread is not current and thread.is_alive()]
+            if self._threads:
+                return
+            while True:
+                try:
+                    future = self._jobs.get_nowait()[-1]
+                except queue.Empty:
+                    break
+                if future.set_running_or_notify_cancel():
+                    self.failed += 1
+                    future.set_exception(RuntimeError(f"PDF renderer unavailable: {error}"))
+
+    def submit(self, html_content, output_path, pdf_options=None):
+        """Queues a render; returns a Future resolving to the job's timing dict. Raises PoolBusy."""
+        if sync_playwright is None:
+            raise RuntimeError("playwright is not installed")
+        future = Future()
+        job = (html_content, output_path, pdf_options or PDF_OPTIONS, time.time(), future)
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            raise PoolBusy(f"{self.QUEUE_LIMIT} PDF renders already queued")
+        # After the put: a worker dying from here on drains (fails) this job too
+        self._ensure_started()
+        return future
+
+    def render(self, html_content, output_path, pdf_options=None, timeout=180):
+        """Blocking form of submit()."""
+        return self.submit(html_content, output_path, pdf_options).result(timeout=timeout)
+
+    def _worker(self):
+        if sys.platform == 'win32':
+            # Playwright requires subprocesses, which only Proactor supports on Windows.
+            asyncio.set_event_loop(asyncio.ProactorEventLoop())
+
+        try:
+            with sync_playwright() as p:
+                self._serve(p)
+        except Exception as e:
+            print(f"Chromium worker {threading.current_thread().name} died: {e}")
+            self._worker_died(e)
+
+    def _serve(self, p):
+        """Job loop of one worker, on the thread that owns `p`."""
+        browser = None
+        context = None
+        jobs_in_context = 0
+        while True:
+            html_content, output_path, pdf_options, queued_at, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if browser is None or not browser.is_connected():
+                    browser = p.chromium.launch(args=BROWSER_ARGS)
+                    context = None
+                if context is None:
+                    context = browser.new_context(viewport=VIEWPORT)
+                    jobs_in_context = 0
+
+                timing = self._render(context, html_content, output_path, pdf_options, queued_at)
+                jobs_in_context += 1
+                self.completed += 1
+                self._timings.append(timing)
+                future.set_result(timing)
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+                # Stuck or crashed page: start this worker over with a clean context
+                jobs_in_context = self.RECYCLE_AFTER
+
+            if jobs_in_context >= self.RECYCLE_AFTER:
+                self.recycled += 1
+                try:
+                    if context is not None:
+                        context.close()
+                except PlaywrightError:
+                    browser = None  # Browser went down with it; relaunch on the next job
+                context = None
+
+    def _render(self, context, html_content, output_path, pdf_options, queued_at):
+        started = time.time()
+        page = context.new_page()
+        try:
+            page.set_content(html_content, wait_until="load", timeout=self.LOAD_TIMEOUT)
+            loaded = time.time()
+            try:
+                page.wait_for_function(READY_SCRIPT, timeout=self.READY_TIMEOUT)
+            except PlaywrightError:
+                print("PDF render: fonts/images not ready in time, printing anyway")
+            ready = time.time()
+            page.pdf(path=output_path, **pdf_options)
+            done = time.time()
+        finally:
+            page.close()
+
+        return {
+            "queued_ms": round((started - queued_at) * 1000),
+            "load_ms": round((loaded - started) * 1000),
+            "ready_ms": round((ready - loaded) * 1000),
+            "pdf_ms": round((done - ready) * 1000),
+            "total_ms": round((done - queued_at) * 1000),
+        }
+
+    def stats(self):
+        timings = list(self._timings)
+        avg = lambda field: round(sum(t[field] for t in timings) / len(timings)) if timings else None
+        return {
+            "workers": len(self._threads),
+            "queued": self._jobs.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "recycled": self.recycled,
+            "avg_queued_ms": avg("queued_ms"),
+            "avg_total_ms": avg("total_ms"),
+            "last": timings[-1] if timings else None,
+        }
+
+
+pdf_pool = ChromiumPool()
@@ -0,0 +1,152 @@
+import os
+import base64
+import threading
+import fitz  # PyMuPDF
+from .utils import FITZ_LOCK
+
+
+class FormTemplate:
+    """
+    A fillable PDF template read once into memory.
+
+    `widgets` maps field name -> [(page number, xref, rect, field type)] and
+    `page_fields` holds {field name: [widget xrefs]} for each page. Filling
+    loads only the widgets it is going to write, by xref, and skips pages
+    with nothing to fill (loading a widget is most of PyMuPDF's per-field
+    cost). Every fill opens a fresh document from the in-memory bytes; the
+    template file itself is only read again when its mtime changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self.data = f.read()
+
+        self.widgets = {}
+        self.page_fields = []
+        doc = self.open()
+        try:
+            with FITZ_LOCK:
+                page_count = len(doc)
+            for page_no in range(page_count):
+                fields = {}
+                with FITZ_LOCK:
+                    for widget in doc[page_no].widgets():
+                        name = widget.field_name
+                        fields.setdefault(name, []).append(widget.xref)
+                        self.widgets.setdefault(name, []).append(
+                            (page_no, widget.xref, tuple(widget.rect), widget.field_type)
+                        )
+                self.page_fields.append(fields)
+        finally:
+            with FITZ_LOCK:
+                doc.close()
+
+    def open(self):
+        """A fresh document from the template bytes. Takes FITZ_LOCK itself; close it under the lock."""
+        with FITZ_LOCK:
+            return fitz.open(stream=self.data, filetype="pdf")
+
+
+_TEMPLATES = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def get_template(path):
+    with _TEMPLATES_LOCK:
+        template = _TEMPLATES.get(path)
+        if template is None or template.mtime != os.stat(path).st_mtime:
+            template = _TEMPLATES[path] = FormTemplate(path)
+        return template
+
+
+def flatten_report_data(data):
+    """
+    Flattens nested report JSON into {"a.b.c": value}; leaf keys are also
+    stored bare, and every list item gets a "key.item": True entry.
+    Also returns a reverse index {list item: key of the list holding it},
+    so "is this checkbox's name inside any list" is one dict lookup.
+    """
+    flat_data = {}
+    list_index = {}
+
+    def flatten(y, prefix=""):
+        for k, v in y.items():
+            full_key = f"{prefix}.{k}" if prefix else k
+            if isinstance(v, dict):
+                flatten(v, full_key)
+            elif isinstance(v, list):
+                flat_data[full_key] = v
+                # Check items for checkboxes
+                for item in v:
+                    flat_data[f"{full_key}.{item}"] = True
+                    try:
+                        list_index.setdefault(item, full_key)
+                    except TypeError:
+                        pass  # Unhashable item, can never equal a field name
+            else:
+                flat_data[full_key] = v
+                flat_data[k] = v
+
+    flatten(data)
+    return flat_data, list_index
+
+
+def fill_form(template_path, data, images_dict, output_path):
+    """Fills the template's widgets from `data`/`images_dict` and writes a flattened PDF."""
+    template = get_template(template_path)
+    flat_data, list_index = flatten_report_data(data)
+    images = {name: b64 for name, b64 in images_dict.items() if b64 and 'base64,' in b64}
+    wanted = set(flat_data) | set(k for k in list_index if isinstance(k, str)) | set(images)
+
+    doc = template.open()
+    try:
+        for page_no, fields in enumerate(template.page_fields):
+            xrefs = [xref for name, refs in fields.items() if name in wanted for xref in refs]
+            if not xrefs:
+                continue
+
+            with FITZ_LOCK:
+                page = doc[page_no]
+                for xref in xrefs:
+                    widget = page.load_widget(xref)
+                    name = widget.field_name
+
+                    # --- A. IMAGE INSERTION ---
+                    if name in images:
+                        try:
+                            img_data = base64.b64decode(images[name].split('base64,')[1])
+                            page.insert_image(widget.rect, stream=img_data, keep_proportion=True)
+                            page.delete_widget(widget)
+                            continue
+                        except Exception as e:
+                            print(f"Image error for {name}: {e}")
+
+                    # --- B. DATA FILLING ---
+                    if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+                        # Boolean True, the string "true", or the name appearing inside a list
+                        val = flat_data.get(name)
+                        if val is True or (name in flat_data and str(val).lower() == "true") or name in list_index:
+                            widget.field_value = True
+                            widget.update()
+
+                    # Text Field Logic
+                    elif name in flat_data:
+                        val = flat_data[name]
+                        if val is not None and not isinstance(val, list) and not isinstance(val, dict):
+                            widget.field_value = str(val)
+                            widget.update()
+
+        with FITZ_LOCK:
+            # Older PyMuPDF exposed this as flatten_form_fields(); current releases call it bake()
+            flatten = getattr(doc, "flatten_form_fields", None) or doc.bake
+            flatten()
+            pdf_bytes = doc.tobytes()
+    finally:
+        with FITZ_LOCK:
+            doc.close()
+
+    with open(output_path, 'wb') as f:
+        f.write(pdf_bytes)
+    return output_path
@@ -0,0 +1,118 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from . import search_index
+from .pdf_browser import pdf_pool
+
+JOB_KEY = "pdf_job:{}"
+JOB_TTL = 86400  # Clients poll within seconds; a day leaves room for a stale tab
+
+
+def get_job(job_id):
+    return cache.get(JOB_KEY.format(job_id))
+
+
+def _set_job(job_id, **fields):
+    job = get_job(job_id) or {"job_id": job_id}
+    job.update(fields, updated_at=time.time())
+    cache.set(JOB_KEY.format(job_id), job, timeout=JOB_TTL)
+    return job
+
+
+class PdfJobQueue:
+    """
+    Turns finalize_pdf into enqueue-and-poll.
+
+    enqueue() reserves the output filename, records the job in the cache
+    (Redis, so any worker process can answer the status poll) and hands the
+    HTML to the Chromium pool, which renders straight into the local
+    generated_pdfs backup directory. When a render finishes, a small finisher
+    pool copies the file into the case folder on Google Drive, records it on
+    the SiteVisitReport and marks the job done. The slow Drive write never
+    occupies a browser, and the HTTP request returns as soon as the job is
+    queued.
+    """
+
+    FINISHERS = 4
+
+    def __init__(self):
+        self._finishers = ThreadPoolExecutor(max_workers=self.FINISHERS, thread_name_prefix="pdf-finish")
+        self._reserved = set()
+        self._reserve_lock = threading.Lock()
+
+    def _reserve_filename(self, save_dir, base_filename):
+        """Next free "{base}_site_report_{n}.pdf", also skipping names held by queued jobs."""
+        with self._reserve_lock:
+            counter = 1
+            while True:
+                pdf_filename = f"{base_filename}_site_report_{counter}.pdf"
+                full_save_path = os.path.join(save_dir, pdf_filename)
+                if full_save_path not in self._reserved and not os.path.exists(full_save_path):
+                    self._reserved.add(full_save_path)
+                    return pdf_filename, full_save_path
+                counter += 1
+
+    def _release(self, full_save_path):
+        with self._reserve_lock:
+            self._reserved.discard(full_save_path)
+
+    def enqueue(self, html_content, save_dir, base_filename, report_id=None):
+        """Queues a render and returns the job dict. Raises PoolBusy when the render queue is full."""
+        pdf_filename, full_save_path = self._reserve_filename(save_dir, base_filename)
+        job_id = uuid.uuid4().hex
+        backup_path = os.path.join(settings.GENERATED_PDFS_ROOT, pdf_filename)
+        render_path = f"{backup_path}.{job_id}.tmp"
+
+        job = _set_job(job_id, status="queued", pdf_filename=pdf_filename,
+                       file_path=full_save_path, report_id=report_id, created_at=time.time())
+        try:
+            future = pdf_pool.submit(html_content, render_path)
+        except Exception:
+            cache.delete(JOB_KEY.format(job_id))
+            self._release(full_save_path)
+            raise
+
+        future.add_done_callback(
+            lambda f: self._finishers.submit(
+                self._finish, job_id, f, render_path, backup_path, full_save_path, pdf_filename, report_id
+            )
+        )
+        print(f"PDF job {job_id} queued for {pdf_filename} (HTML size: {len(html_content)} bytes)")
+        return job
+
+    def _finish(self, job_id, future, render_path, backup_path, full_save_path, pdf_filename, report_id):
+        try:
+            timing = future.result()
+            os.replace(render_path, backup_path)
+            _set_job(job_id, status="saving", timing=timing)
+
+            shutil.copyfile(backup_path, full_save_path)
+            search_index.updater.mark_dirty(os.path.dirname(full_save_path))
+
+            if report_id:
+                from .models import SiteVisitReport
+                # Column-only write: a full save() here would overwrite form_data/revision
+                # flushed by autosave while the PDF was rendering
+                SiteVisitReport.objects.filter(id=report_id).update(generated_pdf_name=pdf_filename)
+
+            _set_job(job_id, status="done")
+            print(f"PDF job {job_id} done: {pdf_filename} {timing}")
+        except Exception as e:
+            print(f"PDF job {job_id} failed: {e}")
+            _set_job(job_id, status="failed", error=str(e))
+            try:
+                os.remove(render_path)
+            except OSError:
+                pass
+        finally:
+            self._release(full_save_path)
+            close_old_connections()
+
+
+pdf_jobs = PdfJobQueue()
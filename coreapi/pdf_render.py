@@ -0,0 +1,182 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from .utils import FITZ_LOCK
+
+# Requested zooms are snapped to these, so 1.4 / 1.5 / 1.6 share one cached render
+ZOOM_TIERS = (0.75, 1.0, 1.5, 2.0, 3.0)
+MAX_PREFETCH = 5
+
+
+def snap_zoom(zoom):
+    return min(ZOOM_TIERS, key=lambda tier: abs(tier - zoom))
+
+
+class PageRenderer:
+    """
+    Renders PDF pages for the in-browser viewer without reopening the file
+    from Google Drive on every page.
+
+    - Open fitz.Document handles are pooled in an LRU (MAX_DOCUMENTS,
+      DOCUMENT_BUDGET bytes) and replaced when the file's mtime or size
+      changes. A document is opened from bytes read outside FITZ_LOCK.
+    - Rendered pages are cached as PNG bytes per (file version, page, zoom
+      tier) under a byte budget.
+    - After a page is served, the next few pages can be rendered in the
+      background so scrolling finds them ready.
+
+    Every touch of a document happens under FITZ_LOCK, held for one page at
+    a time, so a prefetch never holds up an interactive render for longer
+    than a single page.
+    """
+
+    MAX_DOCUMENTS = 16
+    DOCUMENT_BUDGET = 256 * 1024 * 1024
+    CACHE_BUDGET = 128 * 1024 * 1024
+
+    def __init__(self):
+        self._docs = OrderedDict()     # path -> (version, fitz.Document)
+        self._docs_bytes = 0
+        self._pages = OrderedDict()    # (path, version, page, tier) -> png bytes
+        self._pages_bytes = 0
+        self._cache_lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-prefetch")
+        self._prefetching = set()
+        self.hits = 0
+        self.renders = 0
+        self.opens = 0
+
+    def _document(self, path, version, data=None):
+        """
+        Pooled handle for `path` at `version`, opened from the file's bytes
+        `data` if it isn't pooled yet; None if it isn't and `data` is None.
+        Caller must hold FITZ_LOCK.
+        """
+        pooled = self._docs.get(path)
+        if pooled is not None:
+            if pooled[0] == version:
+                self._docs.move_to_end(path)
+                return pooled[1]
+            self._evict(path)  # File changed on disk
+        if data is None:
+            return None
+
+        doc = fitz.open(stream=data, filetype="pdf")
+        self.opens += 1
+        self._docs[path] = (version, doc)
+        self._docs_bytes += version[1]
+        while len(self._docs) > 1 and \
+                (len(self._docs) > self.MAX_DOCUMENTS or self._docs_bytes > self.DOCUMENT_BUDGET):
+            self._evict(next(iter(self._docs)))
+        return doc
+
+    def _evict(self, path):
+        (_, size), doc = self._docs.pop(path)
+        self._docs_bytes -= size
+        doc.close()
+
+    def _with_document(self, path, version, fn):
+        """fn(document) under FITZ_LOCK. The file is read outside the lock when it isn't pooled."""
+        data = None
+        while True:
+            with FITZ_LOCK:
+                doc = self._document(path, version, data)
+                if doc is not None:
+                    return fn(doc)
+            with open(path, "rb") as f:
+                data = f.read()
+
+    def _cached(self, key):
+        with self._cache_lock:
+            data = self._pages.get(key)
+            if data is not None:
+                self._pages.move_to_end(key)
+            return data
+
+    def _store(self, key, data):
+        with self._cache_lock:
+            if key in self._pages:
+                return
+            self._pages[key] = data
+            self._pages_bytes += len(data)
+            while self._pages_bytes > self.CACHE_BUDGET and self._pages:
+                _, old = self._pages.popitem(last=False)
+                self._pages_bytes -= len(old)
+
+    def _render(self, path, version, page_num, tier):
+        key = (path, version, page_num, tier)
+
+        def render(doc):
+            data = self._cached(key)  # May have been rendered while we waited for the lock
+            if data is not None:
+                return data, None
+            page_count = len(doc)
+            if page_num < 0 or page_num >= page_count:
+                return None, page_count
+            page = doc.load_page(page_num)
+            pix = page.get_pixmap(matrix=fitz.Matrix(tier, tier), alpha=False)
+            self.renders += 1
+            return pix.tobytes("png"), page_count
+
+        data, page_count = self._with_document(path, version, render)
+        if data is not None:
+            self._store(key, data)
+        return data, page_count
+
+    def _prefetch(self, path, version, page_num, tier, page_count, count):
+        for next_page in range(page_num + 1, min(page_num + 1 + count, page_count)):
+            key = (path, version, next_page, tier)
+            with self._cache_lock:
+                if key in self._pages or key in self._prefetching:
+                    continue
+                self._prefetching.add(key)
+            self._prefetcher.submit(self._prefetch_one, key)
+
+    def _prefetch_one(self, key):
+        try:
+            self._render(*key)
+        except Exception as e:
+            print(f"PDF prefetch error: {e}")
+        finally:
+            with self._cache_lock:
+                self._prefetching.discard(key)
+
+    def get_page(self, full_path, page_num, zoom=1.0, prefetch=0):
+        """
+        PNG bytes for `page_num` of `full_path`, or None if the page is out of range.
+        `prefetch` > 0 renders that many following pages in the background.
+        """
+        st = os.stat(full_path)
+        path = os.path.normpath(full_path)
+        version = (st.st_mtime_ns, st.st_size)
+        tier = snap_zoom(zoom)
+
+        data = self._cached((path, version, page_num, tier))
+        page_count = None
+        if data is not None:
+            self.hits += 1
+        else:
+            data, page_count = self._render(path, version, page_num, tier)
+            if data is None:
+                return None
+
+        if prefetch > 0:
+            if page_count is None:
+                page_count = self._with_document(path, version, len)
+            self._prefetch(path, version, page_num, tier, page_count, min(prefetch, MAX_PREFETCH))
+        return data
+
+    def stats(self):
+        return {
+            "open_documents": len(self._docs),
+            "cached_pages": len(self._pages),
+            "cached_bytes": self._pages_bytes,
+            "hits": self.hits,
+            "renders": self.renders,
+            "opens": self.opens,
+        }
+
+
+page_renderer = PageRenderer()
@@ -0,0 +1,76 @@
+"""
+Request bytes for a full-payload autosave vs a JSON Patch delta save, on a
+synthetic site-visit form (text sections plus sketch vectors), and the
+server-side cost of applying the patch.
+
+Run from the project root:  python coreapi/scratch/bench_delta_save.py
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+from coreapi.json_patch import apply_patch, make_patch
+
+SECTIONS = 12
+FIELDS_PER_SECTION = 30
+SKETCHES = 6
+STROKES_PER_SKETCH = 40
+POINTS_PER_STROKE = 60
+REPEAT = 200
+
+
+def make_form():
+    rng = random.Random(7)
+    form = {"Valuers_Checklist": {"Office_file_no": "2428", "applicant_name": "Mahesh"}}
+    for s in range(SECTIONS):
+        form[f"Section_{s}"] = {f"field_{i}": f"value {rng.randint(0, 10 ** 6)}" for i in range(FIELDS_PER_SECTION)}
+    form["vectors"] = {
+        f"Section_{k}.notes": [
+            [{"x": rng.randint(0, 1000), "y": rng.randint(0, 1000)} for _ in range(POINTS_PER_STROKE)]
+            for _ in range(STROKES_PER_SKETCH)
+        ]
+        for k in range(SKETCHES)
+    }
+    form["completion_metrics"] = {"percent": 64}
+    return form
+
+
+def body_size(body):
+    return len(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    base = make_form()
+    edits = {}
+
+    typed = copy.deepcopy(base)
+    typed["Section_3"]["field_7"] = "Boundary wall on the east side"
+    edits["one field typed"] = typed
+
+    stroke = copy.deepcopy(base)
+    stroke["vectors"]["Section_2.notes"].append([{"x": i, "y": i * 2} for i in range(POINTS_PER_STROKE)])
+    edits["one stroke drawn"] = stroke
+
+    busy = copy.deepcopy(typed)
+    busy["Section_5"]["field_1"] = "Kottayam"
+    busy["completion_metrics"]["percent"] = 66
+    busy["vectors"]["Section_0.notes"].append([{"x": 5, "y": 5}] * POINTS_PER_STROKE)
+    edits["a few seconds of work"] = busy
+
+    for label, new in edits.items():
+        full = body_size({"folder_path": "cases/2428_Mahesh", "payload": new})
+        patch = make_patch(base, new)
+        delta = body_size({"folder_path": "cases/2428_Mahesh", "file_no": "2428", "base_revision": 3, "patch": patch})
+        assert apply_patch(base, patch) == new
+
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            apply_patch(base, patch)
+        apply_ms = (time.perf_counter() - started) / REPEAT * 1000
+        print(f"{label:<22} full body {full / 1024:7.1f} KB   delta body {delta:6d} B   "
+              f"{full / delta:6.0f}x smaller   apply {apply_ms:.2f} ms")
@@ -0,0 +1,67 @@
+"""
+Compares the old extract_text_from_excel (full load_workbook) with the
+streaming text_extract.iter_excel_text on every workbook in static/excels.
+
+Reports wall time and peak Python heap (tracemalloc) for each, and checks
+that the uncapped streaming output matches the old text exactly.
+
+Run from the project root:  python coreapi/scratch/bench_excel_extract.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+import openpyxl
+from coreapi.text_extract import extract_text_from_excel, iter_excel_text, MAX_EXCEL_CELLS
+
+EXCELS_DIR = os.path.join(BASE_DIR, 'static', 'excels')
+
+
+def legacy_extract(path):
+    wb = openpyxl.load_workbook(path, data_only=True)
+    texts = []
+    for sheet in wb.worksheets:
+        for row in sheet.iter_rows():
+            for cell in row:
+                if cell.value:
+                    texts.append(str(cell.value))
+    return "\n".join(texts)
+
+
+def measure(fn, *args, **kwargs):
+    # Timed and traced in separate runs: tracemalloc slows allocation-heavy code severalfold
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = (time.perf_counter() - started) * 1000
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def first_value(path):
+    """Time to the first yielded cell, the latency a streaming consumer sees."""
+    started = time.perf_counter()
+    gen = iter_excel_text(path)
+    next(gen, None)
+    gen.close()
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    for name in sorted(os.listdir(EXCELS_DIR)):
+        if not name.lower().endswith(('.xlsx', '.xlsm')):
+            continue
+        path = os.path.join(EXCELS_DIR, name)
+        old_text, old_ms, old_mb = measure(legacy_extract, path)
+        new_text, new_ms, new_mb = measure(extract_text_from_excel, path)
+        _, capped_ms, capped_mb = measure(extract_text_from_excel, path, max_cells=MAX_EXCEL_CELLS)
+        print(f"{name} ({os.path.getsize(path) / 1024:.0f} KB, {old_text.count(chr(10)) + 1} cells with text)")
+        print(f"  full load:        {old_ms:8.1f} ms  peak {old_mb:7.1f} MB")
+        print(f"  streaming:        {new_ms:8.1f} ms  peak {new_mb:7.1f} MB  same text: {old_text == new_text}")
+        print(f"  streaming capped: {capped_ms:8.1f} ms  peak {capped_mb:7.1f} MB")
+        print(f"  first cell after: {first_value(path):8.1f} ms")
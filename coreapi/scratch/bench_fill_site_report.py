@@ -0,0 +1,145 @@
+"""
+Compares the old fill_site_report_pdf loop with pdf_form.fill_form on a
+fully populated site report and on a partly filled draft.
+
+Uses static/pdf_templates/Sitefeedbackform.pdf when it exists, otherwise a
+synthetic 6-page form with 360 text fields and checkboxes.
+
+Run from the project root:  python coreapi/scratch/bench_fill_site_report.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+import fitz
+from coreapi.pdf_form import fill_form, get_template
+
+PAGES = 6
+FIELDS_PER_PAGE = 60
+REPEAT = 20
+REAL_TEMPLATE = os.path.join(BASE_DIR, 'static', 'pdf_templates', 'Sitefeedbackform.pdf')
+
+
+def make_template(path):
+    doc = fitz.open()
+    for p in range(PAGES):
+        page = doc.new_page()
+        for i in range(FIELDS_PER_PAGE):
+            widget = fitz.Widget()
+            y = 20 + (i % 30) * 25
+            x = 40 if i < 30 else 320
+            widget.rect = fitz.Rect(x, y, x + 200, y + 18)
+            if i % 3 == 0:
+                widget.field_type = fitz.PDF_WIDGET_TYPE_CHECKBOX
+                widget.field_name = f"opt_{p}_{i}"
+            else:
+                widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+                widget.field_name = f"field_{p}_{i}"
+            page.add_widget(widget)
+    doc.save(path)
+
+
+def make_data(template_path):
+    """Nested report JSON that touches every widget, plus the usual extras the form ignores."""
+    section = {}
+    options = []
+    with fitz.open(template_path) as doc:
+        for page in doc:
+            for widget in page.widgets():
+                if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+                    options.append(widget.field_name)
+                else:
+                    section[widget.field_name] = f"value for {widget.field_name}"
+    return {
+        "Valuers_Checklist": {"Office_file_no": "2428", "applicant_name": "Mahesh"},
+        "details": section,
+        "selected": {"options": options},
+        "remarks": {f"note_{i}": ["a", "b", "c"] for i in range(200)},
+    }
+
+
+def legacy_fill(template_path, data, images_dict, output_path):
+    flat_data = {}
+
+    def flatten(y, prefix=""):
+        for k, v in y.items():
+            full_key = f"{prefix}.{k}" if prefix else k
+            if isinstance(v, dict):
+                flatten(v, full_key)
+            elif isinstance(v, list):
+                flat_data[full_key] = v
+                for item in v:
+                    flat_data[f"{full_key}.{item}"] = True
+            else:
+                flat_data[full_key] = v
+                flat_data[k] = v
+
+    flatten(data)
+    doc = fitz.open(template_path)
+    for page in doc:
+        for widget in list(page.widgets()):
+            name = widget.field_name
+            if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+                is_checked = False
+                if name in flat_data and flat_data[name] is True:
+                    is_checked = True
+                elif name in flat_data and str(flat_data[name]).lower() == "true":
+                    is_checked = True
+                else:
+                    for key, val in flat_data.items():
+                        if isinstance(val, list) and name in val:
+                            is_checked = True
+                            break
+                if is_checked:
+                    widget.field_value = True
+                    widget.update()
+            elif name in flat_data:
+                val = flat_data[name]
+                if val is not None and not isinstance(val, list) and not isinstance(val, dict):
+                    widget.field_value = str(val)
+                    widget.update()
+    doc.bake()
+    doc.save(output_path)
+    doc.close()
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args)
+    return (time.perf_counter() - started) / REPEAT * 1000
+
+
+def field_values(path):
+    with fitz.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    template_path = REAL_TEMPLATE
+    if not os.path.exists(template_path):
+        template_path = os.path.join(tmp, "synthetic_form.pdf")
+        make_template(template_path)
+    data = make_data(template_path)
+
+    started = time.perf_counter()
+    template = get_template(template_path)
+    print(f"Template parse (once): {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{len(template.widgets)} fields on {len(template.page_fields)} pages")
+
+    # A typical draft: a third of the text fields filled, half the options ticked
+    partial = dict(data)
+    partial["details"] = {k: v for i, (k, v) in enumerate(data["details"].items()) if i % 3 == 0}
+    partial["selected"] = {"options": data["selected"]["options"][::2]}
+
+    old_out = os.path.join(tmp, "old.pdf")
+    new_out = os.path.join(tmp, "new.pdf")
+    for label, report in (("fully populated", data), ("partial draft", partial)):
+        new_ms = timed(fill_form, template_path, report, {}, new_out)
+        old_ms = timed(legacy_fill, template_path, report, {}, old_out)
+        print(f"{label:<16} legacy fill: {old_ms:6.1f} ms   cached fill: {new_ms:6.1f} ms   "
+              f"speedup: {old_ms / new_ms:.1f}x   same output: {field_values(old_out) == field_values(new_out)}")
@@ -0,0 +1,65 @@
+"""
+Compares the trigram NameIndex with the old list scan + sort used by
+search_files / search_folders_api, on a synthetic 200k-file index.
+
+Run from the project root:  python coreapi/scratch/bench_name_search.py
+"""
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from coreapi.name_index import NameIndex
+from coreapi.index_columns import ColumnBuilder
+
+N_FILES = 200000
+QUERIES = ["site_report", "sbi", "dsc", "title deed", "2425", "ekm", "xyzzy", "pd"]
+REPEAT = 20
+
+NAMES = ["Mahesh", "Anitha", "Joseph", "Fathima", "Rajan", "Sreeja", "Thomas", "Lakshmi"]
+BANKS = ["1000.HDFC", "2000.Muthoot", "3000.Bajaj", "6000.SBI", "9000.SIB"]
+DOCS = ["site_report.pdf", "Title Deed.pdf", "EC.pdf", "tax_receipt.jpg", "final_DSC.pdf", "sketch.png", "valuation.xlsm"]
+
+
+def make_files(n):
+    random.seed(42)
+    files = []
+    for i in range(n):
+        case = f"{2000 + i // 9}_#{random.choice(NAMES)}#_PRCS_EKM_{random.randint(1, 28):02d}.04.2026"
+        name = f"{i}_{random.choice(DOCS)}"
+        files.append({"name": name, "path": f"{random.choice(BANKS)}/{case}/{name}", "mtime": random.uniform(1.7e9, 1.8e9)})
+    return files
+
+
+def list_scan(files, q, limit):
+    matches = [f for f in files if q in f["name"].lower()]
+    matches.sort(key=lambda x: x.get("mtime", 0), reverse=True)
+    return matches[:limit]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return (time.perf_counter() - started) / REPEAT * 1000, result
+
+
+if __name__ == "__main__":
+    files = make_files(N_FILES)
+    dirs = sorted({f["path"].rsplit("/", 1)[0] for f in files})
+    dir_ids = {d: i for i, d in enumerate(dirs)}
+    columns = ColumnBuilder()
+    for f in files:
+        columns.add(dir_ids[f["path"].rsplit("/", 1)[0]], f["name"], f["mtime"])
+
+    started = time.perf_counter()
+    index = NameIndex(columns.build(dirs))
+    print(f"NameIndex build: {(time.perf_counter() - started):.2f}s for {N_FILES} files, {len(index.postings)} trigrams")
+    print(f"{'query':<14}{'scan ms':>10}{'index ms':>10}{'speedup':>10}  same")
+
+    for q in QUERIES:
+        scan_ms, expected = timed(lambda: list_scan(files, q, 50))
+        index_ms, got = timed(lambda: index.search(q, 50))
+        same = [f["path"] for f in expected] == [f["path"] for f in got]
+        print(f"{q:<14}{scan_ms:>10.2f}{index_ms:>10.2f}{scan_ms / max(index_ms, 1e-6):>9.0f}x  {same}")
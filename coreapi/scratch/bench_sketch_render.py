@@ -0,0 +1,91 @@
+"""
+Old generate_image_from_vectors (RGB canvas, per-point tuples) vs
+sketch_render on the same synthetic sketches: render time, PNG size, pixel
+agreement, and a six-sketch save rendered serially vs on the pool.
+
+Run from the project root:  python coreapi/scratch/bench_sketch_render.py
+"""
+import io
+import os
+import sys
+import time
+import random
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+from django.conf import settings
+settings.configure(SKETCH_RENDER_SIZE=1000, SKETCH_RENDER_WORKERS=4)
+from PIL import Image, ImageDraw
+from coreapi.sketch_store import pack_elements
+from coreapi.sketch_render import render_elements, render_packed, render_many, render_items, stroke_arrays
+
+SKETCHES = 6
+STROKES = 60
+POINTS = 120
+REPEAT = 5
+
+
+def make_sketch(rng):
+    elements = []
+    for _ in range(STROKES):
+        x, y = rng.uniform(50, 950), rng.uniform(50, 950)
+        points = []
+        for _ in range(POINTS):
+            x += rng.uniform(-5, 5)
+            y += rng.uniform(-5, 5)
+            points.append({"x": x, "y": y})
+        elements.append({"type": "brush", "color": rng.choice(["#000000", "#1d4ed8", "#dc2626"]),
+                         "size": rng.choice([2, 3, 5]), "points": points})
+    return elements
+
+
+def legacy_render(vector_list, width=1000, height=1000):
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for stroke in vector_list:
+        points = stroke.get('points', [])
+        color = stroke.get('color', '#000000')
+        size = int(stroke.get('size', 3))
+        xy_points = [(p['x'], p['y']) for p in points]
+        if len(xy_points) > 1:
+            draw.line(xy_points, fill=color, width=size, joint='curve')
+        elif len(xy_points) == 1:
+            x, y = xy_points[0]
+            draw.ellipse([x - size, y - size, x + size, y + size], fill=color)
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn(*args)
+    return result, (time.perf_counter() - started) / REPEAT * 1000
+
+
+if __name__ == "__main__":
+    rng = random.Random(5)
+    sketches = {f"notes_{i}": make_sketch(rng) for i in range(SKETCHES)}
+    blobs = {key: pack_elements(els) for key, els in sketches.items()}
+    sketch, blob = sketches["notes_0"], blobs["notes_0"]
+
+    old_png, old_ms = timed(legacy_render, sketch)
+    new_png, new_ms = timed(render_elements, sketch)
+    packed_png, packed_ms = timed(render_packed, blob)
+    small_png = render_items(stroke_arrays(blob), size=600)
+
+    old_px = Image.open(io.BytesIO(old_png)).convert("RGB").tobytes()
+    new_px = Image.open(io.BytesIO(packed_png)).convert("RGB").tobytes()
+    same = sum(a == b for a, b in zip(old_px[::3], new_px[::3])) / (len(old_px) // 3)
+
+    print(f"one sketch ({STROKES} strokes x {POINTS} points)")
+    print(f"  legacy RGB:           {old_ms:6.1f} ms  {len(old_png) / 1024:6.1f} KB")
+    print(f"  palette, from JSON:   {new_ms:6.1f} ms  {len(new_png) / 1024:6.1f} KB")
+    print(f"  palette, from packed: {packed_ms:6.1f} ms  {len(packed_png) / 1024:6.1f} KB  "
+          f"pixels matching legacy: {same:.2%}")
+    print(f"  palette at 600 px:              {len(small_png) / 1024:6.1f} KB")
+
+    _, serial_ms = timed(lambda: [legacy_render(els) for els in sketches.values()])
+    _, pooled_ms = timed(render_many, blobs)
+    print(f"{SKETCHES}-sketch save: legacy serial {serial_ms:.0f} ms, pooled {pooled_ms:.0f} ms")
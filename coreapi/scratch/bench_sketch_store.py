@@ -0,0 +1,72 @@
+"""
+Size and speed of sketch strokes as JSON inside form_data vs packed by
+sketch_store, on synthetic sketch-pad drawings (freehand brush strokes
+plus a few shapes and text labels).
+
+Run from the project root:  python coreapi/scratch/bench_sketch_store.py
+"""
+import os
+import sys
+import json
+import time
+import random
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+from coreapi.sketch_store import pack_elements, unpack_elements, split_vectors, SCALE
+
+SKETCHES = 6
+STROKES = 40
+POINTS = 80
+REPEAT = 20
+
+
+def make_sketch(rng):
+    elements = []
+    for _ in range(STROKES):
+        x, y = rng.uniform(0, 1200), rng.uniform(0, 900)
+        points = []
+        for _ in range(POINTS):
+            x += rng.uniform(-4, 4)
+            y += rng.uniform(-4, 4)
+            points.append({"x": x, "y": y})
+        elements.append({"type": "brush", "color": "#000000", "size": 3, "style": "solid",
+                         "x": points[0]["x"], "y": points[0]["y"], "points": points})
+    elements.append({"type": "rect", "color": "#ff0000", "size": 2, "x": 10, "y": 20, "w": 300, "h": 120, "text": ""})
+    elements.append({"type": "text", "text": "North boundary", "x": 400, "y": 50, "color": "#000", "size": 14})
+    return elements
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn(*args)
+    return result, (time.perf_counter() - started) / REPEAT * 1000
+
+
+if __name__ == "__main__":
+    rng = random.Random(3)
+    form = {"Valuers_Checklist": {"Office_file_no": "2428"},
+            **{f"Section_{s}": {f"field_{i}": f"value {i}" for i in range(30)} for s in range(12)},
+            "vectors": {f"Section_{k}.notes": make_sketch(rng) for k in range(SKETCHES)}}
+
+    row_before = json.dumps(form, separators=(",", ":"))
+    slim, packed = split_vectors(form)
+    row_after = json.dumps(slim, separators=(",", ":"))
+    strokes_json = sum(len(json.dumps(v, separators=(",", ":"))) for v in form["vectors"].values())
+    strokes_packed = sum(len(b) for b in packed.values())
+
+    _, load_before = timed(json.loads, row_before)
+    _, load_after = timed(json.loads, row_after)
+    sketch = form["vectors"]["Section_0.notes"]
+    blob, pack_ms = timed(pack_elements, sketch)
+    restored, unpack_ms = timed(unpack_elements, blob)
+
+    worst = max(abs(a["x"] - b["x"]) for ea, eb in zip(sketch, restored) if "points" in ea
+                for a, b in zip(ea["points"], eb["points"]))
+    print(f"form_data row:   {len(row_before) / 1024:7.1f} KB -> {len(row_after) / 1024:6.1f} KB   "
+          f"json.loads {load_before:.2f} ms -> {load_after:.2f} ms")
+    print(f"stroke storage:  {strokes_json / 1024:7.1f} KB JSON -> {strokes_packed / 1024:6.1f} KB packed "
+          f"({strokes_json / strokes_packed:.1f}x)")
+    print(f"one sketch:      pack {pack_ms:.2f} ms, unpack {unpack_ms:.2f} ms, "
+          f"max coordinate error {worst:.4f} px (quantum {1 / SCALE} px)")
@@ -0,0 +1,79 @@
+"""
+Memory report for FILE_INDEX: one dict per entry (old layout) versus the
+columnar layout built by search_index._assemble, on a synthetic 200k-file index.
+
+Run from the project root:  python coreapi/scratch/index_memory_report.py
+"""
+import os
+import sys
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from coreapi.index_columns import ColumnBuilder
+
+N_CASES = 22000
+FILES_PER_CASE = 9
+BANKS = ["1000.HDFC", "2000.Muthoot", "3000.Bajaj", "6000.SBI", "9000.SIB"]
+DOCS = ["site_report.pdf", "Title Deed.pdf", "EC.pdf", "tax_receipt.jpg", "final_DSC.pdf", "sketch.png", "valuation.xlsm"]
+
+
+def make_tree():
+    random.seed(7)
+    tree = []
+    for i in range(N_CASES):
+        case = f"{random.choice(BANKS)}/{2000 + i}_#APPLICANT NAME {i}#_PRCS_EKM_{random.randint(1, 28):02d}.04.2026_S12_O34_REF{i}"
+        files = [(f"{k}_{random.choice(DOCS)}", random.uniform(1.7e9, 1.8e9)) for k in range(FILES_PER_CASE)]
+        tree.append((case, random.uniform(1.7e9, 1.8e9), files))
+    return tree
+
+
+def build_dicts(tree):
+    folders, files = [], []
+    for case, mtime, case_files in tree:
+        folders.append({"name": case.rsplit("/", 1)[1], "path": case, "mtime": mtime})
+        for name, file_mtime in case_files:
+            files.append({"name": name, "path": f"{case}/{name}", "mtime": file_mtime})
+    return {"folders": folders, "files": files}
+
+
+def build_columns(tree):
+    dirs = []
+    dir_ids = {}
+    folders, files = ColumnBuilder(), ColumnBuilder()
+    for case, mtime, case_files in tree:
+        bank, name = case.rsplit("/", 1)
+        if bank not in dir_ids:
+            dir_ids[bank] = len(dirs)
+            dirs.append(bank)
+        folders.add(dir_ids[bank], name, mtime)
+        dir_ids[case] = len(dirs)
+        dirs.append(case)
+        for file_name, file_mtime in case_files:
+            files.add(dir_ids[case], file_name, file_mtime)
+    return {"folders": folders.build(dirs), "files": files.build(dirs)}
+
+
+def measure(builder, tree):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    index = builder(tree)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return index, size
+
+
+if __name__ == "__main__":
+    tree = make_tree()
+    dict_index, dict_bytes = measure(build_dicts, tree)
+    column_index, column_bytes = measure(build_columns, tree)
+
+    entries = len(dict_index["folders"]) + len(dict_index["files"])
+    assert list(column_index["files"])[:100] == dict_index["files"][:100]
+
+    print(f"Entries: {entries} ({len(dict_index['folders'])} folders, {len(dict_index['files'])} files)")
+    print(f"{'layout':<10}{'total MB':>10}{'bytes/entry':>14}")
+    print(f"{'dicts':<10}{dict_bytes / 1e6:>10.1f}{dict_bytes / entries:>14.1f}")
+    print(f"{'columnar':<10}{column_bytes / 1e6:>10.1f}{column_bytes / entries:>14.1f}")
+    print(f"Reduction: {dict_bytes / column_bytes:.1f}x")
@@ -1,105 +1,853 @@
 import os
+import socket
+import threading
+import uuid
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from django.conf import settings
+from django.core.cache import cache
 import time
+from .index_snapshot import dump_snapshot, parse_snapshot, read_snapshot, write_snapshot
+from .name_index import NameIndex, LayeredNameIndex
+from .index_columns import ColumnBuilder
+from .utils import TokenBucket
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    # watchdog is optional - without it we fall back to polling fingerprints
+    Observer = None
+    FileSystemEventHandler = object
 
 FILE_INDEX = None
 LAST_UPDATED = 0
+GENERATION = 0
+
+# Boot timeline, reported on the dev dashboard. All *_s values are seconds since BOOT_TIME.
+BOOT_TIME = time.time()
+STARTUP_METRICS = {
+    "snapshot_load_ms": None,    # Time to read the on-disk snapshot
+    "snapshot_bytes": 0,
+    "first_ready_s": None,       # First generation with data published
+    "first_search_s": None,      # First get_index() call that returned real results
+    "reconciled_s": None,        # Snapshot reconciled against the drive
+}
+
+# Throughput of the last walk, reported on the dev dashboard to tune concurrency
+SCAN_METRICS = {
+    "dirs_visited": 0,           # stat()-ed or read
+    "dirs_read": 0,              # Needed a scandir (new or changed)
+    "seconds": 0.0,
+    "dirs_per_sec": None,
+    "workers": 0,
+}
+
+MAX_FILES = 200000
+POLL_INTERVAL = 300           # Fingerprint check every 5 minutes when no watcher is running
+RECONCILE_INTERVAL = 3600     # Safety-net check while the watcher runs (Drive can drop events)
+FULL_RESCAN_INTERVAL = 86400  # Once a day re-read every directory, even unchanged ones
+DELTA_DEBOUNCE = 2.0          # Coalesce bursts of watcher events into one delta
+SNAPSHOT_MIN_INTERVAL = 60    # Don't rewrite the snapshot more than once a minute
+OVERLAY_MAX = 20000           # Names re-indexed per delta before the name index is rebuilt whole
+SCAN_WORKERS = getattr(settings, "SEARCH_INDEX_SCAN_WORKERS", 8)   # Parallel stat/scandir calls
+SCAN_RATE = getattr(settings, "SEARCH_INDEX_SCAN_RATE", 200)       # Directory ops/sec across all workers
+
+# Cross-process coordination (default cache = Redis): one leader scans, the rest follow
+LEADER_KEY = "search_index:leader"
+GENERATION_KEY = "search_index:generation"
+SNAPSHOT_KEY = "search_index:snapshot"
+REFRESH_KEY = "search_index:refresh_requested"
+LEADER_TTL = 60               # Leader key expiry; renewed by a heartbeat thread while leading
+HEARTBEAT_INTERVAL = LEADER_TTL / 3
+FOLLOW_INTERVAL = 5           # How often followers check the shared generation counter
+SHARE_MIN_INTERVAL = 15       # Publish at most one generation this often; followers reload it whole
+
+# Per-directory fingerprints, keyed by path relative to DOCUMENTS_ROOT ("" is the root):
+#   {"mtime": dir mtime, "folders": [child dir names], "files": [file names], "file_mtimes": array('d')}
+_DIR_STATE = {}
+_BUILD_LOCK = threading.Lock()
+
+
+def _abs(rel_dir):
+    return os.path.join(settings.DOCUMENTS_ROOT, rel_dir) if rel_dir else settings.DOCUMENTS_ROOT
+
+
+def _child(rel_dir, name):
+    return f"{rel_dir}/{name}" if rel_dir else name
+
 
-def build_index():
+def _to_rel(abs_path):
+    """Maps an absolute path to an index key, or None if it is outside DOCUMENTS_ROOT."""
+    base = os.path.normpath(settings.DOCUMENTS_ROOT)
+    path = os.path.normpath(abs_path)
+    if path == base:
+        return ""
+    if not path.startswith(base + os.sep):
+        return None
+    return os.path.relpath(path, base).replace("\\", "/")
+
+
+def _scan_dir(rel_dir):
     """
-    Scans the drive to build a search index including timestamps.
-    Uses os.scandir for efficiency and yields control between directories
-    to avoid choking Google Drive's virtual filesystem.
+    Reads one directory. Returns its fingerprint node, or None if it is gone.
     """
-    global FILE_INDEX, LAST_UPDATED
+    abs_path = _abs(rel_dir)
+    try:
+        dir_mtime = os.stat(abs_path).st_mtime
+    except OSError:
+        return None
+
+    folders = []
+    files = []
+    file_mtimes = array("d")
+    try:
+        with os.scandir(abs_path) as it:
+            for entry in it:
+                if entry.name.startswith('.') or entry.name.startswith('$'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        mtime = entry.stat().st_mtime
+                    except OSError:
+                        mtime = 0
+                    files.append(entry.name)
+                    file_mtimes.append(mtime)
+    except OSError:
+        pass
+
+    return {"mtime": dir_mtime, "folders": folders, "files": files, "file_mtimes": file_mtimes}
+
+
+# The drive's I/O budget in this process, shared by every walk (so a delta during a
+# rebuild can't double the load on Google Drive) and by the folder status monitor
+IO_BUDGET = TokenBucket(rate=SCAN_RATE, burst=SCAN_WORKERS * 2)
 
+
+def _visit(rel_dir, prev, force):
+    """Fingerprint node for one directory: `prev` if its mtime is unchanged, else a fresh read."""
+    if prev is not None and not force:
+        IO_BUDGET.acquire()
+        try:
+            if os.stat(_abs(rel_dir)).st_mtime == prev["mtime"]:
+                return prev, False
+        except OSError:
+            return None, False
+
+    IO_BUDGET.acquire()
+    return _scan_dir(rel_dir), True
+
+
+def _walk(start, old_state, new_state, force=False):
+    """
+    Walks the tree below `start`, re-reading only directories whose mtime
+    differs from the fingerprint in `old_state`. Unchanged directories cost
+    a single stat() instead of a scandir plus one stat() per file.
+
+    Up to SCAN_WORKERS directories are in flight at once (Drive latency, not
+    CPU, is the bottleneck) and every stat/scandir draws from IO_BUDGET.
+    The frontier is an explicit queue, so tree depth doesn't matter.
+    """
+    started = time.time()
+    visited = read = 0
+    pending = [start]
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="index-scan") as pool:
+        while pending or in_flight:
+            while pending and len(in_flight) < SCAN_WORKERS:
+                rel_dir = pending.pop()
+                future = pool.submit(_visit, rel_dir, old_state.get(rel_dir), force)
+                in_flight[future] = rel_dir
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel_dir = in_flight.pop(future)
+                node, was_read = future.result()
+                if node is None:
+                    continue
+                visited += 1
+                read += was_read
+                new_state[rel_dir] = node
+                for name in reversed(node["folders"]):
+                    pending.append(_child(rel_dir, name))
+
+    if start:
+        return  # Partial walk from apply_delta; keep the full-walk numbers
+    elapsed = time.time() - started
+    SCAN_METRICS.update({
+        "dirs_visited": visited,
+        "dirs_read": read,
+        "seconds": round(elapsed, 2),
+        "dirs_per_sec": round(visited / elapsed, 1) if elapsed > 0 else None,
+        "workers": SCAN_WORKERS,
+    })
+
+
+def _drop_subtree(state, rel_dir):
+    prefix = rel_dir + "/"
+    for key in [k for k in state if k == rel_dir or k.startswith(prefix)]:
+        del state[key]
+
+
+def _assemble(state):
+    """
+    Flattens the fingerprint table into the {"folders", "files"} shape callers
+    expect, stored column-wise (see ColumnarEntries) to keep RAM per worker low.
+    """
+    dirs = []
+    folders = ColumnBuilder()
+    files = ColumnBuilder()
+    stack = [""]
+    while stack and len(files) < MAX_FILES:
+        rel_dir = stack.pop()
+        node = state.get(rel_dir)
+        if node is None:
+            continue
+        dir_id = len(dirs)
+        dirs.append(rel_dir)
+        for name in node["folders"]:
+            child_node = state.get(_child(rel_dir, name))
+            folders.add(dir_id, name, child_node["mtime"] if child_node else 0)
+        for name, mtime in zip(node["files"], node["file_mtimes"]):
+            files.add(dir_id, name, mtime)
+        for name in reversed(node["folders"]):
+            stack.append(_child(rel_dir, name))
+
+    if len(files) >= MAX_FILES:
+        print(f"LIMIT REACHED: Stopped at {MAX_FILES} files.")
+        files.truncate(MAX_FILES)
+    return {"folders": folders.build(dirs), "files": files.build(dirs)}
+
+
+def _build_file_no_map(folders):
+    """
+    Maps the leading number of every case folder ("2428_#NAME#_..." -> "2428")
+    to its relative path. The first folder in walk order wins, like the
+    linear next(...) scans this replaces.
+    """
+    file_no_map = {}
+    for i in range(len(folders)):
+        name = folders.name(i)
+        file_no, sep, _ = name.partition("_")
+        if sep and file_no.isdigit() and file_no not in file_no_map:
+            file_no_map[file_no] = folders.path(i)
+    return file_no_map
+
+
+def _changed_entries(old_state, new_state):
+    """
+    Relative paths of the folder and file entries that differ between two
+    fingerprint tables: added, removed, or carrying a new mtime.
+    """
+    folders = set()
+    files = set()
+    for rel_dir in old_state.keys() - new_state.keys():
+        node = old_state[rel_dir]
+        folders.update(_child(rel_dir, name) for name in node["folders"])
+        files.update(_child(rel_dir, name) for name in node["files"])
+        if rel_dir:
+            folders.add(rel_dir)
+
+    for rel_dir, node in new_state.items():
+        old_node = old_state.get(rel_dir)
+        if old_node is node:
+            continue
+        if old_node is None:
+            old_node = {"mtime": None, "folders": [], "files": [], "file_mtimes": []}
+        elif old_node == node:
+            continue
+        if rel_dir and old_node["mtime"] != node["mtime"]:
+            folders.add(rel_dir)  # A folder's entry carries its directory's mtime
+        folders.update(_child(rel_dir, name) for name in set(old_node["folders"]) ^ set(node["folders"]))
+        old_files = set(zip(old_node["files"], old_node["file_mtimes"]))
+        new_files = set(zip(node["files"], node["file_mtimes"]))
+        files.update(_child(rel_dir, name) for name, _ in old_files ^ new_files)
+    return folders, files
+
+
+def _assemble_entries(state, folder_paths, file_paths):
+    """Current entries at the given paths (those that still exist), for a name index overlay."""
+    dirs = []
+    dir_ids = {}
+    folders = ColumnBuilder()
+    files = ColumnBuilder()
+
+    def dir_id(rel_dir):
+        if rel_dir not in dir_ids:
+            dir_ids[rel_dir] = len(dirs)
+            dirs.append(rel_dir)
+        return dir_ids[rel_dir]
+
+    for rel_path in sorted(folder_paths):
+        node = state.get(rel_path)
+        parent, _, name = rel_path.rpartition("/")
+        parent_node = state.get(parent)
+        if node is not None and parent_node is not None and name in parent_node["folders"]:
+            folders.add(dir_id(parent), name, node["mtime"])
+
+    by_dir = {}
+    for rel_path in file_paths:
+        parent, _, name = rel_path.rpartition("/")
+        by_dir.setdefault(parent, set()).add(name)
+    for rel_dir in sorted(by_dir):
+        node = state.get(rel_dir)
+        if node is None:
+            continue
+        wanted = by_dir[rel_dir]
+        for name, mtime in zip(node["files"], node["file_mtimes"]):
+            if name in wanted:
+                files.add(dir_id(rel_dir), name, mtime)
+
+    return folders.build(dirs), files.build(dirs)
+
+
+def _name_indexes(prev, state, index):
+    """
+    Name indexes for a new generation, or None if they need a full build.
+    Keeps the last fully built NameIndexes and indexes only the entries that
+    changed since (see LayeredNameIndex), until there are more than
+    OVERLAY_MAX of those.
+    """
+    prev_names = prev.get("name_index") if prev else None
+    if prev_names is None or not _DIR_STATE or len(index["files"]) >= MAX_FILES:
+        return None
+    folder_paths, file_paths = _changed_entries(_DIR_STATE, state)
+    if not folder_paths and not file_paths:
+        return prev_names
+
+    bases = {}
+    for kind, paths in (("folders", folder_paths), ("files", file_paths)):
+        name_index = prev_names[kind]
+        if isinstance(name_index, LayeredNameIndex):
+            # Stack onto the changes since the last full build, not onto the overlay
+            paths |= name_index.dirty
+            name_index = name_index.base
+        bases[kind] = name_index
+    if len(folder_paths) + len(file_paths) > OVERLAY_MAX:
+        return None
+
+    overlay_folders, overlay_files = _assemble_entries(state, folder_paths, file_paths)
+    return {
+        "folders": LayeredNameIndex(bases["folders"], frozenset(folder_paths), NameIndex(overlay_folders)),
+        "files": LayeredNameIndex(bases["files"], frozenset(file_paths), NameIndex(overlay_files)),
+    }
+
+
+def _publish(state):
+    """
+    Swaps in a new index generation. Readers holding the old one are unaffected,
+    and every generation is complete when it is swapped in.
+    """
+    global FILE_INDEX, LAST_UPDATED, GENERATION, _DIR_STATE
+    prev = FILE_INDEX
+    index = _assemble(state)
+    index["file_no_map"] = _build_file_no_map(index["folders"])
+    name_index = _name_indexes(prev, state, index)
+    if name_index is not None:
+        index["name_index"] = name_index
+
+    _DIR_STATE = state
+    FILE_INDEX = index
+    LAST_UPDATED = time.time()
+    GENERATION += 1
+    if STARTUP_METRICS["first_ready_s"] is None and index["files"]:
+        STARTUP_METRICS["first_ready_s"] = round(LAST_UPDATED - BOOT_TIME, 3)
+
+    if name_index is None:
+        # Full build after the swap, so the generation is searchable (by scan)
+        # straight away; it is then replaced by a copy carrying the indexes
+        index = {**index, "name_index": {
+            "folders": NameIndex(index["folders"]),
+            "files": NameIndex(index["files"]),
+        }}
+        FILE_INDEX = index
+    return index
+
+
+def build_index(force=False):
+    """
+    Brings the search index up to date with the drive.
+    Directories whose mtime matches the last fingerprint are reused as-is,
+    so after the first build only changed directories are re-read.
+    Pass force=True to re-read every directory (catches in-place file edits
+    that do not touch the parent directory's mtime).
+    """
     base_dir = settings.DOCUMENTS_ROOT
     if not os.path.exists(base_dir):
         return {"folders": [], "files": []}
 
-    folders = []
-    files = []
-    
-    MAX_FILES = 200000 
-    file_count = 0
+    print(f"--- STARTING INDEX BUILD ({'full' if force else 'incremental'}) ---")
+    started = time.time()
 
-    print("--- STARTING INDEX BUILD (With Dates) ---") 
+    try:
+        with _BUILD_LOCK:
+            new_state = {}
+            _walk("", _DIR_STATE, new_state, force=force)
+            index = _publish(new_state)
+
+        print(f"--- INDEX COMPLETE: Found {len(index['files'])} files and {len(index['folders'])} folders "
+              f"in {time.time() - started:.1f}s (generation {GENERATION}, "
+              f"{SCAN_METRICS['dirs_per_sec']} dirs/sec, {SCAN_METRICS['dirs_read']} re-read) ---")
+        return index
+
+    except Exception as e:
+        print(f"Error building index: {e}")
+        return get_index()
+
+
+def apply_delta(rel_dirs):
+    """
+    Re-reads only the given directories (e.g. parents of files a watcher saw
+    created, renamed or deleted) and publishes a new generation.
+    New sub-directories are walked in full; vanished ones are pruned.
+    """
+    if not rel_dirs:
+        return get_index()
 
     try:
-        def scan_dir(path):
-            nonlocal file_count
-            if file_count >= MAX_FILES:
-                return
-            subdirs = []
-            try:
-                with os.scandir(path) as it:
-                    for entry in it:
-                        if entry.name.startswith('.') or entry.name.startswith('$'):
-                            continue
-                            
-                        if entry.is_dir(follow_symlinks=False):
-                            try:
-                                mtime = entry.stat().st_mtime
-                            except:
-                                mtime = 0
-                            rel_path = os.path.relpath(entry.path, base_dir).replace("\\", "/")
-                            folders.append({
-                                "name": entry.name,
-                                "path": rel_path,
-                                "mtime": mtime
-                            })
-                            subdirs.append(entry.path)
-                        elif entry.is_file(follow_symlinks=False):
-                            try:
-                                mtime = entry.stat().st_mtime
-                            except:
-                                mtime = 0
-                            rel_path = os.path.relpath(entry.path, base_dir).replace("\\", "/")
-                            files.append({
-                                "name": entry.name,
-                                "path": rel_path,
-                                "mtime": mtime
-                            })
-                            file_count += 1
-                            
-                            if file_count >= MAX_FILES:
-                                print(f"LIMIT REACHED: Stopped at {MAX_FILES} files.")
-                                break
-            except OSError:
-                pass
+        with _BUILD_LOCK:
+            new_state = dict(_DIR_STATE)
+            # Parents first, so a re-read parent prunes children before we touch them
+            for rel_dir in sorted(set(rel_dirs), key=lambda d: d.count("/")):
+                if rel_dir:
+                    parent, _, name = rel_dir.rpartition("/")
+                    parent_node = new_state.get(parent)
+                    # Skip dirs we don't index (hidden) or whose parent was just pruned
+                    if parent_node is None or name not in parent_node["folders"]:
+                        continue
+                node = _scan_dir(rel_dir)
+                if node is None:
+                    _drop_subtree(new_state, rel_dir)
+                    continue
 
-            for subdir in subdirs:
-                if file_count >= MAX_FILES:
-                    break
-                # Yield control briefly between directories to avoid
-                # saturating Google Drive's virtual filesystem
-                time.sleep(0.005)
-                scan_dir(subdir)
+                old_node = new_state.get(rel_dir)
+                old_children = set(old_node["folders"]) if old_node else set()
+                new_state[rel_dir] = node
 
-        scan_dir(base_dir)
+                for name in old_children - set(node["folders"]):
+                    _drop_subtree(new_state, _child(rel_dir, name))
+                for name in node["folders"]:
+                    child = _child(rel_dir, name)
+                    if child not in new_state:
+                        _walk(child, {}, new_state)
 
-        FILE_INDEX = { "folders": folders, "files": files }
-        LAST_UPDATED = time.time()
-        
-        print(f"--- INDEX COMPLETE: Found {len(files)} files and {len(folders)} folders ---")
-        
-        return FILE_INDEX
+            return _publish(new_state)
 
     except Exception as e:
-        print(f"Error building index: {e}")
-        return {"folders": [], "files": []}
+        print(f"Error applying index delta: {e}")
+        return get_index()
+
+
+def load_snapshot():
+    """
+    Loads the last persisted snapshot so a restart serves results immediately
+    instead of waiting for a full drive walk. Reconciliation happens afterwards.
+    """
+    path = settings.SEARCH_INDEX_SNAPSHOT
+    started = time.time()
+    try:
+        state = read_snapshot(path, settings.DOCUMENTS_ROOT)
+        if not state:
+            return False
+        load_ms = round((time.time() - started) * 1000, 1)
+        with _BUILD_LOCK:
+            # Don't clobber a generation that was built while we were reading
+            if _DIR_STATE:
+                return False
+            _publish(state)
+        STARTUP_METRICS["snapshot_load_ms"] = load_ms
+        STARTUP_METRICS["snapshot_bytes"] = os.path.getsize(path)
+        print(f"--- INDEX SNAPSHOT LOADED: {len(FILE_INDEX['files'])} files "
+              f"in {STARTUP_METRICS['snapshot_load_ms']}ms ---")
+        return True
+    except Exception as e:
+        print(f"Error loading index snapshot: {e}")
+        return False
+
+
+def save_snapshot():
+    state = _DIR_STATE
+    if not state:
+        return False
+    try:
+        write_snapshot(settings.SEARCH_INDEX_SNAPSHOT, settings.DOCUMENTS_ROOT, state)
+        return True
+    except Exception as e:
+        print(f"Error saving index snapshot: {e}")
+        return False
 
 
 def get_index():
     global FILE_INDEX
-    
+
     # If index is not ready yet (Background thread still running)
     if FILE_INDEX is None:
         print("Search attempted before Index was ready. Returning empty results.")
         # Return empty list so the server doesn't freeze/rebuild
         return {"folders": [], "files": []}
-        
+
+    if STARTUP_METRICS["first_search_s"] is None and FILE_INDEX["files"]:
+        STARTUP_METRICS["first_search_s"] = round(time.time() - BOOT_TIME, 3)
     return FILE_INDEX
 
+
+def search_names(kind, q, limit=None):
+    """
+    Newest-first entries of `kind` ("folders" or "files") whose name contains `q`.
+    Uses the generation's trigram index, or a plain scan while it is being built.
+    """
+    index = get_index()
+    name_index = index.get("name_index")
+    if name_index is not None:
+        return name_index[kind].search(q, limit)
+
+    q = q.lower()
+    matches = [f for f in index.get(kind, []) if q in f["name"].lower()]
+    matches.sort(key=lambda x: x.get("mtime", 0), reverse=True)
+    return matches[:limit] if limit is not None else matches
+
+
+def _bytes_per_entry(index):
+    entries = len(index["folders"]) + len(index["files"])
+    if not entries or not hasattr(index["files"], "nbytes"):
+        return None
+    size = index["folders"].nbytes() + index["files"].nbytes(include_dirs=False)
+    return round(size / entries, 1)
+
+
+def get_dir_node(rel_dir):
+    """Fingerprint node (mtime, child folders, files) of an indexed directory, or None."""
+    return _DIR_STATE.get(rel_dir)
+
+
+def find_case_folder(file_no):
+    """O(1): relative path of the indexed folder named "{file_no}_...", or None."""
+    file_no_map = get_index().get("file_no_map")
+    if file_no_map is None:
+        return None
+    return file_no_map.get(str(file_no).strip())
+
+
+def resolve_case_folder(file_no):
+    """
+    Like find_case_folder(), but cross-checks ClientFolder when the index has
+    no entry yet (e.g. a folder created since the last generation).
+    """
+    rel_path = find_case_folder(file_no)
+    if rel_path is not None:
+        return rel_path
+
+    from .models import ClientFolder
+    folder = ClientFolder.objects.filter(unique_file_no=str(file_no).strip()).only("full_folder_path").first()
+    if folder and folder.full_folder_path and os.path.isdir(folder.full_folder_path):
+        return _to_rel(folder.full_folder_path)
+    return None
+
+
+def client_folder_path(file_no, full_folder_path=None):
+    """
+    Absolute path of a ClientFolder's case folder. Its own full_folder_path
+    is authoritative and wins whenever it exists on disk; the index is only
+    asked (it follows renames such as "_hold") when that path has gone.
+    None if neither finds a folder.
+    """
+    if full_folder_path and os.path.isdir(full_folder_path):
+        return full_folder_path
+    rel_path = find_case_folder(file_no)
+    return _abs(rel_path) if rel_path is not None else None
+
+
+def get_index_stats():
+    """Summary of the live index for the dev dashboard."""
+    index = FILE_INDEX or {"folders": [], "files": []}
+    return {
+        "generation": GENERATION,
+        "last_updated": LAST_UPDATED,
+        "folders": len(index["folders"]),
+        "files": len(index["files"]),
+        "directories": len(_DIR_STATE),
+        "bytes_per_entry": _bytes_per_entry(index),
+        "watching": updater.watching,
+        "role": updater.role,
+        "scan": SCAN_METRICS,
+        **STARTUP_METRICS,
+    }
+
 def refresh_index():
-    return build_index()
\ No newline at end of file
+    return build_index()
+
+
+class _DeltaHandler(FileSystemEventHandler):
+    """Turns watcher events into dirty-directory marks for the updater."""
+
+    def __init__(self, updater):
+        super().__init__()
+        self.updater = updater
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        self.updater.mark_dirty(os.path.dirname(event.src_path))
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            self.updater.mark_dirty(os.path.dirname(dest_path))
+        if event.is_directory and event.event_type == "modified":
+            self.updater.mark_dirty(event.src_path)
+
+
+class IndexUpdater:
+    """
+    Keeps FILE_INDEX current in the background.
+
+    Only one process scans the drive. Every process (daphne, waitress, ...)
+    runs an updater; they elect a leader through a Redis key in the default
+    cache. The leader loads the snapshot, reconciles by fingerprint, applies
+    watcher deltas (or polls without watchdog) and publishes the latest
+    generation to Redis, at most once per SHARE_MIN_INTERVAL so a burst of
+    uploads costs one snapshot write and one reload per follower. Followers
+    poll the shared generation counter and hot-swap the published snapshot
+    in read-only. If the leader dies its key
+    expires and a follower takes over. If Redis is unreachable each process
+    falls back to scanning on its own.
+    """
+
+    def __init__(self):
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refresh_requested = False
+        self._observer = None
+        self._last_snapshot = 0
+        self._last_share = 0
+        self._shared_generation = None
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.role = "starting"
+        self.watching = False
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+            self.heartbeat.start()
+            print(">> Background Task: Search Index Updater Started")
+
+    def mark_dirty(self, abs_path):
+        rel_dir = _to_rel(abs_path)
+        if rel_dir is None:
+            return
+        with self._dirty_lock:
+            self._dirty.add(rel_dir)
+        self._wake.set()
+
+    def request_refresh(self):
+        """Non-blocking: the leader reconciles on its next wake-up, wherever it runs."""
+        self._refresh_requested = True
+        try:
+            cache.set(REFRESH_KEY, True, timeout=LEADER_TTL)
+        except Exception:
+            pass
+        self._wake.set()
+        self.start()
+
+    # --- Leadership -------------------------------------------------------
+
+    def _acquire_leadership(self):
+        try:
+            if cache.add(LEADER_KEY, self.token, timeout=LEADER_TTL):
+                return True
+            return cache.get(LEADER_KEY) == self.token
+        except Exception as e:
+            if self.role != "standalone":
+                print(f"Index coordination unavailable ({e}); scanning in this process")
+            self.role = "standalone"
+            return True
+
+    def _renew_leadership(self):
+        if self.role == "standalone":
+            return True
+        try:
+            if cache.get(LEADER_KEY) != self.token:
+                return cache.add(LEADER_KEY, self.token, timeout=LEADER_TTL)
+            cache.touch(LEADER_KEY, LEADER_TTL)
+            return True
+        except Exception:
+            return True
+
+    def _heartbeat_loop(self):
+        """
+        Keeps the leader key alive independently of the scanner loop, which
+        can spend far longer than LEADER_TTL inside one full walk of the drive.
+        The key only lapses when this process dies.
+        """
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            if self.role != "leader":
+                continue
+            try:
+                if cache.get(LEADER_KEY) == self.token:
+                    cache.touch(LEADER_KEY, LEADER_TTL)
+            except Exception:
+                pass
+
+    def _take_refresh_request(self):
+        requested, self._refresh_requested = self._refresh_requested, False
+        if self.role == "standalone":
+            return requested
+        try:
+            if cache.get(REFRESH_KEY):
+                cache.delete(REFRESH_KEY)
+                requested = True
+        except Exception:
+            pass
+        return requested
+
+    # --- Sharing ----------------------------------------------------------
+
+    def _share(self, force=False):
+        """
+        Publishes the current generation for follower processes, unless one
+        went out less than SHARE_MIN_INTERVAL ago. True once nothing is left
+        to publish.
+        """
+        if self.role != "leader":
+            return True
+        if not force and time.time() - self._last_share < SHARE_MIN_INTERVAL:
+            return False
+        try:
+            data = dump_snapshot(settings.DOCUMENTS_ROOT, _DIR_STATE)
+            if not data:
+                return True
+            generation = f"{self.token}:{GENERATION}"
+            # Blob first, counter second: a follower never sees a counter without data
+            cache.set(SNAPSHOT_KEY, data, timeout=None)
+            cache.set(GENERATION_KEY, generation, timeout=None)
+            self._shared_generation = generation
+            self._last_share = time.time()
+        except Exception as e:
+            print(f"Error publishing index generation: {e}")
+        return True
+
+    def _follow(self):
+        """Hot-swaps in the leader's latest generation if it changed."""
+        try:
+            generation = cache.get(GENERATION_KEY)
+            if not generation or generation == self._shared_generation:
+                return False
+            data = cache.get(SNAPSHOT_KEY)
+            state = parse_snapshot(data, settings.DOCUMENTS_ROOT) if data else None
+            if not state:
+                return False
+            with _BUILD_LOCK:
+                _publish(state)
+            self._shared_generation = generation
+            if STARTUP_METRICS["reconciled_s"] is None:
+                STARTUP_METRICS["reconciled_s"] = round(time.time() - BOOT_TIME, 3)
+            return True
+        except Exception as e:
+            print(f"Error following index generation: {e}")
+            return False
+
+    # --- Scanning ---------------------------------------------------------
+
+    def _start_watcher(self):
+        if Observer is None or not os.path.exists(settings.DOCUMENTS_ROOT):
+            return False
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_DeltaHandler(self), settings.DOCUMENTS_ROOT, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+            print(">> Background Task: Watching drive for changes")
+            return True
+        except Exception as e:
+            print(f"Watcher unavailable, falling back to polling: {e}")
+            self._observer = None
+            return False
+
+    def _stop_watcher(self):
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+            except Exception:
+                pass
+            self._observer = None
+        self.watching = False
+
+    def _save_snapshot(self, force=False):
+        if force or time.time() - self._last_snapshot >= SNAPSHOT_MIN_INTERVAL:
+            if save_snapshot():
+                self._last_snapshot = time.time()
+                return True
+        return False
+
+    def _lead(self):
+        """Scanner loop. Returns when another process has taken over."""
+        if self.role != "standalone":
+            self.role = "leader"
+            print(">> Background Task: This process is the search index leader")
+
+        build_index()
+        STARTUP_METRICS["reconciled_s"] = round(time.time() - BOOT_TIME, 3)
+        self._save_snapshot(force=True)
+        self._share(force=True)
+
+        self.watching = self._start_watcher()
+        check_interval = RECONCILE_INTERVAL if self.watching else POLL_INTERVAL
+        last_check = last_full = time.time()
+        snapshot_pending = share_pending = False
+
+        while True:
+            timeout = max(0, min(check_interval - (time.time() - last_check), FOLLOW_INTERVAL))
+            if self._wake.wait(timeout=timeout):
+                # Let a burst of events (e.g. a folder upload) settle first
+                time.sleep(DELTA_DEBOUNCE)
+            self._wake.clear()
+
+            if not self._renew_leadership():
+                print(">> Background Task: Lost search index leadership, following")
+                self._stop_watcher()
+                return
+
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+
+            try:
+                now = time.time()
+                if self._take_refresh_request() or now - last_check >= check_interval:
+                    force = now - last_full >= FULL_RESCAN_INTERVAL
+                    build_index(force=force)
+                    last_check = now
+                    if force:
+                        last_full = now
+                    snapshot_pending = share_pending = True
+                elif dirty:
+                    apply_delta(dirty)
+                    snapshot_pending = share_pending = True
+
+                if share_pending and self._share():
+                    share_pending = False
+                if snapshot_pending and self._save_snapshot():
+                    snapshot_pending = False
+            except Exception as e:
+                print(f"Error in index updater: {e}")
+
+    def _run_loop(self):
+        load_snapshot()
+        while True:
+            try:
+                if self._acquire_leadership():
+                    self._lead()
+                else:
+                    self.role = "follower"
+                    self._follow()
+                    time.sleep(FOLLOW_INTERVAL)
+            except Exception as e:
+                print(f"Error in index updater: {e}")
+                time.sleep(FOLLOW_INTERVAL)
+
+
+updater = IndexUpdater()
@@ -0,0 +1,193 @@
+import sys
+import json
+import math
+import zlib
+import struct
+from array import array
+
+# form_data['vectors'][key] holds {"sketch_ref": key, "elements": n} once the
+# strokes live in ReportSketch.strokes; the sketch pad fetches them on open.
+REF_KEY = "sketch_ref"
+
+MAGIC = b"SKV1"
+SCALE = 100       # Points are stored in 1/100 px
+COORD_LIMIT = 1000000  # px; coordinates are clamped to this so scaled deltas always fit int32
+NARROW, WIDE = 0, 1
+PACKED_KEY = "\u0000points"  # Stands in for "points" in the JSON part; never a real element key
+
+
+def is_ref(value):
+    return isinstance(value, dict) and REF_KEY in value
+
+
+def _packable(points):
+    return (isinstance(points, list) and points and
+            all(isinstance(p, dict) and len(p) == 2 and
+                isinstance(p.get("x"), (int, float)) and isinstance(p.get("y"), (int, float))
+                for p in points))
+
+
+def _coord(value):
+    """`value` clamped to +/-COORD_LIMIT, or None if it is NaN or infinite."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return min(max(value, -COORD_LIMIT), COORD_LIMIT)
+
+
+def _clean_points(points):
+    """Drops points with a non-finite coordinate and clamps the rest; one bad point shouldn't lose a draft."""
+    cleaned = []
+    for p in points:
+        x, y = _coord(p["x"]), _coord(p["y"])
+        if x is not None and y is not None:
+            cleaned.append({"x": x, "y": y})
+    return cleaned
+
+
+def _le(arr):
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def pack_elements(elements):
+    """
+    Sketch pad elements -> compact bytes.
+
+    Everything except stroke points stays as compact JSON. Each stroke's
+    points are quantised to 1/100 px and delta-encoded: the first point as
+    int32, the rest as int16 steps (int32 for a stroke with a longer jump).
+    The whole blob is zlib-compressed. Points with a NaN/infinite
+    coordinate are dropped and the rest clamped to +/-COORD_LIMIT.
+    """
+    meta = []
+    streams = []
+    for el in elements:
+        points = el.get("points") if isinstance(el, dict) else None
+        if not _packable(points):
+            meta.append(el)
+            continue
+        points = _clean_points(points)
+        if not points:
+            meta.append({**el, "points": []})
+            continue
+        coords = []
+        for p in points:
+            coords.append(round(p["x"] * SCALE))
+            coords.append(round(p["y"] * SCALE))
+        deltas = [b - a for a, b in zip(coords, coords[2:])]
+        width = WIDE if any(d > 32767 or d < -32768 for d in deltas) else NARROW
+        streams.append(struct.pack("<BI", width, len(points)))
+        streams.append(_le(array("i", coords[:2])).tobytes())
+        streams.append(_le(array("i" if width == WIDE else "h", deltas)).tobytes())
+        meta.append({**{k: v for k, v in el.items() if k != "points"}, PACKED_KEY: len(points)})
+
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    body = struct.pack("<I", len(meta_bytes)) + meta_bytes + b"".join(streams)
+    return MAGIC + zlib.compress(body, 6)
+
+
+def unpack_elements(blob):
+    if not blob:
+        return []
+    blob = bytes(blob)
+    if not blob.startswith(MAGIC):
+        raise ValueError("Not a packed sketch")
+    body = zlib.decompress(blob[len(MAGIC):])
+    (meta_len,) = struct.unpack_from("<I", body)
+    offset = 4 + meta_len
+    meta = json.loads(body[4:offset])
+
+    elements = []
+    for el in meta:
+        if not isinstance(el, dict) or PACKED_KEY not in el:
+            elements.append(el)
+            continue
+        width, count = struct.unpack_from("<BI", body, offset)
+        offset += 5
+        first = _le(array("i", body[offset:offset + 8]))
+        offset += 8
+        step = array("i" if width == WIDE else "h")
+        size = (count - 1) * 2 * step.itemsize
+        step.frombytes(body[offset:offset + size])
+        offset += size
+        _le(step)
+
+        x, y = first
+        points = [{"x": x / SCALE, "y": y / SCALE}]
+        for i in range(0, len(step), 2):
+            x += step[i]
+            y += step[i + 1]
+            points.append({"x": x / SCALE, "y": y / SCALE})
+        el = dict(el)
+        del el[PACKED_KEY]
+        el["points"] = points
+        elements.append(el)
+    return elements
+
+
+def split_vectors(form_data):
+    """
+    (form_data with stroke lists swapped for references, {source_key: packed bytes}).
+    References and cleared entries ("" / []) pass through untouched.
+    """
+    vectors = form_data.get("vectors") if isinstance(form_data, dict) else None
+    if not isinstance(vectors, dict):
+        return form_data, {}
+
+    packed = {}
+    refs = {}
+    for key, value in vectors.items():
+        if isinstance(value, str) and value:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if isinstance(value, list) and value:
+            packed[key] = pack_elements(value)
+            refs[key] = {REF_KEY: key, "elements": len(value)}
+        else:
+            refs[key] = value
+    if not packed:
+        return form_data, {}
+    return {**form_data, "vectors": refs}, packed
+
+
+def store_strokes(report, packed):
+    """Writes packed strokes onto the report's ReportSketch rows, skipping unchanged ones."""
+    if not packed:
+        return
+    from .models import ReportSketch
+    existing = dict(
+        ReportSketch.objects.filter(report=report, source_key__in=list(packed)).values_list("source_key", "strokes")
+    )
+    for key, blob in packed.items():
+        if key not in existing:
+            ReportSketch.objects.create(report=report, source_key=key, strokes=blob)
+        elif existing[key] is None or bytes(existing[key]) != blob:
+            ReportSketch.objects.filter(report=report, source_key=key).update(strokes=blob)
+
+
+def load_vectors(report_id, source_key):
+    """Sketch pad elements stored for one sketch, or None."""
+    from .models import ReportSketch
+    blob = ReportSketch.objects.filter(report_id=report_id, source_key=source_key) \
+        .values_list("strokes", flat=True).first()
+    return unpack_elements(blob) if blob else None
+
+
+def inflate_vectors(report_id, form_data):
+    """form_data with every stroke reference replaced by the stored elements (for patch bases)."""
+    vectors = form_data.get("vectors") if isinstance(form_data, dict) else None
+    if not isinstance(vectors, dict) or not any(is_ref(v) for v in vectors.values()):
+        return form_data
+    from .models import ReportSketch
+    blobs = dict(
+        ReportSketch.objects.filter(report_id=report_id, strokes__isnull=False).values_list("source_key", "strokes")
+    )
+    inflated = {}
+    for key, value in vectors.items():
+        if is_ref(value) and value[REF_KEY] in blobs:
+            value = unpack_elements(blobs[value[REF_KEY]])
+        inflated[key] = value
+    return {**form_data, "vectors": inflated}
@@ -1,16 +1,57 @@
 import os
 import time
+import heapq
 import threading
 import re
+from collections import deque
+from datetime import datetime
 from django.conf import settings
-from django.core.cache import cache
+from . import search_index
+from .folder_status import get_status, status_engine
 from .utils import get_case_folder_info
 
+CASE_FOLDER_RE = re.compile(r'^\d+_.*\d{2}\.\d{2}\.\d{4}')
+
+# How long until a folder is re-checked, by its last known status (seconds)
+RECHECK_NEAR_TAT = 180        # Pending, TAT within NEAR_TAT_WINDOW
+RECHECK_PENDING = 600
+RECHECK_OUT_OF_TAT = 900      # Overdue, still waiting for the DSC
+RECHECK_UNKNOWN = 3600        # Empty / unreadable folders
+RECHECK_ON_HOLD = 6 * 3600
+RECHECK_COMPLETED = 24 * 3600  # _DSC present - practically final
+NEAR_TAT_WINDOW = 86400
+
+
+def _is_case_folder(name):
+    return "#" in name or CASE_FOLDER_RE.search(name) is not None
+
+
 class FolderStatusMonitor:
+    """
+    Keeps case-folder statuses fresh with a priority queue instead of walking
+    the whole tree on a timer.
+
+    Case folders are discovered from the search index (no os.walk). Each one
+    is scheduled by how likely it is to change: pending folders close to
+    their TAT are re-checked every few minutes, completed and on-hold
+    folders a few times a day. A check is one stat(); only when the folder's
+    mtime moved do we pay a scandir and hand the folder to the index updater
+    as a delta. All disk operations draw from search_index.IO_BUDGET, the
+    ops/sec budget the index walks use, instead of fixed sleeps. Runs only
+    in the process that owns the drive scan (see search_index.IndexUpdater).
+    """
+
     def __init__(self):
         self.root_folder = settings.DOCUMENTS_ROOT
-        self.interval = 600  # Run every 10 minutes (was 60s - too aggressive for Google Drive)
+        self.io_ops = 0
+        self._queue = []            # (due_at, seq, abs_path)
+        self._due = {}              # abs_path -> due_at of its live queue entry
+        self._seq = 0
+        self._synced_generation = None
+        self._latencies = deque(maxlen=500)
         self._stop_event = threading.Event()
+        self.scans = 0
+        self.changed = 0
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
 
     def start(self):
@@ -18,51 +59,131 @@ class FolderStatusMonitor:
             self.thread.start()
             print(">> Background Task: Folder Monitor Thread Started")
 
+    def stop(self):
+        self._stop_event.set()
+
+    def _schedule(self, abs_path, delay):
+        due_at = time.time() + delay
+        self._seq += 1
+        self._due[abs_path] = due_at
+        heapq.heappush(self._queue, (due_at, self._seq, abs_path))
+
+    def _sync_queue(self):
+        """Adds newly indexed case folders (due now) and forgets vanished ones."""
+        folders = search_index.get_index().get("folders", [])
+        current = set()
+        for i in range(len(folders)):
+            if _is_case_folder(folders.name(i)):
+                current.add(os.path.join(self.root_folder, folders.path(i)))
+
+        for abs_path in current - self._due.keys():
+            self._schedule(abs_path, 0)
+        for abs_path in self._due.keys() - current:
+            # Lazy deletion: the heap entry is skipped when popped
+            del self._due[abs_path]
+        self._synced_generation = search_index.GENERATION
+
+    def _next_delay(self, info):
+        if not info:
+            return RECHECK_UNKNOWN
+        label = info["status_label"]
+        if label == "COMPLETED":
+            return RECHECK_COMPLETED
+        if label == "ON HOLD":
+            return RECHECK_ON_HOLD
+        if label == "OUT OF TAT":
+            return RECHECK_OUT_OF_TAT
+        try:
+            tat_dt = datetime.strptime(info["tat_date"], '%d/%m/%Y')
+            if (tat_dt - datetime.now()).total_seconds() < NEAR_TAT_WINDOW:
+                return RECHECK_NEAR_TAT
+        except (KeyError, ValueError):
+            pass
+        return RECHECK_PENDING
+
+    def _check(self, abs_path):
+        started = time.time()
+        rel_dir = search_index._to_rel(abs_path)
+        node = search_index.get_dir_node(rel_dir) if rel_dir is not None else None
+
+        search_index.IO_BUDGET.acquire()
+        self.io_ops += 1
+        try:
+            mtime = os.stat(abs_path).st_mtime
+        except OSError:
+            mtime = None
+
+        if mtime is not None and node is not None and node["mtime"] == mtime:
+            # Unchanged since indexed: status comes from the fingerprint, no more I/O
+            info = get_status(abs_path)
+        else:
+            search_index.IO_BUDGET.acquire()
+            self.io_ops += 1
+            info = get_case_folder_info(abs_path)
+            status_engine.invalidate(abs_path)
+            search_index.updater.mark_dirty(abs_path)
+            self.changed += 1
+
+        self.scans += 1
+        self._latencies.append(time.time() - started)
+        return info
+
+    def _owns_drive(self):
+        return search_index.updater.role in ("leader", "standalone")
+
     def _run_loop(self):
         """
-        Continuously scans folders and updates cache.
+        Pops folders as they fall due and re-checks them within the I/O budget.
         """
         # Wait for the Search Index to finish first
-        print(">> Background Task: Monitor waiting 120s for Search Index...")
-        time.sleep(120)
-        
-        # Now start the loop
-        self._scan_all()
-        
+        print(">> Background Task: Monitor waiting for Search Index...")
+        while search_index.FILE_INDEX is None and not self._stop_event.is_set():
+            time.sleep(5)
+
         while not self._stop_event.is_set():
-            time.sleep(self.interval)
-            self._scan_all()
+            try:
+                if not self._owns_drive():
+                    self._stop_event.wait(30)
+                    continue
 
-    def _scan_all(self):
-        try:
-            scanned = 0
-            for root, dirs, files in os.walk(self.root_folder):
-                # Throttle heavily - Google Drive can't handle rapid I/O
-                time.sleep(0.1)
-                
-                folder_name = os.path.basename(root)
-                
-                has_hash = "#" in folder_name
-                is_case_folder = re.search(r'^\d+_.*\d{2}\.\d{2}\.\d{4}', folder_name)
-                
-                if has_hash or is_case_folder:
-                    info = get_case_folder_info(root)
-                    if info:
-                        cache_key = f"folder_status_{root}"
-                        cache.set(cache_key, info, timeout=None)
-                    scanned += 1
-                    # Longer pause after actually processing a folder
-                    time.sleep(0.2)
-                else:
-                    # Skip descending into non-relevant deep directories
-                    # Only descend into top-level bank folders and their immediate children
-                    depth = root.replace(self.root_folder, '').count(os.sep)
-                    if depth > 3:
-                        dirs.clear()
-            
-            print(f">> Background Task: Monitor scan complete. {scanned} case folders cached.")
-            
-        except Exception as e:
-            print(f"Error in background scan: {e}")
-
-monitor = FolderStatusMonitor()
\ No newline at end of file
+                if search_index.GENERATION != self._synced_generation:
+                    self._sync_queue()
+
+                if not self._queue:
+                    self._stop_event.wait(30)
+                    continue
+
+                due_at, _, abs_path = self._queue[0]
+                wait = due_at - time.time()
+                if wait > 0:
+                    # Wake up early to pick up folders from new index generations
+                    self._stop_event.wait(min(wait, 30))
+                    continue
+
+                heapq.heappop(self._queue)
+                if self._due.get(abs_path) != due_at:
+                    continue  # Stale entry (rescheduled or folder removed)
+
+                info = self._check(abs_path)
+                self._schedule(abs_path, self._next_delay(info))
+
+            except Exception as e:
+                print(f"Error in background scan: {e}")
+                self._stop_event.wait(30)
+
+    def metrics(self):
+        now = time.time()
+        latencies = sorted(self._latencies)
+        return {
+            "queue_depth": len(self._due),
+            "due_now": sum(1 for due_at in self._due.values() if due_at <= now),
+            "scans": self.scans,
+            "changed": self.changed,
+            "io_ops": self.io_ops,
+            "io_budget": search_index.IO_BUDGET.rate,
+            "avg_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            "p95_latency_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+            "status_cache": status_engine.stats(),
+        }
+
+monitor = FolderStatusMonitor()
@@ -1,3 +1,28 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .sketch_store import COORD_LIMIT, pack_elements, unpack_elements
+
+
+class PackElementsTests(SimpleTestCase):
+    def test_round_trip(self):
+        elements = [
+            {"type": "pen", "color": "#000", "points": [{"x": 1.25, "y": 2.5}, {"x": 400.0, "y": -3.75}]},
+            {"type": "text", "text": "N", "x": 10, "y": 20},
+        ]
+        self.assertEqual(unpack_elements(pack_elements(elements)), elements)
+
+    def test_non_finite_points_are_dropped(self):
+        elements = [{"type": "pen", "points": [
+            {"x": 1, "y": 1}, {"x": float("nan"), "y": 2}, {"x": 3, "y": float("inf")}, {"x": 4, "y": 4},
+        ]}]
+        points = unpack_elements(pack_elements(elements))[0]["points"]
+        self.assertEqual(points, [{"x": 1, "y": 1}, {"x": 4, "y": 4}])
+
+    def test_stroke_of_only_bad_points_keeps_the_element(self):
+        elements = [{"type": "pen", "points": [{"x": float("-inf"), "y": 0}]}]
+        self.assertEqual(unpack_elements(pack_elements(elements)), [{"type": "pen", "points": []}])
+
+    def test_oversized_coordinates_are_clamped(self):
+        elements = [{"type": "pen", "points": [{"x": 1e30, "y": -10 ** 40}, {"x": 5, "y": 5}]}]
+        points = unpack_elements(pack_elements(elements))[0]["points"]
+        self.assertEqual(points, [{"x": COORD_LIMIT, "y": -COORD_LIMIT}, {"x": 5, "y": 5}])
@@ -0,0 +1,63 @@
+import openpyxl
+from openpyxl.utils import range_boundaries
+from docx import Document
+from .utils import FITZ_LOCK, open_pdf
+
+MAX_EXCEL_CELLS = 50000  # Bank templates carry huge formatted-but-empty grids; text past this is noise
+
+
+def extract_text_from_docx(path):
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+
+
+def iter_excel_text(path, sheets=None, cell_range=None, max_cells=None):
+    """
+    Yields the text of non-empty cells, sheet by sheet, row by row.
+
+    The workbook is opened read-only and iterated values-only, so openpyxl
+    streams rows out of the XML instead of building a Cell object (with
+    styles) for every cell of every sheet. `sheets` limits it to the named
+    sheets, `cell_range` (e.g. "A1:H200") to a block of each sheet, and
+    iteration stops after `max_cells` values (no cap by default).
+    """
+    bounds = {}
+    if cell_range:
+        min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+        bounds = {"min_col": min_col, "min_row": min_row, "max_col": max_col, "max_row": max_row}
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        count = 0
+        for sheet in wb.worksheets:
+            if sheets is not None and sheet.title not in sheets:
+                continue
+            for row in sheet.iter_rows(values_only=True, **bounds):
+                for value in row:
+                    if value:
+                        yield str(value)
+                        count += 1
+                        if max_cells is not None and count >= max_cells:
+                            return
+    finally:
+        wb.close()  # Read-only workbooks keep the zip open until closed
+
+
+def extract_text_from_excel(path, sheets=None, cell_range=None, max_cells=None):
+    return "\n".join(iter_excel_text(path, sheets=sheets, cell_range=cell_range, max_cells=max_cells))
+
+
+def extract_text_from_pdf(path):
+    """Embedded text layer only; scanned pages come back empty (OCR is analyze_file's job)."""
+    doc = open_pdf(path)
+    try:
+        with FITZ_LOCK:
+            page_count = len(doc)
+        texts = []
+        for page_no in range(page_count):
+            with FITZ_LOCK:
+                texts.append(doc[page_no].get_text())
+        return "\n".join(texts)
+    finally:
+        with FITZ_LOCK:
+            doc.close()
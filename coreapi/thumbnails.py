@@ -0,0 +1,247 @@
+import os
+import io
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import fitz  # PyMuPDF
+from PIL import Image
+from django.conf import settings
+from . import search_index
+from .utils import TokenBucket, FITZ_LOCK, open_pdf
+
+PDF_EXTENSIONS = ('.pdf',)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+THUMB_EXTENSIONS = PDF_EXTENSIONS + IMAGE_EXTENSIONS
+
+PDF_SCALE = 0.5               # 50% scale (thumbnail size), as the view always rendered
+IMAGE_MAX_SIZE = (600, 600)   # Photos straight off a phone are 4000px+
+JPEG_QUALITY = 80
+
+
+def thumbnail_key(full_path, st):
+    """Cache key for a file version: changes whenever path, mtime or size does."""
+    raw = f"{os.path.normcase(os.path.normpath(full_path))}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def render_thumbnail(full_path):
+    """JPEG bytes for the first page of a PDF or a downscaled image."""
+    if full_path.lower().endswith(PDF_EXTENSIONS):
+        doc = open_pdf(full_path)
+        with FITZ_LOCK:
+            try:
+                page = doc.load_page(0)  # Load first page
+                pix = page.get_pixmap(matrix=fitz.Matrix(PDF_SCALE, PDF_SCALE))
+                return pix.tobytes("jpg")
+            finally:
+                doc.close()
+
+    with Image.open(full_path) as img:
+        img.draft("RGB", IMAGE_MAX_SIZE)  # Lets the JPEG decoder skip most of the pixels
+        img = img.convert("RGB")
+        img.thumbnail(IMAGE_MAX_SIZE)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=JPEG_QUALITY)
+        return buf.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Two-tier thumbnail store.
+
+    Tier 1 is an in-process LRU bounded by bytes, tier 2 a directory of JPEGs
+    under THUMBNAIL_CACHE_ROOT shared by every worker. Both are keyed by
+    thumbnail_key(), so an edited file simply gets a new key; stale entries
+    fall out of the LRU and are pruned from disk once unused for
+    DISK_MAX_AGE. Concurrent requests for the same missing thumbnail render
+    it once.
+    """
+
+    MEMORY_BUDGET = 64 * 1024 * 1024
+    DISK_MAX_AGE = 30 * 86400
+
+    def __init__(self):
+        self.root = settings.THUMBNAIL_CACHE_ROOT
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._rendering = {}      # key -> Lock held while that thumbnail is rendered
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.root, key[:2], key + ".jpg")
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.MEMORY_BUDGET and self._memory:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old)
+
+    def _from_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Marks it as used for prune()
+            return data
+        except OSError:
+            return None
+
+    def _to_disk(self, key, data):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, full_path, key):
+        """Thumbnail bytes for `full_path` at version `key`, rendering it if needed."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            render_lock = self._rendering.setdefault(key, threading.Lock())
+
+        with render_lock:
+            try:
+                with self._lock:
+                    data = self._memory.get(key)
+                if data is not None:
+                    return data  # Rendered by the request we waited for
+
+                data = self._from_disk(key)
+                if data is not None:
+                    self.disk_hits += 1
+                else:
+                    data = render_thumbnail(full_path)
+                    self.renders += 1
+                    self._to_disk(key, data)
+                self._remember(key, data)
+                return data
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+
+    def has(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self._disk_path(key))
+
+    def prune(self):
+        """Deletes on-disk thumbnails nobody has used for DISK_MAX_AGE."""
+        cutoff = time.time() - self.DISK_MAX_AGE
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self):
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+        }
+
+
+class ThumbnailPrewarmer:
+    """
+    Renders thumbnails for newly indexed PDFs and images in the background,
+    so opening a folder full of fresh uploads finds them already cached.
+    Each new index generation is diffed against a high-water mark of file
+    mtimes; on boot the mark starts at PREWARM_WINDOW ago rather than
+    rendering the whole drive. Rendering reads from Google Drive, so it is
+    capped at a files/sec budget (one token per file: its stat plus, when
+    not cached yet, its read) and only runs in the process that owns the
+    drive scan.
+    """
+
+    PREWARM_WINDOW = 7 * 86400
+    PRUNE_INTERVAL = 86400
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.budget = TokenBucket(rate=2, burst=4)  # Files/sec
+        self.watermark = time.time() - self.PREWARM_WINDOW
+        self._generation = None
+        self._last_prune = 0
+        self.rendered = 0
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+            print(">> Background Task: Thumbnail Prewarmer Started")
+
+    def _new_files(self):
+        files = search_index.get_index().get("files", [])
+        mtimes = getattr(files, "mtimes", None)
+        if mtimes is None:
+            return [], self.watermark
+
+        watermark = self.watermark
+        newest = watermark
+        found = []
+        for i, mtime in enumerate(mtimes):
+            if mtime <= watermark:
+                continue
+            name = files.name(i)
+            if name.lower().endswith(THUMB_EXTENSIONS):
+                found.append((mtime, files.path(i)))
+            newest = max(newest, mtime)
+        found.sort(reverse=True)  # Newest first - most likely to be opened next
+        return found, newest
+
+    def _prewarm(self):
+        found, newest = self._new_files()
+        for _, rel_path in found:
+            full_path = os.path.join(settings.DOCUMENTS_ROOT, rel_path)
+            try:
+                self.budget.acquire()
+                st = os.stat(full_path)
+                key = thumbnail_key(full_path, st)
+                if not self.cache.has(key):
+                    self.cache.get(full_path, key)
+                    self.rendered += 1
+            except Exception as e:
+                print(f"Thumbnail prewarm skipped {rel_path}: {e}")
+        self.watermark = newest
+
+    def _run_loop(self):
+        while True:
+            try:
+                if search_index.updater.role in ("leader", "standalone"):
+                    if search_index.FILE_INDEX is not None and search_index.GENERATION != self._generation:
+                        self._generation = search_index.GENERATION
+                        self._prewarm()
+                    if time.time() - self._last_prune > self.PRUNE_INTERVAL:
+                        self._last_prune = time.time()
+                        removed = self.cache.prune()
+                        if removed:
+                            print(f">> Thumbnail cache: pruned {removed} unused thumbnails")
+            except Exception as e:
+                print(f"Error in thumbnail prewarmer: {e}")
+            time.sleep(30)
+
+
+thumbnail_cache = ThumbnailCache()
+prewarmer = ThumbnailPrewarmer(thumbnail_cache)
@@ -28,6 +28,7 @@ urlpatterns = [
     path('api/file-info/', views.get_file_info, name='get_file_info'),
     path('api/analyze/', views.analyze_file, name='analyze_file'),
     path("api/search/", views.search_files, name="search_files"),
+    path("api/search-content/", views.search_content_api, name="search_content"),
     path("api/refresh/", views.refresh_files, name="refresh_files"),
     path('api/thumbnail/', views.get_thumbnail, name='get_thumbnail'),
     path('render-page/', views.render_pdf_page, name='render_pdf_page'),
@@ -52,7 +53,9 @@ urlpatterns = [
     path('api/save-feedback/', views.save_feedback, name='save_feedback'),
     path('pdf-editor/<str:report_id>/', views.pdf_editor_page, name='pdf_editor_page'),
     path('api/get-report-data/<str:report_id>/', views.get_report_data, name='get_report_data'),
+    path('api/sketch-vectors/<int:report_id>/', views.get_sketch_vectors, name='get_sketch_vectors'),
     path('api/finalize-pdf/', views.finalize_pdf, name='finalize_pdf'),
+    path('api/pdf-job/<str:job_id>/', views.pdf_job_status, name='pdf_job_status'),
     path('api/auto-save/', views.auto_save_api, name='auto_save'),
     path('api/get-report-data/', views.get_site_report_data, name='get_site_report_data'),
     path('api/save-corrections/', views.save_office_corrections, name='save_office_corrections'),
@@ -1,24 +1,50 @@
 import os
 import re
+import threading
+import time
 from datetime import datetime, timedelta
 from django.conf import settings
+import fitz  # PyMuPDF
 
-def get_case_folder_info(abs_path, db_created_at=None):
+def summarize_case_files(files):
+    """
+    Reduces a case folder's files, given as (name, mtime) pairs, to what the
+    TAT/status logic needs: (earliest mtime, latest site report mtime,
+    latest final report mtime). Missing values are None.
     """
-    Calculates TAT, Report Dates, and Status.
-    MOVED here so background tasks can use it.
+    earliest_ts = None
+    site_report_ts = None
+    final_report_ts = None
+
+    for name, ts in files:
+        if earliest_ts is None or ts < earliest_ts:
+            earliest_ts = ts
+
+        name_lower = name.lower()
+
+        # Check Site Report
+        if "site_report" in name_lower:
+            if site_report_ts is None or ts > site_report_ts:
+                site_report_ts = ts
+
+        # Check Final Report (.DSC or _DSC)
+        if ".dsc" in name_lower or "_dsc" in name_lower:
+            if final_report_ts is None or ts > final_report_ts:
+                final_report_ts = ts
+
+    return earliest_ts, site_report_ts, final_report_ts
+
+
+def build_case_folder_info(abs_path, summary, db_created_at=None):
+    """
+    Calculates TAT, Report Dates, and Status from a summarize_case_files() result.
+    Pure computation - no disk access - so cached summaries can be re-evaluated
+    against the current time on every call.
     """
     try:
-        files = []
-        try:
-            with os.scandir(abs_path) as it:
-                for entry in it:
-                    if entry.is_file():
-                        files.append(entry)
-        except OSError:
-            return None
-
-        if not files:
+        earliest_ts, site_report_ts, final_report_ts = summary
+
+        if earliest_ts is None:
             # If no files, we still want to show something if we have a DB date
             if not db_created_at: return None
             download_dt = db_created_at
@@ -26,7 +52,6 @@ def get_case_folder_info(abs_path, db_created_at=None):
             if db_created_at:
                 download_dt = db_created_at
             else:
-                earliest_ts = min(f.stat().st_mtime for f in files)
                 download_dt = datetime.fromtimestamp(earliest_ts)
 
         # Ensure download_dt is TZ-naive for comparison with datetime.now()
@@ -35,23 +60,8 @@ def get_case_folder_info(abs_path, db_created_at=None):
 
         tat_dt = download_dt + timedelta(days=3)
 
-        site_report_dt = None
-        final_report_dt = None
-        
-        for f in files:
-            name_lower = f.name.lower()
-            
-            # Check Site Report
-            if "site_report" in name_lower:
-                ts = f.stat().st_mtime
-                if site_report_dt is None or ts > site_report_dt.timestamp():
-                    site_report_dt = datetime.fromtimestamp(ts)
-            
-            # Check Final Report (.DSC or _DSC)
-            if ".dsc" in name_lower or "_dsc" in name_lower:
-                ts = f.stat().st_mtime
-                if final_report_dt is None or ts > final_report_dt.timestamp():
-                    final_report_dt = datetime.fromtimestamp(ts)
+        site_report_dt = datetime.fromtimestamp(site_report_ts) if site_report_ts is not None else None
+        final_report_dt = datetime.fromtimestamp(final_report_ts) if final_report_ts is not None else None
 
         # Status Logic
         now = datetime.now()
@@ -95,4 +105,78 @@ def get_case_folder_info(abs_path, db_created_at=None):
 
     except Exception as e:
         print(f"Error calculating stats: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def scan_case_files(abs_path):
+    """(name, mtime) for every file directly inside abs_path, or None if unreadable."""
+    try:
+        files = []
+        with os.scandir(abs_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    files.append((entry.name, entry.stat().st_mtime))
+        return files
+    except OSError:
+        return None
+
+
+def get_case_folder_info(abs_path, db_created_at=None):
+    """
+    Calculates TAT, Report Dates, and Status straight from disk.
+    MOVED here so background tasks can use it. Request paths should prefer
+    the cached folder_status.get_status().
+    """
+    files = scan_case_files(abs_path)
+    if files is None:
+        return None
+    return build_case_folder_info(abs_path, summarize_case_files(files), db_created_at)
+
+
+# PyMuPDF does not support concurrent use from several threads, even on
+# separate documents. Every fitz call in coreapi (viewer pages, thumbnails,
+# text extraction, OCR batching, form filling) runs under this one lock.
+# It is held per call - one open, one page, one close - and never across a
+# read from the drive, so an interactive page render waits for at most one
+# page of someone else's work.
+FITZ_LOCK = threading.RLock()
+
+
+def open_pdf(path):
+    """
+    fitz.Document for the PDF at `path`. The file is read before FITZ_LOCK
+    is taken; close the document under the lock.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    with FITZ_LOCK:
+        return fitz.open(stream=data, filetype="pdf")
+
+
+class TokenBucket:
+    """
+    Thread-safe rate limiter: `rate` operations per second on average, with
+    bursts of up to `burst`. acquire() blocks until enough tokens are available.
+    Used to keep background I/O on the Google Drive mount within a budget.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.consumed = 0
+
+    def acquire(self, n=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    self.consumed += n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
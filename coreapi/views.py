@@ -3,21 +3,21 @@ from django.contrib.auth.hashers import check_password
 from .models import UserProfile, ReportSketch
 import json
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.middleware.csrf import get_token
 from django_ratelimit.decorators import ratelimit
 import os, io
+import hashlib
 import mimetypes
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, Http404
 from django.views.decorators.http import require_http_methods, require_POST, require_GET
-from PyPDF2 import PdfMerger
-from PIL import Image, ImageDraw
 from datetime import datetime, timedelta
 import time
 import calendar
 from django.conf import settings
 from coreapi.search_index import get_index
-from coreapi.search_index import refresh_index
-from docx import Document
+from coreapi import search_index
+from coreapi.tasks import monitor
 import openpyxl
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.core.files.base import ContentFile
@@ -29,19 +29,31 @@ from django.db.models import Sum
 from django.contrib.auth.decorators import login_required
 from weasyprint import HTML, CSS
 from .models import UserProfile, SiteVisitReport, ReportSketch, ClientFolder, VerificationReport, DraftingReport, WorkSession, MonthlyPerformance, CreditLedger
-import fitz  
 from django.shortcuts import render, get_object_or_404
 import shutil
 from urllib.parse import unquote
 from django.http import HttpResponseNotFound, HttpResponseBadRequest
 import re
 from django.utils import timezone
-from chat.models import FolderChatMessage, FolderChatVisit 
+from chat.unread import get_unread_flags
 from django.core.cache import cache
-from .utils import get_case_folder_info
-from playwright.sync_api import sync_playwright
-import sys
-import asyncio
+from .folder_status import get_status, get_statuses
+from .dir_listing import get_listing
+from .thumbnails import thumbnail_cache, thumbnail_key
+from .pdf_render import page_renderer
+from .file_delivery import serve_path
+from .pdf_form import fill_form
+from .utils import FITZ_LOCK, open_pdf
+from .text_extract import extract_text_from_docx, extract_text_from_excel
+from .content_index import search_content
+from .autosave import autosave_buffer, RevisionConflict
+from .sketch_store import split_vectors, store_strokes, load_vectors
+from .sketch_render import render_many, render_digest
+from .ocr import extract_text as extract_page_text, PDF_EXTENSIONS as OCR_PDF_EXTENSIONS, IMAGE_EXTENSIONS as OCR_IMAGE_EXTENSIONS
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .pdf_browser import PoolBusy
+from .pdf_jobs import pdf_jobs, get_job
 from .models import ClientFolder
 from django.db import transaction
 from django.core.files.storage import FileSystemStorage
@@ -51,7 +63,6 @@ import subprocess
 import shlex
 from django.views.decorators.csrf import csrf_exempt
 
-import fitz  # PyMuPDF
 from django.http import HttpResponse, HttpResponseNotFound
 from django.core.cache import cache
 
@@ -118,6 +129,8 @@ def developer_dashboard(request):
         'active_users': active_users,
 
         'system_logs': get_system_logs(50),  # Pass initial logs to the template
+        'index_stats': search_index.get_index_stats(),
+        'monitor_stats': monitor.metrics(),
     }
     return render(request, 'dev_dashboard.html', context)
 
@@ -197,9 +210,14 @@ def execute_command_api(request):
 @csrf_protect
 def refresh_files(request):
     try:
-        # Rebuild the index synchronously
-        refresh_index()
-        return JsonResponse({"status": "success", "message": "Index refreshed"})
+        # Hand the rebuild to the background updater; only changed directories are re-read
+        search_index.updater.request_refresh()
+        return JsonResponse({
+            "status": "success",
+            "message": "Index refresh scheduled",
+            "generation": search_index.GENERATION,
+            "last_updated": search_index.LAST_UPDATED
+        })
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
 # ----------------------------
@@ -284,7 +302,7 @@ def office_verification(request):
     
     if rel_path:
         # Fetch the site staff's report for this folder
-        report = SiteVisitReport.objects.filter(target_folder=rel_path).first()
+        report = autosave_buffer.flush_report(SiteVisitReport.objects.filter(target_folder=rel_path).first())
 
     context = {
         'current_path': rel_path,
@@ -306,9 +324,12 @@ def get_site_report_data(request):
     # 1. Search Logic for Site Report
     if raw_path := request.GET.get('path', ''):
         clean_path = unquote(raw_path).replace('\\', '/').replace('G:/My Drive/', '').strip('/')
-        report = SiteVisitReport.objects.filter(target_folder__endswith=clean_path).order_by('-updated_at').first()
+        report = autosave_buffer.flush_report(
+            SiteVisitReport.objects.filter(target_folder__endswith=clean_path).order_by('-updated_at').first()
+        )
 
     if not report and file_no:
+        autosave_buffer.flush(file_no)
         report = SiteVisitReport.objects.filter(office_file_no=file_no).first()
 
     if report:
@@ -489,6 +510,7 @@ def get_drafting_mega_payload(request):
     }
 
     # 1. Site Visit
+    autosave_buffer.flush(file_no)
     site_report = SiteVisitReport.objects.filter(office_file_no=file_no).first()
     if site_report:
         payload['site_visit'] = {
@@ -548,6 +570,7 @@ def save_office_corrections(request):
             if not file_no:
                 return JsonResponse({'error': 'Missing file number'}, status=400)
 
+            autosave_buffer.flush(file_no)
             report = SiteVisitReport.objects.filter(office_file_no=file_no).first()
             if not report:
                 return JsonResponse({'error': 'Report not found'}, status=404)
@@ -569,7 +592,9 @@ def save_office_corrections(request):
             
             # Save back to DB
             report.form_data = current_data
+            report.revision += 1
             report.save()
+            autosave_buffer.forget(file_no)
 
             return JsonResponse({'success': True, 'message': 'Corrections saved successfully'})
 
@@ -1519,24 +1544,16 @@ def format_file_size(size_bytes):
 @require_http_methods(["GET"])
 def search_folders_api(request):
     q = request.GET.get("q", "").lower()
-    
-    # 1. Get from Index instead of Disk
-    index = get_index()
-    all_folders = index.get("folders", [])
 
-    # 2. Filter
     if q:
-        folders = [
-            f for f in all_folders 
-            if q in f["name"].lower() or q in f.get("id", "").lower()
-        ]
+        # Trigram index returns matches already ordered newest first
+        folders = search_index.search_names("folders", q)
     else:
         # If no query, return top-level folders (or first 50 cached folders)
         # Assuming your index stores root paths correctly
-        folders = all_folders[:50] 
-
-    # 3. Sort Newest First
-    folders.sort(key=lambda x: x.get('mtime', 0), reverse=True)
+        folders = get_index().get("folders", [])[:50]
+        # Sort Newest First
+        folders.sort(key=lambda x: x.get('mtime', 0), reverse=True)
 
     return JsonResponse({"folders": folders})
 
@@ -1548,24 +1565,9 @@ def search_files(request):
     if not q or len(q) < 2:
         return JsonResponse({"folders": [], "files": []})
 
-    # 1. Get the Index (Instant RAM access)
-    index = get_index()
-    
-    # --- HELPER: Sort by Modified Time (Descending) ---
-    # Requires 'mtime' to be saved in your index. If missing, defaults to 0.
-    def sort_newest(item):
-        return item.get('mtime', 0)
-
-    # 2. Filter & Sort FOLDERS
-    # We filter first, THEN sort, THEN slice.
-    matched_folders = [
-        f for f in index.get("folders", []) 
-        if q in f["name"].lower()
-    ]
-    # Sort: Newest First
-    matched_folders.sort(key=sort_newest, reverse=True)
-    # Slice: Take top 20
-    matched_folders = matched_folders[:20]
+    # 1. Filter FOLDERS through the trigram index.
+    # Results come back newest first, so we only take the top 20.
+    matched_folders = search_index.search_names("folders", q, limit=20)
 
     # --- PROCESS FOLDERS (Chat/Unread Status) ---
     processed_folders = []
@@ -1581,29 +1583,19 @@ def search_files(request):
         f_copy = folder.copy()
         
         name = f_copy['name']
-        path = f_copy['path']
         
         has_hash = "#" in name
         is_case_folder = re.search(r'^\d+_.*\d{2}\.\d{2}\.\d{4}', name)
-        has_chat = bool(has_hash or is_case_folder)
-        
-        is_unread = False
-        if has_chat and current_user_profile:
-            is_unread = check_unread_status(current_user_profile, path)
-
-        f_copy['has_chat'] = has_chat
-        f_copy['is_unread'] = is_unread
+        f_copy['has_chat'] = bool(has_hash or is_case_folder)
         processed_folders.append(f_copy)
 
-    # 3. Filter & Sort FILES
-    matched_files = [
-        f for f in index.get("files", []) 
-        if q in f["name"].lower()
-    ]
-    # Sort: Newest First
-    matched_files.sort(key=sort_newest, reverse=True)
-    # Slice: Take top 50
-    matched_files = matched_files[:50]
+    # Unread flags for the whole page in one go instead of two queries per folder
+    unread = get_unread_flags(current_user_profile, [f['path'] for f in processed_folders if f['has_chat']])
+    for f_copy in processed_folders:
+        f_copy['is_unread'] = unread.get(f_copy['path'], False)
+
+    # 2. Filter FILES (newest first, top 50)
+    matched_files = search_index.search_names("files", q, limit=50)
 
     return JsonResponse({
         "folders": processed_folders,
@@ -1611,6 +1603,18 @@ def search_files(request):
     })
 
 
+def search_content_api(request):
+    """Full-text search over the extracted contents of indexed PDFs, DOCX and XLSX files."""
+    q = request.GET.get("q", "").strip()
+    if len(q) < 2:
+        return JsonResponse({"files": []})
+    try:
+        limit = min(int(request.GET.get("limit", 50)), 200)
+    except ValueError:
+        limit = 50
+    return JsonResponse({"files": search_content(q, limit=limit)})
+
+
 @require_http_methods(["GET"])
 def get_folder_contents_api(request):
     rel_path = request.GET.get("path", "").strip("/")
@@ -1639,11 +1643,12 @@ def get_folder_contents_api(request):
             
             # 2. Search Database by File Number (NOT by folder path)
             if file_no:
+                autosave_buffer.flush(file_no)
                 draft = SiteVisitReport.objects.filter(office_file_no=file_no).order_by('-updated_at').first()
                 if draft and draft.form_data:
                     saved_draft = draft.form_data if isinstance(draft.form_data, dict) else json.loads(draft.form_data)
                     saved_draft['report_id'] = draft.id
-                    sketches = ReportSketch.objects.filter(report=draft)
+                    sketches = ReportSketch.objects.filter(report=draft).defer('strokes')
                     if 'images' not in saved_draft: 
                         saved_draft['images'] = {}
                     for sketch in sketches:
@@ -1654,12 +1659,9 @@ def get_folder_contents_api(request):
         if "#" in folder_name or re.search(r'^\d+_.*\d{2}\.\d{2}\.\d{4}', folder_name):
             # Fetch the creation date from the ClientFolder table using the file number
             case_folder = ClientFolder.objects.filter(unique_file_no=file_no).first() if file_no else None
-            folder_info = get_case_folder_info(abs_path, db_created_at=case_folder.created_at if case_folder else None)
+            folder_info = get_status(abs_path, db_created_at=case_folder.created_at if case_folder else None)
 
     # --- SCANNING & SORTING ---
-    all_folders = []
-    all_files = []
-    
     user_id = request.session.get("user_id")
     current_user_profile = None
     if user_id:
@@ -1667,46 +1669,16 @@ def get_folder_contents_api(request):
         except: pass
 
     try:
-        if recursive:
-            # Flattened recursive file search
-            for root, dirs, files in os.walk(abs_path):
-                for name in files:
-                    if name.lower() in ['desktop.ini', '.ds_store']: continue
-                    full_abs = os.path.join(root, name)
-                    rel_to_base = os.path.relpath(full_abs, base).replace('\\', '/')
-                    
-                    # Create a simple object mirroring the os.DirEntry interface
-                    class MockEntry:
-                        def __init__(self, n, p, rp):
-                            self.name = n
-                            self.path = p
-                            self.rel_path = rp
-                            self._stat = None
-                        def is_dir(self): return False
-                        def stat(self):
-                            if not self._stat: self._stat = os.stat(self.path)
-                            return self._stat
-                    
-                    all_files.append(MockEntry(name, full_abs, rel_to_base))
-            all_folders = [] # Return no folders when recursive
-        else:
-            with os.scandir(abs_path) as it:
-                for entry in it:
-                    if entry.is_dir():
-                        all_folders.append(entry)
-                    else:
-                        all_files.append(entry)
-
-        # Sort by MTime Descending
-        if all_folders:
-            all_folders.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-        all_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        # Stat-once, mtime-sorted listing; later pages are sliced from the cached copy
+        listing = get_listing(abs_path, base, recursive=recursive)
+        all_folders = listing.folders if not recursive else []  # Return no folders when recursive
+        all_files = listing.files
 
         # --- PAGINATION ---
         start = (page - 1) * limit
         end = start + limit
         
-        folders_to_process = all_folders[start:end] if not recursive else []
+        folders_to_process = all_folders[start:end]
         # If we didn't fill the limit with folders, fill with files
         remaining_limit = limit - len(folders_to_process)
         file_start = max(0, start - len(all_folders))
@@ -1715,9 +1687,15 @@ def get_folder_contents_api(request):
         has_next = (len(all_folders) + len(all_files)) > end
 
         # --- PROCESS FOLDERS ---
+        chat_paths = [
+            f"{rel_path}/{entry.name}" if rel_path else entry.name
+            for entry in folders_to_process
+            if "#" in entry.name or re.search(r'^\d+_.*\d{2}\.\d{2}\.\d{4}', entry.name)
+        ]
+        unread = get_unread_flags(current_user_profile, chat_paths)
+
         final_folders = []
         for entry in folders_to_process:
-            folder_stats = entry.stat()
             name = entry.name
             full_rel_path = f"{rel_path}/{name}" if rel_path else name
             full_abs_path = os.path.join(abs_path, name)
@@ -1729,9 +1707,8 @@ def get_folder_contents_api(request):
             is_unread = False
             status_color = None
             if has_chat:
-                if current_user_profile:
-                    is_unread = check_unread_status(current_user_profile, full_rel_path)
-                stats = get_case_folder_info(full_abs_path)
+                is_unread = unread.get(full_rel_path, False)
+                stats = get_status(full_abs_path)
                 if stats: status_color = stats['status_color']
 
             final_folders.append({
@@ -1741,25 +1718,22 @@ def get_folder_contents_api(request):
                 "has_chat": has_chat,
                 "is_unread": is_unread,
                 "status_color": status_color,
-                "mtime": folder_stats.st_mtime
+                "mtime": entry.mtime
             })
 
         # --- PROCESS FILES ---
         final_files = []
         for entry in files_to_process:
-            stats = entry.stat()
             ext = os.path.splitext(entry.name)[1].lower()
-            # If recursive, use the pre-calculated rel_path, otherwise build it
-            full_file_path = entry.rel_path if hasattr(entry, 'rel_path') else (f"{rel_path}/{entry.name}" if rel_path else entry.name)
             
             final_files.append({
                 "name": entry.name,
-                "path": full_file_path,
+                "path": entry.rel_path,
                 "parent_folder": rel_path,
                 "type": "file",
                 "extension": ext,
-                "size": format_file_size(stats.st_size),
-                "mtime": stats.st_mtime
+                "size": format_file_size(entry.size),
+                "mtime": entry.mtime
             })
 
     except Exception as e:
@@ -1868,14 +1842,17 @@ def auto_save_api(request):
     if not user_id:
         return JsonResponse({'error': 'Unauthorized'}, status=401)
     
-    update_user_activity(user_id)
+    try:
+        autosave_buffer.touch_activity(user_id)
+    except Exception:
+        update_user_activity(user_id)  # Redis offline
 
     try:
-        user = UserProfile.objects.get(id=user_id)
         data = json.loads(request.body)
         
         current_folder_path = data.get('folder_path', "").strip("/")
-        form_payload = data.get('payload', {})
+        # Full payload, or a JSON Patch against the client's last acknowledged revision
+        form_payload, base_revision = autosave_buffer.payload_from_request(data)
         
         metrics = form_payload.get('completion_metrics', {})
         try:
@@ -1917,15 +1894,11 @@ def auto_save_api(request):
             if user_file_no != folder_file_no:
                 print(f"🔍 Mismatch! User: {user_file_no} vs Folder: {folder_file_no}. Searching index...")
                 
-                # Query the In-Memory Index
-                index = get_index()
-                all_folders = index.get("folders", [])
-                
-                # Find folder starting with "user_file_no_"
-                match = next((f for f in all_folders if f['name'].startswith(f"{user_file_no}_")), None)
+                # O(1) lookup of the folder named "user_file_no_..." (index, then ClientFolder)
+                match_path = search_index.resolve_case_folder(user_file_no)
                 
-                if match:
-                    final_target_path = match['path']
+                if match_path:
+                    final_target_path = match_path
                     folder_changed = True
                     print(f"Found correct folder: {final_target_path}")
                 else:
@@ -1940,43 +1913,40 @@ def auto_save_api(request):
         # =========================================================
         # 💾 LOGIC UPDATE 2: SAVE OPERATION (Unique Office File No)
         # =========================================================
-        
-        # We use update_or_create using 'office_file_no' as the ONLY lookup field.
-        # This prevents duplicate records for the same file number.
-        report, created = SiteVisitReport.objects.update_or_create(
-            office_file_no=user_file_no,  # <--- Lookup Key
-            defaults={
-                'user': user,  # Update the user ownership to the last person who saved
-                'target_folder': final_target_path,
-                'form_data': form_payload,
-                'applicant_name': applicant_name,
-                'completion_score': score
-            }
-        )
 
-        # Cleanup: If we moved folders, ensure no lingering drafts exist under the old folder name
-        # (Optional, but good for hygiene)
-        if folder_changed:
-            SiteVisitReport.objects.filter(
-                user=user,
-                target_folder=current_folder_path
-            ).exclude(id=report.id).delete()
-
-        # 🧹 DELETE CLEARED SKETCHES: If a user cleared the canvas, delete backing records so they don't resurrect on reload
-        images_data = form_payload.get('images', {})
-        vectors_data = form_payload.get('vectors', {})
-        for sketch_key in set(images_data.keys()) | set(vectors_data.keys()):
-            if not images_data.get(sketch_key) and not vectors_data.get(sketch_key):
-                ReportSketch.objects.filter(report=report, source_key=sketch_key).delete()
+        # Buffered: the latest payload per office_file_no is written to
+        # SiteVisitReport (and cleared sketches removed) in the background,
+        # skipping the write when nothing changed since the last one.
+        save_args = (user_file_no, user_id, form_payload, final_target_path, applicant_name, score)
+        previous_folder = current_folder_path if folder_changed else None
+        try:
+            report_id, revision = autosave_buffer.submit(
+                *save_args,
+                previous_folder=previous_folder,
+                base_revision=base_revision,
+                request_bytes=len(request.body),
+            )
+        except RevisionConflict:
+            raise
+        except Exception as e:
+            # Redis offline: write straight to SiteVisitReport instead of failing the save
+            print(f"Autosave buffer unavailable ({e}), saving {user_file_no} directly")
+            report_id, revision = autosave_buffer.save_direct(
+                *save_args, previous_folder=previous_folder, base_revision=base_revision
+            )
 
         return JsonResponse({
             'success': True,
             'last_saved': datetime.now().strftime("%H:%M:%S"),
-            'report_id': report.id,
+            'report_id': report_id,
+            'revision': revision,
             'new_folder_path': final_target_path if folder_changed else None,
             'saved': True
         })
 
+    except RevisionConflict as e:
+        # Another tab/device saved in between: the client resends its full payload
+        return JsonResponse({'success': False, 'conflict': True, 'revision': e.revision}, status=409)
     except Exception as e:
         print(f"Auto-save error: {e}")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -1989,19 +1959,8 @@ def check_unread_status(user_profile, folder_path):
     if not user_profile:
         return False
 
-    # 1. Check if there are ANY messages in this folder
-    last_msg = FolderChatMessage.objects.filter(folder_path=folder_path).last()
-    if not last_msg:
-        return False  # No messages, so it can't be unread
-    
-    # 2. Check when the user last visited
-    visit = FolderChatVisit.objects.filter(user=user_profile, folder_path=folder_path).first()
-    
-    # 3. Logic: If never visited OR last message is newer than visit -> Unread
-    if not visit:
-        return True 
-    
-    return last_msg.timestamp > visit.last_visit
+    # Single-folder form of get_unread_flags() (use that for lists of folders)
+    return get_unread_flags(user_profile, [folder_path])[folder_path]
 
 
 @require_http_methods(["GET"])
@@ -2018,27 +1977,21 @@ def serve_file(request):
     # We use os.path.normpath to fix slashes (forward vs backward)
     full_path = os.path.normpath(os.path.join(settings.DOCUMENTS_ROOT, rel_path))
 
-    # 4. Debugging: Print exactly where we are looking (Check your terminal!)
-    print(f"--- SERVE FILE DEBUG ---")
-    print(f"Looking for: {rel_path}")
-    print(f"Full Path:   {full_path}")
-
-    # 5. Check if file exists
-    if not os.path.exists(full_path):
-        print("ERROR: File not found on disk.")
-        return HttpResponseNotFound(f"File not found at: {full_path}")
-
-    # 6. Security Check (Prevent accessing files outside G:\My Drive)
+    # 4. Security Check (Prevent accessing files outside G:\My Drive)
     # This ensures someone can't ask for "..\..\Windows\System32"
     if not full_path.startswith(os.path.normpath(settings.DOCUMENTS_ROOT)):
         return HttpResponseNotFound("Access Denied: Invalid file path.")
 
-    # 7. Serve the file
+    # 5. Serve the file (Range / ETag / If-Modified-Since aware). The type is
+    # decided here: a 304 from serve_path carries no Content-Type header.
     content_type, _ = mimetypes.guess_type(full_path)
     if not content_type:
         content_type = 'application/octet-stream'
 
-    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    try:
+        response = serve_path(request, full_path, content_type=content_type)
+    except OSError:
+        return HttpResponseNotFound("File not found.")
     
     is_download = request.GET.get('download') == 'true'
     
@@ -2064,30 +2017,34 @@ def get_thumbnail(request):
     # 3. Security & Existence Check
     if not full_path.startswith(os.path.normpath(settings.DOCUMENTS_ROOT)):
         return HttpResponseNotFound()
-    if not os.path.exists(full_path):
+    try:
+        st = os.stat(full_path)
+    except OSError:
         return HttpResponseNotFound()
 
-    # 4. Check Cache (Optional: To make it even faster on reload)
-    # cache_key = f"thumb_{rel_path}"
-    # cached_img = cache.get(cache_key)
-    # if cached_img:
-    #     return HttpResponse(cached_img, content_type="image/jpeg")
+    # 4. Conditional request: the ETag names this exact file version, so a
+    # browser that already has it gets a 304 without anything being rendered
+    key = thumbnail_key(full_path, st)
+    etag = f'"{key}"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if not_modified is not None:
+        return not_modified
 
     try:
-        # 5. Generate Image using PyMuPDF (Fast!)
-        doc = fitz.open(full_path)
-        page = doc.load_page(0)  # Load first page
-        pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))  # 50% scale (thumbnail size)
-        img_data = pix.tobytes("jpg")  # Convert to JPG bytes
-        
-        # cache.set(cache_key, img_data, 60*60*24) # Cache for 24 hours
-        return HttpResponse(img_data, content_type="image/jpeg")
-        
+        # 5. Memory -> disk cache -> render with PyMuPDF / PIL
+        img_data = thumbnail_cache.get(full_path, key)
     except Exception as e:
         print(f"Thumbnail Error: {e}")
         # Return a 1x1 pixel empty image or 404 so browser shows default icon
         return HttpResponseNotFound()
 
+    response = HttpResponse(img_data, content_type="image/jpeg")
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(st.st_mtime)
+    # Always revalidate (cheap 304) so an edited file never shows a stale thumbnail
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 # Add this function to views.py
 # It uses 'fitz' which you already imported
 
@@ -2096,12 +2053,14 @@ def get_thumbnail(request):
 def render_pdf_page(request):
     """
     Renders a specific page of a PDF as an image (PNG).
-    Usage: /coreapi/render-page/?path=Folder/file.pdf&page=5&zoom=1.5
+    Usage: /coreapi/render-page/?path=Folder/file.pdf&page=5&zoom=1.5&prefetch=2
+    Zoom is snapped to the nearest quality tier; prefetch renders the next N pages in the background.
     """
     # 1. Get Parameters
     rel_path = request.GET.get('path')
     page_num = int(request.GET.get('page', 0))  # Default to Page 0 (First page)
     zoom = float(request.GET.get('zoom', 1.0))  # Zoom level (1.0 = 100%, 2.0 = 200%)
+    prefetch = int(request.GET.get('prefetch', 0))
 
     if not rel_path:
         return HttpResponseBadRequest("Missing path")
@@ -2118,28 +2077,12 @@ def render_pdf_page(request):
         return HttpResponseNotFound("File not found")
 
     try:
-        # 4. Open PDF with PyMuPDF
-        doc = fitz.open(full_path)
-        
-        # Validation
-        if page_num < 0 or page_num >= len(doc):
-             doc.close()
-             return HttpResponseNotFound("Page number out of range")
+        # 4. Pooled document handle + rendered-page cache
+        img_data = page_renderer.get_page(full_path, page_num, zoom, prefetch=prefetch)
+        if img_data is None:
+            return HttpResponseNotFound("Page number out of range")
 
-        # 5. Render the Page
-        page = doc.load_page(page_num)
-        
-        # Matrix handles the Zoom/Quality
-        # 1.5 zoom is good balance of quality vs speed
-        mat = fitz.Matrix(zoom, zoom) 
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        
-        # 6. Convert to PNG bytes
-        img_data = pix.tobytes("png")
-        
-        doc.close()
-
-        # 7. Return Image
+        # 5. Return Image
         return HttpResponse(img_data, content_type="image/png")
 
     except Exception as e:
@@ -2174,9 +2117,10 @@ def get_file_info(request):
     # If PDF, add page count
     if info['extension'] == '.pdf':
         try:
-            doc = fitz.open(full_path)
-            info['page_count'] = len(doc)
-            doc.close()
+            doc = open_pdf(full_path)
+            with FITZ_LOCK:
+                info['page_count'] = len(doc)
+                doc.close()
         except Exception as e:
             print(f"Error getting PDF page count for {full_path}: {e}")
             info['page_count'] = 0
@@ -2241,71 +2185,24 @@ def analyze_file(request):
 
             ext = abs_path.lower()
 
-            if ext.endswith(".pdf"):
+            if ext.endswith(OCR_PDF_EXTENSIONS + OCR_IMAGE_EXTENSIONS):
                 ocr_inputs.append(abs_path)
 
-            elif ext.endswith((".jpg", ".jpeg", ".png", ".bmp", ".tiff")):
-                img = Image.open(abs_path).convert("RGB")
-                buf = io.BytesIO()
-                img.save(buf, format="PDF")
-                buf.seek(0)
-                ocr_inputs.append(buf)
-
             elif ext.endswith(".docx"):
                 direct_texts.append(extract_text_from_docx(abs_path))
 
-            elif ext.endswith((".xls", ".xlsx")):
+            elif ext.endswith((".xls", ".xlsx", ".xlsm")):
                 direct_texts.append(extract_text_from_excel(abs_path))
 
         extracted_text = []
+        ocr_stats = None
 
         # ---------------------------
-        # STEP 2: OCR (ONLY IF NEEDED)
+        # STEP 2: PAGE TEXT (cache -> embedded text layer -> batched OCR)
         # ---------------------------
         if ocr_inputs:
-            merger = PdfMerger()
-            for item in ocr_inputs:
-                merger.append(item)
-
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            temp_pdf_path = os.path.join(
-                settings.GENERATED_PDFS_ROOT,
-                f"temp_{timestamp}.pdf"
-            )
-
-            merger.write(temp_pdf_path)
-            merger.close()
-
-            from google.cloud import vision
-            client = vision.ImageAnnotatorClient()
-
-            with open(temp_pdf_path, "rb") as f:
-                pdf_content = f.read()
-
-            request_vision = vision.AnnotateFileRequest(
-                input_config=vision.InputConfig(
-                    content=pdf_content,
-                    mime_type="application/pdf"
-                ),
-                features=[
-                    vision.Feature(
-                        type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION
-                    )
-                ]
-            )
-
-            response = client.batch_annotate_files(
-                requests=[request_vision]
-            )
-
-            for file_response in response.responses:
-                for page_response in file_response.responses:
-                    if page_response.full_text_annotation:
-                        extracted_text.append(
-                            page_response.full_text_annotation.text
-                        )
-
-            os.remove(temp_pdf_path)
+            extracted_text, ocr_stats = extract_page_text(ocr_inputs)
+            print(f"analyze_file: {ocr_stats}")
 
         # ---------------------------
         # STEP 3: MERGE ALL TEXT
@@ -2331,31 +2228,14 @@ def analyze_file(request):
         return JsonResponse({
             "success": True,
             "message": "Text extracted successfully",
-            "output_file": txt_filename
+            "output_file": txt_filename,
+            "pages": ocr_stats
         })
 
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
 
-def extract_text_from_docx(path):
-    doc = Document(path)
-    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-
-
-def extract_text_from_excel(path):
-    wb = openpyxl.load_workbook(path, data_only=True)
-    texts = []
-
-    for sheet in wb.worksheets:
-        for row in sheet.iter_rows():
-            for cell in row:
-                if cell.value:
-                    texts.append(str(cell.value))
-
-    return "\n".join(texts)
-
-
 def feedback(request):
     """Render the feedback form page"""
     if not request.session.get("user_id"):
@@ -2366,49 +2246,6 @@ def feedback(request):
     return render(request, "feedback.html", context)
 
 
-# --- HELPER: DRAW VECTORS TO IMAGE (Server Side) ---
-def generate_image_from_vectors(vector_list, width=1000, height=1000):
-    """
-    Takes a list of stroke objects (from frontend JSON) and draws them 
-    onto a white canvas using Python's Pillow library.
-    """
-    if not vector_list:
-        return None
-
-    try:
-        # 1. Create a white canvas
-        image = Image.new("RGB", (width, height), "white")
-        draw = ImageDraw.Draw(image)
-
-        # 2. Loop through every stroke in the vector list
-        for stroke in vector_list:
-            points = stroke.get('points', [])
-            color = stroke.get('color', '#000000')
-            width = int(stroke.get('size', 3))
-            
-            # Convert JSON points [{'x':1, 'y':1}, ...] to Python tuples [(1,1), ...]
-            # We add an offset (e.g. +500) if your coordinates are negative/centered
-            # Assuming standard top-left coordinates here, but you might need to adjust
-            xy_points = [(p['x'], p['y']) for p in points]
-
-            if len(xy_points) > 1:
-                # Draw the line connecting points
-                draw.line(xy_points, fill=color, width=width, joint='curve')
-            elif len(xy_points) == 1:
-                # Draw a dot if it's just one point
-                x, y = xy_points[0]
-                draw.ellipse([x - width, y - width, x + width, y + width], fill=color)
-
-        # 3. Save to memory buffer
-        output = io.BytesIO()
-        image.save(output, format="PNG")
-        return ContentFile(output.getvalue(), name="generated_sketch.png")
-
-    except Exception as e:
-        print(f"Vector generation error: {e}")
-        return None
-
-
 # --- MAIN VIEW (Refactored for Strict Folder Matching) ---
 @csrf_protect
 @require_POST
@@ -2421,8 +2258,8 @@ def save_feedback(request):
         user = UserProfile.objects.get(id=user_id)
         request_data = json.loads(request.body)
         
-        # 1. Get Payload
-        payload = request_data.get('payload', {})
+        # 1. Get Payload (full, or a JSON Patch against the last autosaved revision)
+        payload, base_revision = autosave_buffer.payload_from_request(request_data)
         
         # 2. Extract Data
         checklist_data = payload.get('Valuers_Checklist', {})
@@ -2452,15 +2289,11 @@ def save_feedback(request):
             if office_file_no_val != folder_file_no:
                 print(f"Mismatch! User: {office_file_no_val} vs Folder: {folder_file_no}. Searching index...")
                 
-                # Query the In-Memory Index (Previously built at server start)
-                index = get_index()
-                all_folders = index.get("folders", [])
+                # O(1) lookup of the folder named "office_file_no_val_..." (index, then ClientFolder)
+                match_path = search_index.resolve_case_folder(office_file_no_val)
                 
-                # Search for folder starting with "office_file_no_val_"
-                match = next((f for f in all_folders if f['name'].startswith(f"{office_file_no_val}_")), None)
-                
-                if match:
-                    final_target_path = match['path']
+                if match_path:
+                    final_target_path = match_path
                     folder_changed = True
                     print(f"Found correct folder: {final_target_path}")
                 else:
@@ -2471,53 +2304,75 @@ def save_feedback(request):
                         'mismatch': True
                     })
 
-        # 4. IDENTIFY REPORT
-        report_id = payload.get('report_id')
-        report = None
-
-        if report_id:
-            report = SiteVisitReport.objects.filter(id=report_id).first()
-
-        # FIX: Prevent UNIQUE constraint failed by checking Office File No
-        if not report and office_file_no_val:
-            report = SiteVisitReport.objects.filter(office_file_no=office_file_no_val).first()
-
-        if not report:
-            # Fallback: Find by user and target folder path
-            report = SiteVisitReport.objects.filter(
-                user=user,
-                target_folder=final_target_path
-            ).order_by('-updated_at').first()
-
-        # 5. EXTRACT IMAGES AND VECTORS
-        images_data = payload.pop('images', {}) 
-        vectors_data = payload.get('vectors', {})
-
-        # 6. CREATE OR UPDATE REPORT
-        if report:
-            print(f"Updating report: {report.id}")
-            report.form_data = payload
-            report.office_file_no = office_file_no_val
-            report.applicant_name = applicant_name_val
-            report.target_folder = final_target_path  # Update to final path
-            report.completion_score = score
-            report.save()
-        else:
-            print("Creating NEW report")
-            report = SiteVisitReport.objects.create(
-                user=user,
-                form_data=payload,
-                office_file_no=office_file_no_val,
-                applicant_name=applicant_name_val,
-                target_folder=final_target_path,
-                completion_score=score
-            )
+        # 4-6 hold the file number's autosave lock, so a delta save is checked
+        # against the current revision and no autosave can land in between
+        with autosave_buffer.locked(office_file_no_val):
+            if base_revision is not None:
+                current_revision = autosave_buffer.state(office_file_no_val)[1]
+                if current_revision != base_revision:
+                    raise RevisionConflict(current_revision)
+
+            # 4. IDENTIFY REPORT
+            # Write out any buffered autosave first so it can't land on top of this save later
+            autosave_buffer.flush(office_file_no_val)
+            report_id = payload.get('report_id')
+            report = None
+
+            if report_id:
+                report = SiteVisitReport.objects.filter(id=report_id).first()
+
+            # FIX: Prevent UNIQUE constraint failed by checking Office File No
+            if not report and office_file_no_val:
+                report = SiteVisitReport.objects.filter(office_file_no=office_file_no_val).first()
+
+            if not report:
+                # Fallback: Find by user and target folder path
+                report = SiteVisitReport.objects.filter(
+                    user=user,
+                    target_folder=final_target_path
+                ).order_by('-updated_at').first()
+
+            # 5. EXTRACT IMAGES AND VECTORS
+            images_data = payload.pop('images', {}) 
+            vectors_data = payload.get('vectors', {})
+            # Stroke lists are stored packed on ReportSketch; the row keeps references
+            stored_payload, packed_strokes = split_vectors(payload)
+
+            # 6. CREATE OR UPDATE REPORT
+            if report:
+                print(f"Updating report: {report.id}")
+                report.form_data = stored_payload
+                report.office_file_no = office_file_no_val
+                report.applicant_name = applicant_name_val
+                report.target_folder = final_target_path  # Update to final path
+                report.completion_score = score
+                report.revision += 1
+                report.save()
+            else:
+                print("Creating NEW report")
+                report = SiteVisitReport.objects.create(
+                    user=user,
+                    form_data=stored_payload,
+                    office_file_no=office_file_no_val,
+                    applicant_name=applicant_name_val,
+                    target_folder=final_target_path,
+                    completion_score=score,
+                    revision=1
+                )
+            autosave_buffer.forget(office_file_no_val)
+        store_strokes(report, packed_strokes)
 
         # 7. PROCESS SKETCHES (With Explicit Deletion Logic)
         all_sketch_keys = set(images_data.keys()) | set(vectors_data.keys())
+        vector_only_keys = []
+        stored_digests = dict(
+            ReportSketch.objects.filter(report=report, source_key__in=all_sketch_keys)
+            .exclude(image='').values_list('source_key', 'image_digest')
+        )
 
         for source_key in all_sketch_keys:
             image_file = None 
+            image_digest = None
             is_base64 = False
             
             base64_val = images_data.get(source_key)
@@ -2535,25 +2390,48 @@ def save_feedback(request):
                     format_header, imgstr = base64_val.split(';base64,') 
                     ext = format_header.split('/')[-1]
                     file_name = f"{source_key}_{report.id}.{ext}"
-                    image_file = ContentFile(base64.b64decode(imgstr), name=file_name)
+                    img_bytes = base64.b64decode(imgstr)
+                    image_digest = hashlib.sha256(img_bytes).hexdigest()
+                    if stored_digests.get(source_key) == image_digest:
+                        continue  # Same image as last save: no new file, no row update
+                    image_file = ContentFile(img_bytes, name=file_name)
                     is_base64 = True
                 except Exception as e:
                     print(f"Base64 error for {source_key}: {e}")
 
-            # STRATEGY B: Fallback to Vectors
-            if not image_file and vector_val: 
-                print(f"Generating image from vectors for: {source_key}")
-                generated_file = generate_image_from_vectors(vector_val)
-                if generated_file:
-                    generated_file.name = f"{source_key}_{report.id}_generated.png"
-                    image_file = generated_file
+            # STRATEGY B: Fallback to Vectors (rendered together below)
+            if not image_file and vector_val:
+                vector_only_keys.append(source_key)
+                continue
 
             # SAVE/UPDATE only if we have a valid file
             if image_file:
                 ReportSketch.objects.update_or_create(
                     report=report,
                     source_key=source_key,
-                    defaults={'image': image_file}
+                    defaults={'image': image_file, 'render_digest': None, 'image_digest': image_digest}
+                )
+
+        # Vector-only sketches: re-render just those whose strokes changed since
+        # their image was made, all at once on the render pool
+        if vector_only_keys:
+            render_jobs = {}
+            for source_key, strokes, digest, image in ReportSketch.objects.filter(
+                    report=report, source_key__in=vector_only_keys
+            ).values_list('source_key', 'strokes', 'render_digest', 'image'):
+                if strokes and not (image and digest == render_digest(strokes)):
+                    render_jobs[source_key] = strokes
+            if render_jobs:
+                print(f"Generating images from vectors for: {sorted(render_jobs)}")
+            for source_key, png in render_many(render_jobs).items():
+                ReportSketch.objects.update_or_create(
+                    report=report,
+                    source_key=source_key,
+                    defaults={
+                        'image': ContentFile(png, name=f"{source_key}_{report.id}_generated.png"),
+                        'render_digest': render_digest(render_jobs[source_key]),
+                        'image_digest': hashlib.sha256(png).hexdigest(),
+                    }
                 )
 
         return JsonResponse({
@@ -2563,6 +2441,8 @@ def save_feedback(request):
             'redirect_url': f"/coreapi/pdf-editor/{report.id}/"
         })
 
+    except RevisionConflict as e:
+        return JsonResponse({'success': False, 'conflict': True, 'revision': e.revision}, status=409)
     except Exception as e:
         print(f"Save Feedback Error: {e}")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -2575,7 +2455,8 @@ def get_report_data_with_sketches(report):
     Helper function: Merges the saved form text with the images 
     stored in the ReportSketch table.
     """
-    # 1. Get the base text data
+    # 1. Get the base text data (with any buffered autosave written first)
+    autosave_buffer.flush_report(report)
     context_data = report.form_data
     if isinstance(context_data, str):
         try:
@@ -2592,7 +2473,7 @@ def get_report_data_with_sketches(report):
 
     # 3. Fetch images from ReportSketch table and re-inject them
     # This puts the URLs back into the JSON so the frontend sees them
-    sketches = ReportSketch.objects.filter(report=report)
+    sketches = ReportSketch.objects.filter(report=report).defer('strokes')
     for sketch in sketches:
         if sketch.image:
             # We use the file URL so the browser can load it
@@ -2631,16 +2512,22 @@ def get_report_data(request, report_id):
     return JsonResponse(full_data)
 
 
+@require_GET
+def get_sketch_vectors(request, report_id):
+    """Editable strokes of one sketch, fetched by the sketch pad when it opens a stored reference."""
+    if not request.session.get("user_id"):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    source_key = request.GET.get('key', '')
+    vectors = load_vectors(report_id, source_key)
+    if vectors is None:
+        return JsonResponse({'error': 'Sketch not found'}, status=404)
+    return JsonResponse({'vectors': vectors})
+
+
 @csrf_protect
 @require_POST
 def finalize_pdf(request):
     try:
-        # --- CORRECT FIX: Force ProactorEventLoop for Windows ---
-        # Playwright requires subprocesses, which only Proactor supports on Windows.
-        if sys.platform == 'win32':
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-        # --------------------------------------------------------
-
         # 1. Parse Data
         payload = json.loads(request.body)
         report_id = payload.get('report_id')
@@ -2667,72 +2554,35 @@ def finalize_pdf(request):
         safe_file_no = str(raw_file_no).strip().replace(' ', '_').replace('/', '-')
         safe_name = str(raw_name).strip().replace(' ', '_').replace('/', '-')
         base_filename = f"{safe_file_no}_{safe_name}"
-        
-        counter = 1
-        while True:
-            pdf_filename = f"{base_filename}_site_report_{counter}.pdf"
-            full_save_path = os.path.join(save_dir, pdf_filename)
-            if not os.path.exists(full_save_path):
-                break
-            counter += 1
 
-        # 4. GENERATE PDF
-        print(f"Starting PDF generation for {pdf_filename} (HTML size: {len(html_content)} bytes)")
+        # 4. Queue the render (see pdf_jobs.py); the client polls pdf_job_status
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(args=["--no-sandbox", "--disable-setuid-sandbox"])
-                # Set a reasonable viewport to avoid layout issues
-                context = browser.new_context(viewport={'width': 800, 'height': 1200})
-                page = context.new_page()
-                
-                # Set content & wait for images (already base64 mostly)
-                # Using 'load' instead of 'networkidle' for speed since images are local
-                page.set_content(html_content, wait_until="load", timeout=60000) 
-                
-                # Small buffer for any late-loading resources or JS execution
-                time.sleep(1)
-                
-                page.pdf(
-                    path=full_save_path,
-                    format="A4",
-                    margin={ "top": "0", "bottom": "0", "left": "0", "right": "0" },
-                    print_background=True,
-                    scale=1.0,
-                    prefer_css_page_size=False
-                )
-                browser.close()
-            print("PDF successfully generated.")
-        except Exception as pw_err:
-            print(f"Playwright Error: {pw_err}")
-            raise pw_err
-
-        # 5. Backup Logic
-        try:
-            backup_dir = os.path.join(settings.BASE_DIR, 'generated_pdfs')
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir, exist_ok=True)
-            backup_save_path = os.path.join(backup_dir, pdf_filename)
-            shutil.copy2(full_save_path, backup_save_path)
-            
-            if report_id:
-                try:
-                    rpt = SiteVisitReport.objects.get(id=report_id)
-                    rpt.generated_pdf_name = pdf_filename 
-                    rpt.save()
-                except:
-                    pass
+            job = pdf_jobs.enqueue(html_content, save_dir, base_filename, report_id=report_id)
+        except PoolBusy as busy:
+            return JsonResponse({'success': False, 'error': f"{busy}. Please try again in a minute."}, status=503)
 
-            return JsonResponse({'success': True, 'file_path': full_save_path})
-        except Exception as copy_error:
-            print(f"Warning: Could not save backup copy: {copy_error}")
-        
-        return JsonResponse({'success': True, 'file_path': full_save_path})
+        return JsonResponse({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'file_path': job['file_path'],
+            'status_url': reverse('coreapi:pdf_job_status', args=[job['job_id']]),
+        }, status=202)
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+
+@require_GET
+def pdf_job_status(request, job_id):
+    """Polled by the PDF editor after finalize_pdf: queued -> saving -> done / failed."""
+    job = get_job(job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'error': 'Unknown or expired job'}, status=404)
+    return JsonResponse({'success': job['status'] != 'failed', **job})
+
 # ==========================================
 #  PDF GENERATION UTILS
 # ==========================================
@@ -2761,83 +2611,8 @@ def fill_site_report_pdf(data, images_dict, target_folder_path, filename):
     if not os.path.exists(template_path):
         raise FileNotFoundError(f"PDF Template not found at: {template_path}")
 
-    # 2. Flatten JSON
-    flat_data = {}
-    
-    def flatten(y, prefix=""):
-        for k, v in y.items():
-            full_key = f"{prefix}.{k}" if prefix else k
-            if isinstance(v, dict):
-                flatten(v, full_key)
-            elif isinstance(v, list):
-                flat_data[full_key] = v 
-                # Check items for checkboxes
-                for item in v:
-                    flat_data[f"{full_key}.{item}"] = True
-            else:
-                flat_data[full_key] = v
-                flat_data[k] = v 
-
-    flatten(data)
-
-    # 3. Open PDF & Fill
-    doc = fitz.open(template_path)
-
-    for page in doc:
-        widgets = list(page.widgets())
-        
-        for widget in widgets:
-            name = widget.field_name
-            
-            # --- A. IMAGE INSERTION ---
-            if name in images_dict:
-                b64_img = images_dict[name]
-                if b64_img and 'base64,' in b64_img:
-                    try:
-                        img_data = base64.b64decode(b64_img.split('base64,')[1])
-                        rect = widget.rect
-                        page.insert_image(rect, stream=img_data, keep_proportion=True)
-                        page.delete_widget(widget)
-                        continue 
-                    except Exception as e:
-                        print(f"Image error for {name}: {e}")
-
-            # --- B. DATA FILLING ---
-            
-            # Checkbox Logic
-            if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                is_checked = False
-                
-                # Case 1: Boolean match (e.g. data is True)
-                if name in flat_data and flat_data[name] is True:
-                    is_checked = True
-                # Case 2: String match (e.g. data is "true")
-                elif name in flat_data and str(flat_data[name]).lower() == "true":
-                    is_checked = True
-                # Case 3: List membership (Value inside a list)
-                else:
-                    for key, val in flat_data.items():
-                        if isinstance(val, list) and name in val:
-                            is_checked = True
-                            break
-                            
-                if is_checked:
-                    widget.field_value = True
-                    widget.update()
-
-            # Text Field Logic
-            elif name in flat_data:
-                val = flat_data[name]
-                if val is not None and not isinstance(val, list) and not isinstance(val, dict):
-                    widget.field_value = str(val)
-                    widget.update()
-
-    # 4. Save
-    doc.flatten_form_fields()
-    doc.save(output_path)
-    doc.close()
-    
-    return output_path
+    # 2. Fill from the cached, widget-indexed template (see pdf_form.py)
+    return fill_form(template_path, data, images_dict, output_path)
 
 
 def assetlinks(request):
@@ -2903,14 +2678,16 @@ def db_case_search_api(request):
 
     folders = []
     for case in db_results:
-        # Get relative path for the file explorer UI
-        rel_path = os.path.relpath(case.full_folder_path, settings.DOCUMENTS_ROOT).replace('\\', '/')
+        # The DB path, or the indexed location if the folder was renamed (e.g. "_hold")
+        abs_path = search_index.client_folder_path(case.unique_file_no, case.full_folder_path) \
+            or case.full_folder_path
+        rel_path = os.path.relpath(abs_path, settings.DOCUMENTS_ROOT).replace('\\', '/')
         
-        # Fetch the status dot color
-        stats = get_case_folder_info(case.full_folder_path)
+        # Fetch the status dot color (cached, keyed by folder mtime)
+        stats = get_status(abs_path)
         
         folders.append({
-            "name": os.path.basename(case.full_folder_path),
+            "name": os.path.basename(abs_path),
             "path": rel_path,
             "type": "folder",
             "has_chat": True,
@@ -3026,10 +2803,13 @@ def status_viewer(request):
     # Fetch all client folders
     folders = ClientFolder.objects.all().order_by('-created_at')
     
+    # One batched lookup; served from the status cache / index fingerprints, not the disk
+    statuses = get_statuses([(f.full_folder_path, f.created_at) for f in folders])
+
     results = []
     for f in folders:
         # Get TAT info from disk/metadata
-        tat_info = get_case_folder_info(f.full_folder_path, db_created_at=f.created_at)
+        tat_info = statuses.get(f.full_folder_path)
         
         if tat_info:
             results.append({
@@ -3091,8 +2871,9 @@ def export_status_excel_api(request):
         headers = ["File No", "Applicant", "Created Date", "Download Date", "TAT Date", "Site Rpt", "Final Rpt", "Status", "Days Taken"]
         ws.append(headers)
         
+        statuses = get_statuses([(f.full_folder_path, f.created_at) for f in folders])
         for f in folders:
-            tat = get_case_folder_info(f.full_folder_path, db_created_at=f.created_at)
+            tat = statuses.get(f.full_folder_path)
             if not tat: continue
             
             ws.append([
@@ -3139,8 +2920,9 @@ def export_master_status_excel_api(request):
         headers = ["District", "File No", "Applicant", "Created Date", "Status", "Days Taken", "Site Rpt", "Final Rpt"]
         ws.append(headers)
         
+        statuses = get_statuses([(f.full_folder_path, f.created_at) for f in folders])
         for f in folders:
-            tat = get_case_folder_info(f.full_folder_path, db_created_at=f.created_at)
+            tat = statuses.get(f.full_folder_path)
             if not tat: continue
             
             # Map district name
@@ -3383,12 +3165,13 @@ def get_property_photos_api(request):
         return JsonResponse({'success': False, 'error': 'Missing file_no'}, status=400)
 
     try:
-        folder = ClientFolder.objects.filter(unique_file_no=file_no).first()
-        if not folder or not folder.full_folder_path:
+        folder = ClientFolder.objects.filter(unique_file_no=file_no).only('full_folder_path').first()
+        folder_path = search_index.client_folder_path(file_no, folder.full_folder_path if folder else None)
+        if folder_path is None:
             return JsonResponse({'success': False, 'error': 'Client folder not found'}, status=404)
 
         # Look for a 'P' subfolder (Photos folder)
-        photos_dir = os.path.join(folder.full_folder_path, 'P')
+        photos_dir = os.path.join(folder_path, 'P')
         if not os.path.isdir(photos_dir):
             return JsonResponse({'success': True, 'photos': [], 'message': 'No P folder found'})
 
@@ -3884,7 +3667,7 @@ def serve_local_pdf(request):
                 file_path = max(pdfs, key=os.path.getmtime)
                 
     if file_path and os.path.exists(file_path):
-        response = FileResponse(open(file_path, 'rb'), content_type='application/pdf')
+        response = serve_path(request, file_path, content_type='application/pdf')
         # Send the actual file name in the header so the frontend knows what it found
         response['X-Resolved-Path'] = file_path.replace('\\', '\\\\')
         return response
@@ -199,6 +199,29 @@ CACHES = {
     }
 }
 FULL_DATA_ROOT = os.path.join(BASE_DIR, "data")
+# Persisted search index fingerprints (lets restarts skip the full drive walk)
+SEARCH_INDEX_SNAPSHOT = os.path.join(FULL_DATA_ROOT, "search_index.bin")
+# Drive scanner tuning: parallel directory reads and total directory ops/sec
+SEARCH_INDEX_SCAN_WORKERS = 8
+SEARCH_INDEX_SCAN_RATE = 200
+# Rendered PDF/image thumbnails, keyed by file path + mtime + size
+THUMBNAIL_CACHE_ROOT = os.path.join(FULL_DATA_ROOT, "thumbnails")
+# File downloads: None = stream from Django, "x-accel" = nginx X-Accel-Redirect,
+# "x-sendfile" = Apache/lighttpd X-Sendfile. For x-accel the proxy must map
+# FILE_DELIVERY_ACCEL_PREFIX (an internal location) onto DOCUMENTS_ROOT.
+FILE_DELIVERY_MODE = None
+FILE_DELIVERY_ACCEL_PREFIX = "/protected-documents/"
+# analyze_file OCR: per-page text cache, backend class and parallel OCR requests.
+# "coreapi.ocr.TextLayerBackend" is an offline stand-in that needs no credentials.
+OCR_CACHE_ROOT = os.path.join(FULL_DATA_ROOT, "ocr_cache")
+OCR_BACKEND = "coreapi.ocr.GoogleVisionBackend"
+OCR_CONCURRENCY = 4
+# SQLite FTS5 index of text extracted from case-folder documents (api/search-content/)
+CONTENT_INDEX_DB = os.path.join(FULL_DATA_ROOT, "content_index.sqlite3")
+# Server-side sketch rasterising (vector-only sketches in save_feedback):
+# output edge in px (the sketch pad canvas is 1000) and render threads
+SKETCH_RENDER_SIZE = 1000
+SKETCH_RENDER_WORKERS = 4
 # Folder to save generated PDFs in project
 GENERATED_PDFS_ROOT = os.path.join(BASE_DIR , "generated_pdfs")
 # Ensure directories exist